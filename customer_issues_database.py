@@ -1,6 +1,910 @@
 import sqlite3
+import base64
+import calendar
+import json
 import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+
+
+# توحيد الكتابة العربية للبحث: أشكال الألف، التاء المربوطة/الهاء، الألف المقصورة/الياء،
+# حذف التشكيل والتطويل، وتحويل الأرقام العربية الهندية إلى أرقام لاتينية
+_ARABIC_NORMALIZATION = {ord(ch): 'ا' for ch in 'أإآٱ'}
+_ARABIC_NORMALIZATION.update({ord('ة'): 'ه', ord('ى'): 'ي', ord('ـ'): None, ord('\u0670'): None})
+_ARABIC_NORMALIZATION.update({code: None for code in range(0x064B, 0x0660)})
+_ARABIC_NORMALIZATION.update({0x0660 + digit: str(digit) for digit in range(10)})
+_ARABIC_NORMALIZATION.update({0x06F0 + digit: str(digit) for digit in range(10)})
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def normalize_arabic(text):
+    """إرجاع الصيغة الموحدة للنص المستخدمة في الفهرسة والبحث (None يبقى None)"""
+    if text is None:
+        return None
+    return str(text).translate(_ARABIC_NORMALIZATION)
+
+
+def tokenize_arabic(text):
+    """تقسيم النص بعد توحيده إلى كلمات"""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(normalize_arabic(text))
+
+
+def like_contains(text):
+    """نمط LIKE '%نص%' تُطابق فيه % و_ حرفياً كما في البحث المحلي (يُستخدم مع LIKE ? ESCAPE '\\')"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def date_key(value):
+    """مفتاح التاريخ الرقمي لنص تاريخ، مطابق لـ CAST(strftime('%s', value) AS INTEGER)"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+    return calendar.timegm(parsed.timetuple())
+
+
+def _trigger_sql_matches(existing_sql, wanted_sql):
+    """مقارنة نص مشغل مخزن في sqlite_master بالنص المطلوب بتجاهل المسافات"""
+    wanted = ' '.join(wanted_sql.replace('IF NOT EXISTS ', '').split())
+    return ' '.join((existing_sql or '').split()) == wanted
+
+
+def sync_triggers(conn, triggers):
+    """إنشاء المشغلات الناقصة وإعادة إنشاء المتغيرة؛ يرجع True إذا تغير أي مشغل"""
+    existing = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall())
+    changed = False
+    for name, trigger_sql in triggers.items():
+        if name in existing and _trigger_sql_matches(existing[name], trigger_sql):
+            continue
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(trigger_sql)
+        changed = True
+    return changed
+
+
+class PooledConnection(sqlite3.Connection):
+    """اتصال المجمع: يحمل علامة الإدخال الجماعي التي تقرؤها مشغلات المراسلات والمرفقات عبر bulk_loading()
+
+    وعلامة المعاملة المفتوحة بـ DatabaseManager.transaction() التي لا يثبتها execute_query ولا يتراجع عنها.
+    """
+
+    bulk_loading = False
+    transaction_open = False
+
+    def _bulk_loading(self):
+        return 1 if self.bulk_loading else 0
+
+
+class ConnectionPool:
+    """مجمع اتصالات SQLite: اتصال دائم لكل خيط رئيسي ومجمع محدود لخيوط العمل"""
+
+    def __init__(self, db_name, max_connections=4, timeout=10.0, health_check_interval=30.0, on_open=None):
+        self.db_name = db_name
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._local = threading.local()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._all_connections = set()
+        self._closed = False
+        # يزداد مع كل استخدام للاتصال غيّر بيانات (تعتمد عليه ذاكرات التخزين المؤقت)
+        self.write_version = 0
+        # يُستدعى مرة واحدة قبل أول استعلام (تجهيز المخطط)، فلا يُلمس الملف عند استيراد الوحدة
+        self.on_open = on_open
+        self._open_lock = threading.RLock()
+        self._opened = on_open is None
+        self._opening = False
+
+    def _connect(self):
+        """فتح اتصال جديد وتسجيله في المجمع"""
+        conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False, factory=PooledConnection)
+        # دالة التوحيد مطلوبة في كل اتصال لأن مشغلات الفهرسة تستدعيها
+        conn.create_function('ar_normalize', 1, normalize_arabic, deterministic=True)
+        # مشغلات إدخال المراسلات والمرفقات تتوقف أثناء الإدخال الجماعي الذي يفهرس كل دفعة بجملة واحدة
+        conn.create_function('bulk_loading', 0, conn._bulk_loading)
+        with self._lock:
+            self._all_connections.add(conn)
+        return conn
+
+    def _discard(self, conn):
+        """إغلاق اتصال تالف وإزالته من المجمع"""
+        with self._lock:
+            self._all_connections.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _is_healthy(self, conn, last_used):
+        """فحص صلاحية الاتصال إذا ظل خاملاً أكثر من المدة المحددة"""
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _main_thread_connection(self):
+        """الاتصال الدائم الخاص بالخيط الرئيسي (خيط الواجهة)"""
+        conn = getattr(self._local, 'conn', None)
+        last_used = getattr(self._local, 'last_used', 0.0)
+        if conn is not None and not self._is_healthy(conn, last_used):
+            self._discard(conn)
+            conn = None
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _borrow(self):
+        """استعارة اتصال من المجمع المحدود لخيوط العمل"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError("انتهت مهلة انتظار اتصال متاح بقاعدة البيانات")
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._is_healthy(conn, last_used):
+                    return conn
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _give_back(self, conn, broken=False):
+        """إرجاع اتصال مستعار إلى المجمع"""
+        try:
+            if broken or self._closed:
+                self._discard(conn)
+            else:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def _note_writes(self, conn, changes_before):
+        """زيادة رقم إصدار البيانات إذا غيّر الاتصال أي صف"""
+        try:
+            changed = conn.total_changes != changes_before
+        except sqlite3.ProgrammingError:
+            changed = True
+        if changed:
+            with self._lock:
+                self.write_version += 1
+
+    def mark_changed(self):
+        """زيادة رقم إصدار البيانات لكتابة لم تمر عبر المجمع (من نسخة أخرى من البرنامج)"""
+        with self._lock:
+            self.write_version += 1
+
+    def ensure_open(self):
+        """استدعاء on_open عند أول استخدام للمجمع (والخيوط الأخرى تنتظر انتهاءه)
+
+        استعلامات on_open نفسها تمر دون انتظار، وإذا فشل يُعاد المحاولة مع الاستعلام التالي.
+        """
+        if self._opened:
+            return
+        with self._open_lock:
+            if self._opened or self._opening:
+                return
+            self._opening = True
+            try:
+                self.on_open()
+                self._opened = True
+            finally:
+                self._opening = False
+
+    @contextmanager
+    def connection(self):
+        """الحصول على اتصال للخيط الحالي (يعاد استخدامه في الاستدعاءات المتداخلة)"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("مجمع الاتصالات مغلق")
+        self.ensure_open()
+        conn = getattr(self._local, 'borrowed', None)
+        if conn is not None:
+            yield conn
+            return
+        if threading.current_thread() is threading.main_thread():
+            conn = self._main_thread_connection()
+            changes_before = conn.total_changes
+            try:
+                yield conn
+            finally:
+                self._local.last_used = time.monotonic()
+                self._note_writes(conn, changes_before)
+            return
+        conn = self._borrow()
+        self._local.borrowed = conn
+        changes_before = conn.total_changes
+        broken = False
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            broken = not self._is_healthy(conn, 0.0)
+            raise
+        finally:
+            self._local.borrowed = None
+            self._note_writes(conn, changes_before)
+            self._give_back(conn, broken)
+
+    def close_all(self):
+        """إغلاق جميع الاتصالات عند إنهاء البرنامج"""
+        self._closed = True
+        with self._lock:
+            connections = list(self._all_connections)
+            self._all_connections.clear()
+        for conn in connections:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.close()
+            except sqlite3.Error:
+                pass
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        self._local = threading.local()
+
+    def reopen(self):
+        """إعادة تفعيل المجمع بعد إغلاقه (مثلاً بعد استعادة نسخة احتياطية)"""
+        self.close_all()
+        self._closed = False
+        # الملف الجديد قد يكون من إصدار مخطط أقدم، فيُجهز مع أول استعلام
+        self._opened = self.on_open is None
+
+    def replace_contents(self, replace):
+        """تنفيذ replace() الذي يستبدل محتوى الملف والاتصالات مفتوحة، ثم تجهيزه مع أول استعلام
+
+        استعلامات الخيوط الأخرى تنتظر في ensure_open حتى ينتهي الاستبدال، واستعلامات replace نفسها تمر.
+        """
+        with self._open_lock:
+            self._opening = True
+            try:
+                replace()
+            finally:
+                self._opened = self.on_open is None
+                self._opening = False
+
+
+class LookupCache:
+    """جداول الموظفين والتصنيفات في الذاكرة (الاسم ↔ الرقم) تُحمل مرة واحدة حتى إبطالها
+
+    تُبطل تلقائياً من دوال الكتابة على الموظفين والتصنيفات في DatabaseManager،
+    وتشترك فيها كل النوافذ عبر enhanced_db.lookups.
+    """
+
+    def __init__(self, query):
+        self._query = query
+        self._lock = threading.Lock()
+        self._employees = None
+        self._categories = None
+
+    def invalidate(self):
+        """إبطال الجداول المخزنة (تُعاد قراءتها عند أول طلب)"""
+        with self._lock:
+            self._employees = None
+            self._categories = None
+
+    def _load_employees(self):
+        with self._lock:
+            data = self._employees
+        if data is None:
+            rows = self._query("SELECT id, name, position, is_active FROM employees ORDER BY name")
+            data = {
+                'all': [(row[0], row[1], row[2]) for row in rows],
+                'active': [(row[0], row[1], row[2]) for row in rows if row[3]],
+                'ids': {row[1]: row[0] for row in rows},
+                'names': {row[0]: row[1] for row in rows},
+            }
+            # execute_query ترجع قائمة فارغة عند الخطأ فلا تُخزن النتيجة الفارغة
+            if rows:
+                with self._lock:
+                    self._employees = data
+        return data
+
+    def _load_categories(self):
+        with self._lock:
+            data = self._categories
+        if data is None:
+            rows = self._query("SELECT id, category_name, color_code FROM issue_categories ORDER BY category_name")
+            data = {
+                'all': [tuple(row) for row in rows],
+                'ids': {row[1]: row[0] for row in rows},
+                'names': {row[0]: row[1] for row in rows},
+                'colors': {row[0]: row[2] for row in rows},
+            }
+            if rows:
+                with self._lock:
+                    self._categories = data
+        return data
+
+    def employees(self, active_only=True):
+        """قائمة الموظفين (id, name, position) مرتبة بالاسم"""
+        return list(self._load_employees()['active' if active_only else 'all'])
+
+    def employee_id(self, name, default=None):
+        """رقم الموظف من اسمه"""
+        return self._load_employees()['ids'].get(name, default)
+
+    def employee_name(self, employee_id, default=None):
+        """اسم الموظف من رقمه"""
+        return self._load_employees()['names'].get(employee_id, default)
+
+    def categories(self):
+        """قائمة التصنيفات (id, category_name, color_code) مرتبة بالاسم"""
+        return list(self._load_categories()['all'])
+
+    def category_id(self, name, default=None):
+        """رقم التصنيف من اسمه"""
+        return self._load_categories()['ids'].get(name, default)
+
+    def category_name(self, category_id, default=None):
+        """اسم التصنيف من رقمه"""
+        return self._load_categories()['names'].get(category_id, default)
+
+    def category_color(self, category_id, default=None):
+        """لون التصنيف من رقمه"""
+        return self._load_categories()['colors'].get(category_id, default)
+
+
+class SearchResultCache:
+    """ذاكرة LRU لنتائج search_cases: المفتاح (نوع البحث، القيمة، السنة، حقل التاريخ)
+
+    كل نتيجة موسومة بإصدار البيانات وقت قراءتها، والنتيجة بإصدار قديم تُحذف عند طلبها (أي كتابة
+    تبطلها). الحجم محدود بعدد النتائج وبحجم تقريبي للصفوف المخزنة معاً.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @staticmethod
+    def approximate_size(rows):
+        """حجم تقريبي لقائمة صفوف (dicts) بالبايت: النصوص مع تكلفة ثابتة لكل صف وقيمة"""
+        size = 0
+        for row in rows:
+            size += 64 + 16 * len(row)
+            for value in row.values():
+                if isinstance(value, str):
+                    size += len(value) * 2
+        return size
+
+    def get(self, key, version):
+        """النتيجة المخزنة إذا كانت بنفس الإصدار، وإلا None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != version:
+                self._drop(key)
+                self.stale += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, rows):
+        size = self.approximate_size(rows)
+        # نتيجة أكبر من نصف الحد تطرد كل ما عداها، فلا تُخزن
+        if size > self.max_bytes // 2:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, rows, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        self.bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """إحصاءات الذاكرة: الإصابات والإخفاقات والنتائج القديمة والمطرودة والحجم الحالي"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# فهرس النص الكامل للبحث الشامل: صف لكل حالة (rowid = رقم الحالة)
+# ويضم نصوص المراسلات وأوصاف المرفقات مجمعة لتجنب ضرب الصفوف بـ JOIN،
+# والنصوص تُخزن بعد توحيدها بـ ar_normalize ليطابقها نص البحث الموحد.
+# مشغلات إدخال الحالات تتخطى الصفوف التي حسب كاتبها الأعمدة المشتقة مسبقاً
+# (الإدخال الجماعي) لأنه يفهرسها بنفسه دفعة واحدة
+SEARCH_INDEX_COLUMNS = (
+    'customer_name', 'subscriber_number', 'address', 'problem_description',
+    'actions_taken', 'correspondences', 'attachments',
+)
+
+# مقسم الثلاثيات يطابق أي جزء من النص بطول ثلاثة حروف فأكثر (مثل LIKE '%نص%')؛ الكلمات الأقصر
+# تُبحث بـ LIKE على أعمدة الفهرس نفسه
+SEARCH_INDEX_TOKENIZER = 'trigram'
+SEARCH_INDEX_MIN_TOKEN = 3
+
+SEARCH_INDEX_ROW_SQL = """
+    SELECT c.id, ar_normalize(c.customer_name), ar_normalize(c.subscriber_number), ar_normalize(c.address),
+           ar_normalize(c.problem_description), ar_normalize(c.actions_taken),
+           ar_normalize((SELECT group_concat(co.message_content, ' ') FROM correspondences co WHERE co.case_id = c.id)),
+           ar_normalize((SELECT group_concat(a.description, ' ') FROM attachments a WHERE a.case_id = c.id))
+    FROM cases c
+"""
+
+SEARCH_INDEX_TRIGGERS = {
+    'trg_cases_fts_insert': """
+        CREATE TRIGGER IF NOT EXISTS trg_cases_fts_insert AFTER INSERT ON cases
+        WHEN NEW.customer_name_norm IS NULL BEGIN
+            INSERT INTO cases_fts (rowid, customer_name, subscriber_number, address, problem_description, actions_taken, correspondences, attachments)
+            VALUES (NEW.id, ar_normalize(NEW.customer_name), ar_normalize(NEW.subscriber_number), ar_normalize(NEW.address),
+                    ar_normalize(NEW.problem_description), ar_normalize(NEW.actions_taken), NULL, NULL);
+        END
+    """,
+    'trg_cases_fts_update': """
+        CREATE TRIGGER IF NOT EXISTS trg_cases_fts_update
+        AFTER UPDATE OF customer_name, subscriber_number, address, problem_description, actions_taken ON cases BEGIN
+            DELETE FROM cases_fts WHERE rowid = OLD.id;
+            INSERT INTO cases_fts (rowid, customer_name, subscriber_number, address, problem_description, actions_taken, correspondences, attachments)
+            """ + SEARCH_INDEX_ROW_SQL + """ WHERE c.id = NEW.id;
+        END
+    """,
+    'trg_cases_fts_delete': """
+        CREATE TRIGGER IF NOT EXISTS trg_cases_fts_delete AFTER DELETE ON cases BEGIN
+            DELETE FROM cases_fts WHERE rowid = OLD.id;
+        END
+    """,
+}
+# (الجدول الفرعي، عمود الفهرس، عمود النص)
+SEARCH_INDEX_CHILD_SOURCES = (
+    ('correspondences', 'correspondences', 'message_content'),
+    ('attachments', 'attachments', 'description'),
+)
+for _table, _column, _source in SEARCH_INDEX_CHILD_SOURCES:
+    for _event, _ref in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        _guard = " WHEN NOT bulk_loading()" if _event == 'INSERT' else ""
+        SEARCH_INDEX_TRIGGERS[f'trg_{_table}_fts_{_event.lower()}'] = f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{_table}_fts_{_event.lower()} AFTER {_event} ON {_table}{_guard} BEGIN
+                UPDATE cases_fts
+                SET {_column} = ar_normalize((SELECT group_concat(x.{_source}, ' ') FROM {_table} x WHERE x.case_id = {_ref}.case_id))
+                WHERE rowid = {_ref}.case_id;
+            END
+        """
+
+
+# أعمدة الظل الموحدة للبحث بالحقول المحددة، تُحسب عند الكتابة بمشغلات
+NORMALIZED_COLUMNS = {
+    'customer_name': 'customer_name_norm',
+    'subscriber_number': 'subscriber_number_norm',
+    'address': 'address_norm',
+}
+
+_NORMALIZED_ASSIGNMENTS = ', '.join(f"{norm} = ar_normalize(NEW.{column})" for column, norm in NORMALIZED_COLUMNS.items())
+NORMALIZED_COLUMN_TRIGGERS = {
+    'trg_cases_norm_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cases_norm_insert AFTER INSERT ON cases
+        WHEN NEW.customer_name_norm IS NULL BEGIN
+            UPDATE cases SET {_NORMALIZED_ASSIGNMENTS} WHERE id = NEW.id;
+        END
+    """,
+    'trg_cases_norm_update': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cases_norm_update
+        AFTER UPDATE OF {', '.join(NORMALIZED_COLUMNS)} ON cases BEGIN
+            UPDATE cases SET {_NORMALIZED_ASSIGNMENTS} WHERE id = NEW.id;
+        END
+    """,
+}
+
+
+# الحالات بدون تاريخ تعديل تأخذ تاريخ إنشائها حتى تظهر في الترقيم بالمفتاح (modified_date, id)
+CASE_DEFAULT_TRIGGERS = {
+    'trg_cases_modified_default': """
+        CREATE TRIGGER IF NOT EXISTS trg_cases_modified_default AFTER INSERT ON cases
+        WHEN NEW.modified_date IS NULL BEGIN
+            UPDATE cases SET modified_date = COALESCE(NEW.created_date, NEW.received_date, datetime('now', 'localtime'))
+            WHERE id = NEW.id;
+        END
+    """,
+}
+
+# مفاتيح تاريخ رقمية (ثوانٍ منذ 1970) تُحسب عند الكتابة حتى تُخدم فلاتر السنة والمدى من الفهارس
+DATE_KEY_COLUMNS = {
+    'created_date': 'created_ts',
+    'received_date': 'received_ts',
+    'modified_date': 'modified_ts',
+    'solved_date': 'solved_ts',
+}
+# أعمدة سنة مولدة (VIRTUAL) من المفاتيح الرقمية لقوائم السنوات
+DATE_YEAR_COLUMNS = {
+    'created_year': 'created_ts',
+    'received_year': 'received_ts',
+}
+
+_DATE_KEY_ASSIGNMENTS = ', '.join(
+    f"{key} = CAST(strftime('%s', NEW.{column}) AS INTEGER)" for column, key in DATE_KEY_COLUMNS.items()
+)
+DATE_KEY_TRIGGERS = {
+    'trg_cases_date_keys_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cases_date_keys_insert AFTER INSERT ON cases
+        WHEN NEW.modified_ts IS NULL BEGIN
+            UPDATE cases SET {_DATE_KEY_ASSIGNMENTS} WHERE id = NEW.id;
+        END
+    """,
+    'trg_cases_date_keys_update': f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cases_date_keys_update
+        AFTER UPDATE OF {', '.join(DATE_KEY_COLUMNS)} ON cases BEGIN
+            UPDATE cases SET {_DATE_KEY_ASSIGNMENTS} WHERE id = NEW.id;
+        END
+    """,
+}
+
+
+# سجل التغييرات: كل كتابة على الحالات وما يتبعها تضيف صفاً بتسلسل متزايد (seq) حتى تسحب النوافذ
+# الأخرى الحالات المتغيرة فقط منذ آخر تسلسل رأته. (الجدول، عمود رقم الحالة)
+CHANGE_LOG_SOURCES = (
+    ('cases', 'id'),
+    ('correspondences', 'case_id'),
+    ('attachments', 'case_id'),
+    ('audit_log', 'case_id'),
+)
+CHANGE_LOG_TRIGGERS = {}
+for _table, _case_column in CHANGE_LOG_SOURCES:
+    for _event, _ref, _op in (('INSERT', 'NEW', 'I'), ('UPDATE', 'NEW', 'U'), ('DELETE', 'OLD', 'D')):
+        # الإدخال الجماعي يسجل كل دفعة بجملة واحدة (انظر _bulk_insert)، والتكرار المتتالي لنفس
+        # التغيير (مثل تحديثات الأعمدة المشتقة بعد تعديل الحالة) يُسجل مرة واحدة
+        _guard = " WHEN NOT bulk_loading()" if _event == 'INSERT' else ""
+        CHANGE_LOG_TRIGGERS[f'trg_{_table}_change_{_event.lower()}'] = f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{_table}_change_{_event.lower()} AFTER {_event} ON {_table}{_guard} BEGIN
+                INSERT INTO change_log (source, case_id, op)
+                SELECT '{_table}', {_ref}.{_case_column}, '{_op}'
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM change_log
+                    WHERE seq = (SELECT MAX(seq) FROM change_log)
+                      AND source = '{_table}' AND case_id IS {_ref}.{_case_column} AND op = '{_op}'
+                );
+            END
+        """
+# ما تغير منذ تسلسل معين: أرقام الحالات المضافة أو المعدلة والمحذوفة وآخر تسلسل،
+# وcomplete = False إذا فات السجل ما لم يعد محفوظاً (يلزم عندها تحديث كامل)
+ChangeBatch = namedtuple('ChangeBatch', ['last_seq', 'changed', 'removed', 'complete'])
+# أقصى عدد صفوف تُقرأ في دفعة واحدة قبل اللجوء للتحديث الكامل، ومدة الاحتفاظ بالسجل، وفترة المراقبة
+CHANGE_FEED_LIMIT = 5000
+CHANGE_LOG_RETENTION_DAYS = 7
+CHANGE_POLL_INTERVAL = 1.0
+
+# حدود ذاكرة نتائج البحث: عدد النتائج المخزنة وحجمها التقريبي الكلي
+SEARCH_CACHE_SIZE = 64
+SEARCH_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# أنواع البحث التي تُقارن بالنص الموحد، فالقيم المتطابقة بعد التوحيد تشترك في نتيجة واحدة
+NORMALIZED_SEARCH_FIELDS = ("شامل", "اسم العميل", "رقم المشترك", "العنوان")
+
+
+def year_bounds(year):
+    """مدى مفاتيح التاريخ لسنة كاملة [بداية السنة، بداية السنة التالية)"""
+    year = int(year)
+    return calendar.timegm((year, 1, 1, 0, 0, 0)), calendar.timegm((year + 1, 1, 1, 0, 0, 0))
+
+
+# قائمة الحالات: حجم الصفحة الافتراضي وأعمدة كل صف والحالات المنتهية
+CASES_PAGE_SIZE = 100
+CASE_LIST_COLUMNS = ['id', 'customer_name', 'customer_address', 'subscriber_number', 'status', 'category_name', 'color_code', 'modified_by_name', 'received_date', 'created_date', 'modified_date']
+CLOSED_STATUSES = ('تم حلها', 'مغلقة')
+CASE_LIST_SELECT = """
+    SELECT c.id, c.customer_name, c.address, c.subscriber_number, c.status,
+           ic.category_name, ic.color_code, e.name as modified_by_name,
+           c.received_date, c.created_date, c.modified_date
+    FROM cases c
+    LEFT JOIN issue_categories ic ON c.category_id = ic.id
+    LEFT JOIN employees e ON c.modified_by = e.id
+"""
+
+
+# الفلاتر المركبة (filter_cases): شجرة شروط بصيغة قوائم قابلة للحفظ كـ JSON
+#   عقدة: ["and", شرط, شرط, ...] أو ["or", ...]
+#   شرط: [الحقل, العملية, القيمة...] مثل ["status", "in", ["جديدة", "قيد التنفيذ"]]،
+#        ["debt_amount", ">", 1000]، ["created_date", "year", 2025]، ["received_date", "between", "2025-01-01", "2025-03-31"]
+# الحقل ← (العمود المفهرس، النوع)؛ حقول التاريخ تُقارن بمفاتيحها الرقمية والنصوص بأعمدتها الموحدة
+FILTER_FIELDS = {
+    'status': ('c.status', 'value'),
+    'category_id': ('c.category_id', 'value'),
+    'modified_by': ('c.modified_by', 'value'),
+    'created_by': ('c.created_by', 'value'),
+    'solved_by': ('c.solved_by', 'value'),
+    'debt_amount': ('c.debt_amount', 'number'),
+    'created_date': ('c.created_ts', 'date'),
+    'received_date': ('c.received_ts', 'date'),
+    'modified_date': ('c.modified_ts', 'date'),
+    'solved_date': ('c.solved_ts', 'date'),
+    'customer_name': ('c.customer_name_norm', 'text'),
+    'subscriber_number': ('c.subscriber_number_norm', 'text'),
+    'address': ('c.address_norm', 'text'),
+}
+# العمليات المسموحة لكل نوع حقل
+FILTER_OPERATORS = {
+    'value': ('=', '!=', 'in', 'not in'),
+    'number': ('=', '!=', '<', '<=', '>', '>=', 'between'),
+    'date': ('<', '<=', '>', '>=', 'between', 'year'),
+    'text': ('=', 'contains'),
+}
+FILTER_SQL_CACHE_SIZE = 256
+# أوجه get_facets: اسم الوجه ← عمود التجميع (وجه السنة يتبع حقل التاريخ)
+FACET_COLUMNS = {
+    'status': 'c.status',
+    'category': 'c.category_id',
+    'employee': 'c.modified_by',
+}
+FACET_YEAR_COLUMNS = {'created_date': 'c.created_year', 'received_date': 'c.received_year'}
+
+
+def _filter_date_key(value, end_of_day=False):
+    """مفتاح تاريخ لشرط فلتر؛ التاريخ بدون وقت كحد أعلى يشمل اليوم كله"""
+    key = date_key(value)
+    if key is None:
+        raise ValueError(f"تاريخ غير صالح في الفلتر: {value}")
+    if end_of_day and len(str(value).strip()) == 10:
+        key += 86399
+    return key
+
+
+def filter_shape(tree):
+    """شكل شجرة الفلتر بدون القيم (مفتاح ذاكرة الجمل المترجمة) مع التحقق من صحتها"""
+    if not isinstance(tree, (list, tuple)) or not tree:
+        raise ValueError(f"شرط فلتر غير صالح: {tree!r}")
+    if tree[0] in ('and', 'or'):
+        return (tree[0],) + tuple(filter_shape(child) for child in tree[1:])
+    field, op = tree[0], tree[1] if len(tree) > 1 else None
+    if field not in FILTER_FIELDS:
+        raise ValueError(f"حقل غير معروف في الفلتر: {field}")
+    kind = FILTER_FIELDS[field][1]
+    if op not in FILTER_OPERATORS[kind]:
+        raise ValueError(f"العملية {op} غير مدعومة للحقل {field}")
+    expected = 3 if op == 'between' else 2
+    if len(tree) != expected + 1:
+        raise ValueError(f"عدد قيم غير صحيح في شرط الفلتر: {tree!r}")
+    if op in ('in', 'not in') and not isinstance(tree[2], (list, tuple)):
+        # النص أيضاً له len ويُمرر حرفاً حرفاً كمعاملات
+        raise ValueError(f"قيمة {op} في الفلتر يجب أن تكون قائمة: {tree!r}")
+    # قوائم IN تختلف جملتها بعدد عناصرها فقط
+    return (field, op, len(tree[2]) if op in ('in', 'not in') else 0)
+
+
+@lru_cache(maxsize=FILTER_SQL_CACHE_SIZE)
+def filter_shape_sql(shape):
+    """جملة WHERE بمعاملات ? لشكل فلتر (مخزنة لكل شكل، ونفس النص يعيد استخدام الجملة المجهزة في SQLite)"""
+    if shape[0] in ('and', 'or'):
+        parts = [filter_shape_sql(child) for child in shape[1:]]
+        if not parts:
+            return '1' if shape[0] == 'and' else '0'
+        return '(' + f' {shape[0].upper()} '.join(parts) + ')'
+    field, op, count = shape
+    column = FILTER_FIELDS[field][0]
+    if op in ('in', 'not in'):
+        if not count:
+            return '0' if op == 'in' else '1'
+        return f"{column} {op.upper()} ({', '.join('?' * count)})"
+    if op == 'between':
+        return f"({column} >= ? AND {column} <= ?)"
+    if op == 'year':
+        return f"({column} >= ? AND {column} < ?)"
+    if op == 'contains':
+        return f"{column} LIKE ?"
+    return f"{column} {op} ?"
+
+
+def _filter_params(tree, params):
+    """قيم معاملات شجرة الفلتر بنفس ترتيب علامات ? في filter_shape_sql"""
+    if tree[0] in ('and', 'or'):
+        for child in tree[1:]:
+            _filter_params(child, params)
+        return params
+    field, op, values = tree[0], tree[1], list(tree[2:])
+    kind = FILTER_FIELDS[field][1]
+    if op in ('in', 'not in'):
+        params.extend(values[0])
+    elif op == 'year':
+        params.extend(year_bounds(values[0]))
+    elif kind == 'date':
+        if op == 'between':
+            params.extend((_filter_date_key(values[0]), _filter_date_key(values[1], end_of_day=True)))
+        else:
+            params.append(_filter_date_key(values[0], end_of_day=op in ('<=', '>')))
+    elif kind == 'text':
+        value = normalize_arabic(values[0])
+        params.append(f"%{value}%" if op == 'contains' else value)
+    elif kind == 'number':
+        params.extend(float(value) for value in values)
+    else:
+        params.extend(values)
+    return params
+
+
+def compile_filter(tree):
+    """ترجمة شجرة فلتر إلى (جملة WHERE، المعاملات)؛ ترفع ValueError للشجرة غير الصالحة"""
+    return filter_shape_sql(filter_shape(tree)), _filter_params(tree, [])
+
+
+# أعمدة الإدخال الجماعي بترتيب جمل INSERT
+CASE_FIELDS = (
+    'customer_name', 'subscriber_number', 'phone', 'address', 'category_id', 'status',
+    'problem_description', 'actions_taken', 'last_meter_reading', 'last_reading_date',
+    'debt_amount', 'received_date', 'created_date', 'created_by', 'modified_date', 'modified_by',
+    'solved_by', 'solved_date',
+)
+CORRESPONDENCE_FIELDS = (
+    'case_id', 'case_sequence_number', 'yearly_sequence_number', 'sender',
+    'message_content', 'sent_date', 'created_by', 'created_date',
+)
+# كل ما تعرضه تبويبات الحالة مقروءاً في معاملة قراءة واحدة (انظر get_case_bundle):
+# case قاموس تفاصيل الحالة، والباقي قوائم قواميس، وaudit_has_more يعني وجود سجلات أقدم من الصفحة الأولى
+CaseBundle = namedtuple('CaseBundle', ['case', 'attachments', 'correspondences', 'audit_log', 'audit_has_more'])
+# أجزاء الحزمة التي يمكن طلب بعضها فقط (parts)؛ الجزء غير المطلوب قيمته None في الحزمة
+CASE_BUNDLE_PARTS = ('attachments', 'correspondences', 'audit_log')
+CASE_AUDIT_PAGE_SIZE = 50
+# أقصى عدد لحزم الحالات في ذاكرة LRU (يكفي نافذة الجلب المسبق حول الحالة المعروضة مع هامش للرجوع)
+CASE_BUNDLE_CACHE_SIZE = 128
+
+# تفاصيل حالة واحدة مع أسماء التصنيف والموظفين (get_case_details وget_case_bundle)
+CASE_DETAILS_QUERY = """
+    SELECT c.*, ic.category_name, ic.color_code,
+           creator.name as created_by_name,
+           modifier.name as modified_by_name,
+           solver.name as solved_by_name
+    FROM cases c
+    LEFT JOIN issue_categories ic ON c.category_id = ic.id
+    LEFT JOIN employees creator ON c.created_by = creator.id
+    LEFT JOIN employees modifier ON c.modified_by = modifier.id
+    LEFT JOIN employees solver ON c.solved_by = solver.id
+    WHERE c.id = ?
+"""
+
+# أسماء عدادات ترقيم المراسلات في جدول sequences: case:<رقم الحالة> وyear:<السنة>
+CASE_SEQUENCE_PREFIX = 'case:'
+YEAR_SEQUENCE_PREFIX = 'year:'
+
+ATTACHMENT_FIELDS = (
+    'case_id', 'file_name', 'file_path', 'file_type', 'description', 'upload_date', 'uploaded_by',
+)
+
+
+# سجل الفهارس الثانوية: (اسم الفهرس، الجدول، الأعمدة، مسار الوصول الذي يخدمه)
+CASE_INDEXES = [
+    ('idx_correspondences_case', 'correspondences', ('case_id', 'sent_date'), 'get_case_correspondences'),
+    ('idx_attachments_case', 'attachments', ('case_id', 'upload_date'), 'get_case_attachments'),
+    ('idx_audit_log_case', 'audit_log', ('case_id', 'timestamp'), 'get_case_audit_log'),
+    ('idx_cases_modified', 'cases', ('modified_date', 'id'), 'get_cases_page / get_cases_by_year / get_all_cases'),
+    ('idx_cases_status', 'cases', ('status',), 'search_cases: حالة المشكلة'),
+    ('idx_cases_category', 'cases', ('category_id',), 'search_cases: تصنيف المشكلة'),
+    ('idx_cases_modified_by', 'cases', ('modified_by',), 'search_cases: اسم الموظف'),
+    ('idx_cases_created_ts', 'cases', ('created_ts',), 'فلتر السنة/المدى: تاريخ الإدخال'),
+    ('idx_cases_received_ts', 'cases', ('received_ts',), 'فلتر السنة/المدى: تاريخ الورود'),
+    ('idx_cases_modified_ts', 'cases', ('modified_ts',), 'فلتر المدى: آخر تعديل'),
+    ('idx_cases_solved_ts', 'cases', ('solved_ts',), 'فلتر المدى: تاريخ الحل'),
+    ('idx_cases_created_year', 'cases', ('created_year',), 'get_case_years: تاريخ الإدخال'),
+    ('idx_cases_received_year', 'cases', ('received_year',), 'get_case_years: تاريخ الورود'),
+    ('idx_cases_subscriber', 'cases', ('subscriber_number',), 'البحث برقم المشترك'),
+    ('idx_cases_facets', 'cases', ('status', 'category_id', 'modified_by', 'created_year', 'received_year'),
+     'get_facets: فهرس مغطٍ لعدادات الأوجه بدون قراءة صفوف الحالات'),
+]
+
+
+# جدول الموظفين بشكله الحالي (يُستخدم أيضاً لإعادة بناء الجداول القديمة في ترحيل أرقام الأداء)
+EMPLOYEES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        position TEXT,
+        performance_number INTEGER UNIQUE NOT NULL,
+        created_date TEXT,
+        is_active INTEGER DEFAULT 1
+    )
+'''
+# الموظفون الافتراضيون لقاعدة بيانات جديدة (الاسم، الوظيفة، رقم الأداء)
+DEFAULT_EMPLOYEES = [
+    ('مدير النظام', 'مدير', 1001),
+    ('أحمد محمد', 'موظف خدمة عملاء', 1002),
+    ('فاطمة علي', 'مهندس صيانة', 1003),
+    ('محمد حسن', 'فني أول', 1004),
+]
+
+# ترحيلات المخطط المرقمة: (الإصدار، الوصف، دالة الترحيل في DatabaseManager). الإصدار المطبق محفوظ
+# في PRAGMA user_version، والترحيلات الجديدة تُضاف في آخر القائمة فقط ولا يُعدل ترحيل سابق؛
+# تغيير تعريف مشغل أو فهرس مسجل يحتاج ترحيلاً جديداً يعيد مزامنته (sync_triggers / _sync_indexes)
+SCHEMA_MIGRATIONS = [
+    (1, 'الجداول الأساسية والتصنيفات الافتراضية', '_migrate_base_schema'),
+    (2, 'أرقام أداء الموظفين ومستخدم admin', '_migrate_employee_numbers'),
+    (3, 'أعمدة received_date وperformed_by_name', '_migrate_case_columns'),
+    (4, 'تاريخ التعديل الافتراضي للحالات', '_migrate_modified_date'),
+    (5, 'أعمدة البحث الموحدة', '_migrate_normalized_columns'),
+    (6, 'مفاتيح التاريخ وأعمدة السنة', '_migrate_date_keys'),
+    (7, 'عدادات ترقيم المراسلات', '_migrate_sequences'),
+    (8, 'الفهارس الثانوية', '_migrate_indexes'),
+    (9, 'فهرس البحث الشامل (FTS5)', '_migrate_search_index'),
+    (10, 'سجل التغييرات', '_migrate_change_log'),
+    (11, 'فهرس البحث الشامل بالثلاثيات (trigram)', '_migrate_search_index_trigram'),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+
+class DataVersionWatcher:
+    """خيط يراقب PRAGMA data_version باتصال مخصص ويستدعي on_change عند كتابة أي اتصال آخر
+
+    الاتصال المخصص لا يكتب أبداً، فتغير data_version يعني أن اتصالاً آخر (من هذا البرنامج أو من
+    نسخة أخرى تعمل على نفس الملف) أنهى معاملة كتابة؛ الفحص نفسه لا يقرأ أي صفحة من الملف.
+    """
+
+    def __init__(self, db_name, on_change, interval=CHANGE_POLL_INTERVAL):
+        self.db_name = db_name
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # الإصدار الأول يُقرأ قبل بدء الخيط حتى لا تفوت كتابة تتم بعد عودة start مباشرة
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        self._thread = threading.Thread(target=self._run, args=(conn, version), name='data-version-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, conn, version):
+        try:
+            while not self._stop.wait(self.interval):
+                current = conn.execute("PRAGMA data_version").fetchone()[0]
+                if current == version:
+                    continue
+                version = current
+                try:
+                    self.on_change()
+                except Exception as e:
+                    print(f"خطأ في معالجة تغييرات قاعدة البيانات: {e}")
+        except sqlite3.Error as e:
+            print(f"توقفت مراقبة تغييرات قاعدة البيانات: {e}")
+        finally:
+            conn.close()
+
 
 class DatabaseManager:
     def update_correspondence(self, correspondence_id, new_content):
@@ -8,53 +912,205 @@ class DatabaseManager:
         query = "UPDATE correspondences SET message_content = ?, modified_date = ? WHERE id = ?"
         params = (new_content, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), correspondence_id)
         self.execute_query(query, params)
+        self.invalidate_case_bundle()
     def delete_case(self, case_id):
         """حذف حالة وجميع بياناتها المرتبطة (المرفقات، المراسلات، سجل التعديلات)"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
-            # حذف سجل التعديلات
-            cursor.execute("DELETE FROM audit_log WHERE case_id = ?", (case_id,))
-            # حذف المرفقات
-            cursor.execute("DELETE FROM attachments WHERE case_id = ?", (case_id,))
-            # حذف المراسلات
-            cursor.execute("DELETE FROM correspondences WHERE case_id = ?", (case_id,))
-            # حذف الحالة نفسها
-            cursor.execute("DELETE FROM cases WHERE id = ?", (case_id,))
-            conn.commit()
-            return True
-        except Exception as e:
-            conn.rollback()
-            print(f"Error deleting case {case_id}: {e}")
-            return False
-        finally:
-            conn.close()
-    def __init__(self, db_name="customer_issues_enhanced.db"):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # حذف سجل التعديلات
+                cursor.execute("DELETE FROM audit_log WHERE case_id = ?", (case_id,))
+                # حذف المرفقات
+                cursor.execute("DELETE FROM attachments WHERE case_id = ?", (case_id,))
+                # حذف المراسلات
+                cursor.execute("DELETE FROM correspondences WHERE case_id = ?", (case_id,))
+                # حذف الحالة نفسها
+                cursor.execute("DELETE FROM cases WHERE id = ?", (case_id,))
+                conn.commit()
+                self.invalidate_case_bundle(case_id)
+                return True
+            except Exception as e:
+                conn.rollback()
+                print(f"Error deleting case {case_id}: {e}")
+                return False
+    def __init__(self, db_name="customer_issues_enhanced.db", max_connections=4):
         self.db_name = db_name
-        self.init_database()
-    
+        # مجمع اتصالات دائمة بدلاً من فتح ملف قاعدة البيانات مع كل استعلام؛
+        # الملف لا يُفتح ولا تُطبق ترحيلاته إلا مع أول استعلام (أو open())
+        self.pool = ConnectionPool(db_name, max_connections=max_connections, on_open=self.init_database)
+        self._read_cache = {}
+        self._read_lock = threading.Lock()
+        # جداول الموظفين والتصنيفات المشتركة بين النوافذ
+        self.lookups = LookupCache(self.execute_query)
+        # نتائج البحث الأخيرة حتى أول كتابة على قاعدة البيانات
+        self.search_cache = SearchResultCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_MAX_BYTES)
+        # ذاكرة LRU لحزم الحالات وخيط جلب الحالات المجاورة مسبقاً؛ الجيل يزداد مع كل إبطال
+        # حتى لا تُخزن حزمة قُرئت قبل تعديل انتهى أثناء قراءتها
+        self._bundle_cache = OrderedDict()
+        self._bundle_lock = threading.Lock()
+        self._bundle_generation = 0
+        self._prefetch_ids = None
+        self._prefetch_parts = None
+        self._prefetch_event = threading.Event()
+        self._prefetch_thread = None
+        # مراقبة كتابات الاتصالات الأخرى وآخر تسلسل في سجل التغييرات وصلت إليه
+        self._change_watcher = None
+        self._change_watch_args = None
+        self._change_seq = 0
+        # يُعرف وجود فهرس الثلاثيات من ترحيله أو عند أول بحث شامل
+        self._fts_enabled = None
+        self.schema_version = 0
+
+    def open(self):
+        """فتح قاعدة البيانات وتطبيق ترحيلاتها الآن بدلاً من انتظار أول استعلام، ويرجع إصدار المخطط"""
+        self.pool.ensure_open()
+        return self.schema_version
+
     def init_database(self):
-        """إنشاء قاعدة البيانات والجداول المحسنة"""
-        conn = sqlite3.connect(self.db_name)
+        """تطبيق ترحيلات المخطط الناقصة (SCHEMA_MIGRATIONS) ويرجع إصدار المخطط
+
+        الملف المحدث لا يكلف إلا قراءة PRAGMA user_version. كل ترحيل يُطبق مع رفع الإصدار في
+        معاملة واحدة، فالترحيل الفاشل يُتراجع عنه كاملاً ويُعاد في التشغيل التالي.
+        """
+        with self.pool.connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, description, method in SCHEMA_MIGRATIONS:
+            if number <= version:
+                continue
+            try:
+                with self.transaction(immediate=True) as conn:
+                    # نسخة أخرى من البرنامج قد تكون طبقت الترحيل أثناء انتظار قفل الكتابة
+                    current = conn.execute("PRAGMA user_version").fetchone()[0]
+                    if current < number:
+                        getattr(self, method)(conn)
+                        conn.execute(f"PRAGMA user_version = {number}")
+                        print(f"تم ترحيل قاعدة البيانات إلى الإصدار {number}: {description}")
+            except Exception as e:
+                print(f"خطأ في ترحيل قاعدة البيانات إلى الإصدار {number} ({description}): {e}")
+                break
+            version = max(number, current)
+        # يُقرأ هنا لا عند أول حاجة إليه لأن أول حاجة قد تكون داخل معاملة الإدخال الجماعي
+        with self.pool.connection() as conn:
+            self._fts_enabled = self._read_fts_enabled(conn)
+        self.schema_version = version
+        return version
+
+    @property
+    def fts_enabled(self):
+        """هل فهرس البحث الشامل (FTS5 بمقسم الثلاثيات) موجود في الملف (يُفحص مرة واحدة عند أول حاجة إليه)
+
+        فهرس unicode61 القديم لا يطابق أجزاء الكلمات، فإذا بقي (نسخة SQLite بلا trigram) يُبحث بـ LIKE.
+        """
+        if self._fts_enabled is None:
+            with self.pool.connection() as conn:
+                self._fts_enabled = self._read_fts_enabled(conn)
+        return self._fts_enabled
+
+    @staticmethod
+    def _read_fts_enabled(conn):
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'cases_fts'").fetchone()
+        return bool(row) and SEARCH_INDEX_TOKENIZER in (row[0] or '')
+
+    def prune_change_log(self):
+        """حذف صفوف سجل التغييرات الأقدم من مدة الاحتفاظ"""
+        self.execute_query(
+            "DELETE FROM change_log WHERE changed_ts < CAST(strftime('%s', 'now') AS INTEGER) - ?",
+            (CHANGE_LOG_RETENTION_DAYS * 86400,)
+        )
+
+    def rebuild_search_index(self):
+        """إعادة بناء فهرس البحث الشامل بالكامل من جداول الحالات والمراسلات والمرفقات"""
+        if not self.fts_enabled:
+            return False
+        with self.pool.connection() as conn:
+            try:
+                self._fill_search_index(conn)
+                conn.commit()
+                return True
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"خطأ في إعادة بناء فهرس البحث: {e}")
+                return False
+
+    @staticmethod
+    def _fill_search_index(conn):
+        conn.execute("DELETE FROM cases_fts")
+        conn.execute(f"INSERT INTO cases_fts (rowid, {', '.join(SEARCH_INDEX_COLUMNS)}) {SEARCH_INDEX_ROW_SQL}")
+        conn.execute("INSERT INTO cases_fts (cases_fts) VALUES ('optimize')")
+
+    def _index_columns(self, conn, index_name):
+        """أعمدة فهرس موجود بالترتيب (قائمة فارغة إذا لم يكن موجودًا)"""
+        rows = conn.execute(f"PRAGMA index_info({index_name})").fetchall()
+        return tuple(row[2] for row in sorted(rows))
+
+    def ensure_indexes(self):
+        """إنشاء الفهارس المسجلة في CASE_INDEXES وإعادة بناء ما تغير تعريفه"""
+        try:
+            with self.transaction() as conn:
+                return self._sync_indexes(conn)
+        except Exception as e:
+            print(f"خطأ في إنشاء الفهارس: {e}")
+            return []
+
+    def _sync_indexes(self, conn):
+        created = []
+        for name, table, columns, _purpose in CASE_INDEXES:
+            existing = self._index_columns(conn, name)
+            if existing == columns:
+                continue
+            if existing:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+            created.append(name)
+        return created
+
+    def verify_indexes(self):
+        """التحقق من وجود كل فهرس مسجل ومطابقة أعمدته للتعريف"""
+        result = {}
+        with self.pool.connection() as conn:
+            for name, _table, columns, _purpose in CASE_INDEXES:
+                existing = self._index_columns(conn, name)
+                result[name] = bool(existing) and existing == columns
+        return result
+
+    def get_index_report(self):
+        """تقرير بالفهارس المسجلة: الجدول والأعمدة وحالتها ومسار الوصول الذي تخدمه"""
+        status = self.verify_indexes()
+        return [
+            {
+                'name': name,
+                'table': table,
+                'columns': ', '.join(columns),
+                'purpose': purpose,
+                'ok': status.get(name, False),
+            }
+            for name, table, columns, purpose in CASE_INDEXES
+        ]
+
+    def reindex(self, analyze=True):
+        """صيانة الفهارس: إنشاء الناقص ثم REINDEX وتحديث إحصائيات المخطط (ANALYZE)"""
+        self.ensure_indexes()
+        with self.pool.connection() as conn:
+            try:
+                conn.execute("REINDEX")
+                if analyze:
+                    conn.execute("ANALYZE")
+                conn.commit()
+                return True
+            except Exception as e:
+                conn.rollback()
+                print(f"خطأ في صيانة الفهارس: {e}")
+                return False
+
+    # ترحيلات المخطط (انظر SCHEMA_MIGRATIONS): كل ترحيل يستقبل اتصالاً داخل معاملة مفتوحة ولا يثبتها،
+    # ويتحقق مما هو موجود فعلاً لأن قواعد البيانات السابقة لترقيم الإصدارات تبدأ من الإصدار 0
+
+    def _migrate_base_schema(self, conn):
+        """الجداول الأساسية والتصنيفات الافتراضية"""
         cursor = conn.cursor()
         
-        # جدول الموظفين
-        # إضافة عمود رقم الأداء إذا لم يكن موجودًا
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                position TEXT,
-                performance_number TEXT UNIQUE,
-                created_date TEXT,
-                is_active INTEGER DEFAULT 1
-            )
-        ''')
-        # التأكد من وجود العمود في الجداول القديمة (ترقية قاعدة البيانات)
-        try:
-            cursor.execute("ALTER TABLE employees ADD COLUMN performance_number TEXT UNIQUE")
-        except Exception:
-            pass  # العمود موجود بالفعل
+        # جدول الموظفين (رقم الأداء عدد صحيح فريد يُستخدم لتسجيل الدخول)
+        cursor.execute(EMPLOYEES_TABLE_SQL.format(table='employees'))
         
         # جدول تصنيفات المشاكل المحسن
         cursor.execute('''
@@ -144,29 +1200,17 @@ class DatabaseManager:
             )
         ''')
         
-        # إدخال الموظفين الافتراضيين
-        default_employees = [
-            ('مدير النظام', 'مدير'),
-            ('أحمد محمد', 'موظف خدمة عملاء'),
-            ('فاطمة علي', 'مهندس صيانة'),
-            ('محمد حسن', 'فني أول')
-        ]
-        
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for emp_name, position in default_employees:
-            cursor.execute('''
-                INSERT OR IGNORE INTO employees (name, position, created_date)
-                VALUES (?, ?, ?)''', (emp_name, position, current_time))
-        # بعد إدخال الموظفين الافتراضيين، عيّن أرقام أداء وهمية لمن ليس لديهم رقم
-        try:
-            cursor.execute("SELECT id FROM employees WHERE performance_number IS NULL OR performance_number = ''")
-            rows = cursor.fetchall()
-            for idx, (emp_id,) in enumerate(rows, 1):
-                fake_number = f"PERF{emp_id:04d}"
-                cursor.execute("UPDATE employees SET performance_number = ? WHERE id = ?", (fake_number, emp_id))
-            conn.commit()
-        except Exception as e:
-            print(f"خطأ في تعيين أرقام الأداء الوهمية: {e}")
+        # الفلاتر المحفوظة (شجرة الفلتر بصيغة JSON، انظر FILTER_FIELDS)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS saved_filters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL,
+                definition TEXT NOT NULL,
+                created_by INTEGER,
+                created_date TEXT,
+                FOREIGN KEY (created_by) REFERENCES employees (id)
+            )
+        ''')
         
         # إدخال تصنيفات المشاكل المحسنة
         enhanced_categories = [
@@ -182,49 +1226,259 @@ class DatabaseManager:
             ('هدم وازالة', 'طلبات هدم أو إزالة التوصيلات', '#7f8c8d'),
             ('أخرى', 'مشاكل أخرى غير مصنفة', '#95a5a6')
         ]
-        
-        for cat_name, description, color in enhanced_categories:
-            cursor.execute('''
-                INSERT OR IGNORE INTO issue_categories (category_name, description, color_code)
-                VALUES (?, ?, ?)
-            ''', (cat_name, description, color))
-        
-        conn.commit()
-        conn.close()
-        # إضافة الأعمدة الناقصة بعد إنشاء الجداول (للتوافق مع قواعد بيانات قديمة)
-        self.add_missing_columns()
-    
+        cursor.executemany('''
+            INSERT OR IGNORE INTO issue_categories (category_name, description, color_code)
+            VALUES (?, ?, ?)
+        ''', enhanced_categories)
+
+    def _migrate_employee_numbers(self, conn):
+        """أرقام أداء صحيحة فريدة لكل الموظفين، والموظفون الافتراضيون ومستخدم admin (رقم الأداء 1)"""
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(employees)")}
+        if columns.get('performance_number', '').upper() != 'INTEGER':
+            # الجداول القديمة: رقم الأداء نصي أو غير موجود؛ يُعاد بناء الجدول مع الإبقاء على أرقام
+            # الموظفين (تشير إليها الحالات) وتحويل الأرقام الصالحة وترقيم الباقي من 1001
+            old_numbers = 'performance_number' if 'performance_number' in columns else 'NULL'
+            rows = conn.execute(
+                f"SELECT id, name, position, {old_numbers}, created_date, is_active FROM employees ORDER BY id"
+            ).fetchall()
+            conn.execute("DROP TABLE IF EXISTS employees_new")
+            conn.execute(EMPLOYEES_TABLE_SQL.format(table='employees_new'))
+            used_numbers = set()
+            next_number = 1001
+            for emp_id, name, position, number, created_date, is_active in rows:
+                try:
+                    number = int(number)
+                except (TypeError, ValueError):
+                    number = None
+                while number is None or number in used_numbers:
+                    number, next_number = next_number, next_number + 1
+                used_numbers.add(number)
+                conn.execute(
+                    "INSERT INTO employees_new (id, name, position, performance_number, created_date, is_active) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (emp_id, name, position, number, created_date, is_active)
+                )
+            conn.execute("DROP TABLE employees")
+            conn.execute("ALTER TABLE employees_new RENAME TO employees")
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # الموظفون الافتراضيون لقاعدة بيانات جديدة فقط
+        if conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 0:
+            conn.executemany(
+                "INSERT INTO employees (name, position, performance_number, created_date) VALUES (?, ?, ?, ?)",
+                [(name, position, number, current_time) for name, position, number in DEFAULT_EMPLOYEES]
+            )
+        conn.execute("""
+            INSERT INTO employees (name, position, performance_number, created_date, is_active)
+            SELECT 'admin', 'مدير النظام', 1, ?, 1
+            WHERE NOT EXISTS (SELECT 1 FROM employees WHERE performance_number = 1)
+        """, (current_time,))
+
+    def _migrate_case_columns(self, conn):
+        """عمودا received_date في الحالات وperformed_by_name في سجل التعديلات"""
+        for table, column in (('cases', 'received_date'), ('audit_log', 'performed_by_name')):
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+
+    def _migrate_modified_date(self, conn):
+        """تاريخ التعديل مطلوب لترقيم قائمة الحالات: مشغل القيمة الافتراضية وتعبئة الناقص"""
+        sync_triggers(conn, CASE_DEFAULT_TRIGGERS)
+        conn.execute("""
+            UPDATE cases SET modified_date = COALESCE(created_date, received_date, datetime('now', 'localtime'))
+            WHERE modified_date IS NULL OR modified_date = ''
+        """)
+
+    def _migrate_normalized_columns(self, conn):
+        """أعمدة الظل الموحدة للبحث ومشغلات تحديثها"""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(cases)")]
+        for norm in NORMALIZED_COLUMNS.values():
+            if norm not in columns:
+                conn.execute(f"ALTER TABLE cases ADD COLUMN {norm} TEXT")
+        sync_triggers(conn, NORMALIZED_COLUMN_TRIGGERS)
+        assignments = ', '.join(f"{norm} = ar_normalize({column})" for column, norm in NORMALIZED_COLUMNS.items())
+        conn.execute(f"UPDATE cases SET {assignments}")
+
+    def _migrate_date_keys(self, conn):
+        """مفاتيح التاريخ الرقمية وأعمدة السنة المولدة (table_xinfo يعرض الأعمدة المولدة أيضاً)"""
+        columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(cases)")]
+        for key in DATE_KEY_COLUMNS.values():
+            if key not in columns:
+                conn.execute(f"ALTER TABLE cases ADD COLUMN {key} INTEGER")
+        for year_column, key in DATE_YEAR_COLUMNS.items():
+            if year_column not in columns:
+                conn.execute(f"""
+                    ALTER TABLE cases ADD COLUMN {year_column} INTEGER
+                    GENERATED ALWAYS AS (CAST(strftime('%Y', {key}, 'unixepoch') AS INTEGER)) VIRTUAL
+                """)
+        sync_triggers(conn, DATE_KEY_TRIGGERS)
+        conn.execute(f"UPDATE cases SET {_DATE_KEY_ASSIGNMENTS.replace('NEW.', '')}")
+
+    def _migrate_sequences(self, conn):
+        """عدادات ترقيم المراسلات، تبدأ من أكبر الأرقام المستخدمة فعلاً"""
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sequences'").fetchone():
+            return
+        conn.execute("CREATE TABLE sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute(f"""
+            INSERT INTO sequences (name, value)
+            SELECT '{CASE_SEQUENCE_PREFIX}' || case_id, MAX(case_sequence_number)
+            FROM correspondences
+            WHERE case_id IS NOT NULL AND case_sequence_number IS NOT NULL
+            GROUP BY case_id
+        """)
+        conn.execute(f"""
+            INSERT INTO sequences (name, value)
+            SELECT '{YEAR_SEQUENCE_PREFIX}' || SUBSTR(yearly_sequence_number, INSTR(yearly_sequence_number, '-') + 1),
+                   MAX(CAST(SUBSTR(yearly_sequence_number, 1, INSTR(yearly_sequence_number, '-') - 1) AS INTEGER))
+            FROM correspondences
+            WHERE yearly_sequence_number LIKE '%-%'
+            GROUP BY 1
+        """)
+
+    def _migrate_indexes(self, conn):
+        """الفهارس الثانوية المسجلة في CASE_INDEXES"""
+        self._sync_indexes(conn)
+
+    def _migrate_search_index(self, conn):
+        """فهرس النص الكامل للبحث الشامل (FTS5) ومشغلات مزامنته، مبني من البيانات الحالية"""
+        try:
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts USING fts5(
+                    {', '.join(SEARCH_INDEX_COLUMNS)},
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            # نسخة SQLite بدون FTS5: البحث الشامل يعمل بـ LIKE (fts_enabled = False)
+            print(f"تعذر تفعيل فهرس البحث الشامل (FTS5)، سيتم البحث بـ LIKE: {e}")
+            self._fts_enabled = False
+            return
+        sync_triggers(conn, SEARCH_INDEX_TRIGGERS)
+        self._fill_search_index(conn)
+        self._fts_enabled = True
+
+    def _migrate_search_index_trigram(self, conn):
+        """إعادة بناء فهرس البحث الشامل بمقسم الثلاثيات ليطابق أي جزء من الكلمة كما كان LIKE '%نص%'"""
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cases_fts'").fetchone():
+            # لا يوجد FTS5 أصلاً (انظر _migrate_search_index)
+            return
+        try:
+            conn.execute(f"CREATE VIRTUAL TABLE temp.cases_fts_probe USING fts5(x, tokenize = '{SEARCH_INDEX_TOKENIZER}')")
+            conn.execute("DROP TABLE temp.cases_fts_probe")
+        except sqlite3.OperationalError as e:
+            # SQLite أقدم من 3.34: يبقى الفهرس القديم تحدثه المشغلات ويعمل البحث الشامل بـ LIKE
+            print(f"تعذر تفعيل البحث بالثلاثيات (trigram)، سيتم البحث الشامل بـ LIKE: {e}")
+            self._fts_enabled = False
+            return
+        # مشغلات المزامنة تشير إلى الجدول بالاسم فتبقى صالحة بعد إعادة إنشائه
+        conn.execute("DROP TABLE cases_fts")
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE cases_fts USING fts5(
+                {', '.join(SEARCH_INDEX_COLUMNS)},
+                tokenize = '{SEARCH_INDEX_TOKENIZER}'
+            )
+        """)
+        self._fill_search_index(conn)
+        self._fts_enabled = True
+
+    def _migrate_change_log(self, conn):
+        """جدول سجل التغييرات ومشغلاته"""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                case_id INTEGER,
+                op TEXT NOT NULL,
+                changed_ts INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+            )
+        """)
+        sync_triggers(conn, CHANGE_LOG_TRIGGERS)
+
     def get_connection(self):
-        """الحصول على اتصال بقاعدة البيانات"""
-        return sqlite3.connect(self.db_name)
-    
-    def execute_query(self, query, params=None):
-        """تنفيذ استعلام قاعدة بيانات"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        """الحصول على اتصال بقاعدة البيانات من المجمع (يُستخدم مع with)"""
+        return self.pool.connection()
+
+    def close(self):
+        """إغلاق جميع اتصالات قاعدة البيانات (يُستدعى عند إغلاق البرنامج)"""
+        self.stop_watching_changes()
+        self.pool.close_all()
+
+    def reconnect(self):
+        """إعادة فتح الاتصالات بعد استبدال ملف قاعدة البيانات وترحيله فوراً
+
+        يرجع False إذا لم يكتمل ترحيل الملف إلى SCHEMA_VERSION (schema_version يحمل ما وصل إليه)،
+        لأن الاستعلامات اللاحقة تحتاج أعمدة الترحيلات وجداولها.
+        """
+        self.pool.reopen()
+        return self._reload_replaced_file()
+
+    def restore_from(self, backup_path):
+        """استبدال محتوى قاعدة البيانات بنسخة احتياطية دون إغلاق الاتصالات (من خيط عمل) وترحيلها
+
+        النسخ بـ Connection.backup إلى الملف الحي، واستعلامات الخيوط الأخرى تنتظر حتى ينتهي.
+        خطأ قراءة النسخة يُرفع والملف الحالي باقٍ، وما بعد النسخ يرجع مثل reconnect.
+        """
+        def replace():
+            source = sqlite3.connect(backup_path)
+            try:
+                with self.pool.connection() as conn:
+                    source.backup(conn)
+            finally:
+                source.close()
+
+        self.pool.replace_contents(replace)
+        return self._reload_replaced_file()
+
+    def _reload_replaced_file(self):
+        """إبطال ذاكرات الملف السابق وترحيل الملف الجديد فوراً (انظر reconnect)"""
+        self._fts_enabled = None
+        self.lookups.invalidate()
+        self.search_cache.clear()
+        self.invalidate_case_bundle()
+        self.schema_version = 0
+        # الملف المستعاد قد يكون من إصدار مخطط أقدم
         try:
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            result = cursor.fetchall()
-            conn.commit()
-            return result
-        except Exception as e:
-            print(f"خطأ في قاعدة البيانات: {e}")
-            return []
-        finally:
-            conn.close()
+            version = self.open()
+        except sqlite3.Error as e:
+            print(f"خطأ في فتح قاعدة البيانات بعد استبدالها: {e}")
+            return False
+        if version < SCHEMA_VERSION:
+            print(f"لم تكتمل ترحيلات قاعدة البيانات (الإصدار {version} من {SCHEMA_VERSION})")
+            return False
+        # الملف الجديد له سجل تغييرات مختلف، فتبدأ المراقبة من آخر تسلسل فيه
+        if self._change_watch_args is not None:
+            self.watch_changes(*self._change_watch_args)
+        return True
+
+    def execute_query(self, query, params=None):
+        """تنفيذ استعلام قاعدة بيانات
+
+        داخل transaction() لا يثبت ولا يتراجع، والخطأ يُرفع لتتراجع المعاملة الخارجية كلها.
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+
+                result = cursor.fetchall()
+                if not conn.transaction_open:
+                    conn.commit()
+                return result
+            except Exception as e:
+                if conn.transaction_open:
+                    raise
+                if conn.in_transaction:
+                    conn.rollback()
+                print(f"خطأ في قاعدة البيانات: {e}")
+                return []
+            finally:
+                cursor.close()
     
     def get_employees(self, active_only=True):
-        """الحصول على قائمة الموظفين"""
-        query = "SELECT id, name, position FROM employees"
-        if active_only:
-            query += " WHERE is_active = 1"
-        query += " ORDER BY name"
-        return self.execute_query(query)
+        """الحصول على قائمة الموظفين (من ذاكرة الجداول المشتركة)"""
+        return self.lookups.employees(active_only)
     
     def add_employee(self, name, position="موظف", performance_number=None):
         """إضافة موظف جديد مع رقم أداء"""
@@ -236,23 +1490,9 @@ class DatabaseManager:
         except Exception as e:
             print(f"خطأ في إضافة الموظف: {e}")
             return False
-
-    def assign_fake_performance_numbers(self):
-        """تعيين أرقام أداء وهمية للموظفين الذين ليس لديهم رقم أداء"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
-            cursor.execute("SELECT id FROM employees WHERE performance_number IS NULL OR performance_number = ''")
-            rows = cursor.fetchall()
-            for idx, (emp_id,) in enumerate(rows, 1):
-                fake_number = f"PERF{emp_id:04d}"
-                cursor.execute("UPDATE employees SET performance_number = ? WHERE id = ?", (fake_number, emp_id))
-            conn.commit()
-        except Exception as e:
-            print(f"خطأ في تعيين أرقام الأداء الوهمية: {e}")
         finally:
-            conn.close()
-    
+            self.lookups.invalidate()
+
     def delete_employee(self, employee_id):
         """حذف موظف (تعطيل)"""
         query = "UPDATE employees SET is_active = 0 WHERE id = ?"
@@ -261,6 +1501,8 @@ class DatabaseManager:
             return True
         except:
             return False
+        finally:
+            self.lookups.invalidate()
     
     def get_cases_by_year(self, year=None):
         """الحصول على الحالات حسب السنة"""
@@ -272,10 +1514,10 @@ class DatabaseManager:
                 FROM cases c
                 LEFT JOIN issue_categories ic ON c.category_id = ic.id
                 LEFT JOIN employees e ON c.modified_by = e.id
-                WHERE strftime('%Y', c.created_date) = ?
-                ORDER BY c.modified_date DESC, c.created_date DESC
+                WHERE c.created_ts >= ? AND c.created_ts < ?
+                ORDER BY c.modified_date DESC, c.id DESC
             """
-            return self.execute_query(query, (str(year),))
+            return self.execute_query(query, year_bounds(year))
         else:
             query = """
                 SELECT c.id, c.customer_name, c.subscriber_number, c.status, 
@@ -284,47 +1526,309 @@ class DatabaseManager:
                 FROM cases c
                 LEFT JOIN issue_categories ic ON c.category_id = ic.id
                 LEFT JOIN employees e ON c.modified_by = e.id
-                ORDER BY c.modified_date DESC, c.created_date DESC
+                ORDER BY c.modified_date DESC, c.id DESC
             """
             return self.execute_query(query)
     
+    def _case_list_filters(self, year=None, active_only=False):
+        """شروط قائمة الحالات المشتركة بين الترقيم والعد"""
+        where_clauses, params = [], []
+        if year and year != "الكل":
+            where_clauses.append("c.created_ts >= ? AND c.created_ts < ?")
+            params.extend(year_bounds(year))
+        if active_only:
+            where_clauses.append(f"c.status NOT IN ({', '.join('?' * len(CLOSED_STATUSES))})")
+            params.extend(CLOSED_STATUSES)
+        return where_clauses, params
+
+    @staticmethod
+    def _encode_page_cursor(case):
+        """مؤشر الصفحة التالية: آخر (modified_date, id) في الصفحة بصيغة نصية ثابتة"""
+        raw = json.dumps([case['modified_date'], case['id']], ensure_ascii=False)
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_page_cursor(cursor):
+        try:
+            modified_date, case_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            return modified_date, int(case_id)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"مؤشر صفحة غير صالح: {cursor!r}") from e
+
+    def get_cases_page(self, cursor=None, page_size=CASES_PAGE_SIZE, year=None, active_only=False):
+        """صفحة من الحالات مرتبة بآخر تعديل مع ترقيم بالمفتاح (keyset) على (modified_date, id)
+
+        يرجع (قائمة dicts بأعمدة CASE_LIST_COLUMNS، مؤشر الصفحة التالية أو None عند انتهاء النتائج).
+        الصفحة الأولى تُقرأ مراراً (لوحة التحكم والقائمة والتحديث) فتُخزن في search_cache.
+        """
+        if cursor:
+            rows = self._read_cases_page(cursor, page_size, year, active_only)
+        else:
+            key = ('page', page_size, str(year) if year else None, active_only)
+            version = self.data_version()
+            rows = self.search_cache.get(key, version)
+            if rows is None:
+                rows = self._read_cases_page(None, page_size, year, active_only)
+                self.search_cache.put(key, version, rows)
+            # نسخ لأن القوائم تعدل صفوفها في مكانها
+            rows = [dict(row) for row in rows]
+        cases = rows[:page_size]
+        next_cursor = self._encode_page_cursor(cases[-1]) if len(rows) > page_size else None
+        return cases, next_cursor
+
+    def _read_cases_page(self, cursor, page_size, year, active_only):
+        """صفوف الصفحة مع صف إضافي بعدها إن وُجد (انظر get_cases_page)"""
+        where_clauses, params = self._case_list_filters(year, active_only)
+        if cursor:
+            where_clauses.append("(c.modified_date, c.id) < (?, ?)")
+            params.extend(self._decode_page_cursor(cursor))
+        query = f"""
+            {CASE_LIST_SELECT}
+            {"WHERE " + " AND ".join(where_clauses) if where_clauses else ""}
+            ORDER BY c.modified_date DESC, c.id DESC
+            LIMIT ?
+        """
+        # صف إضافي لمعرفة وجود صفحة تالية دون استعلام عد
+        params.append(page_size + 1)
+        return [dict(zip(CASE_LIST_COLUMNS, row)) for row in self.execute_query(query, tuple(params))]
+
+    def warm_caches(self, page_size=CASES_PAGE_SIZE):
+        """قراءة ما تعرضه الشاشات الأولى مسبقاً حتى تأتي من الذاكرة (تُستدعى من خيط خلفي عند بدء التشغيل)
+
+        الموظفون والتصنيفات، وعدادات لوحة التحكم، وسنوات الفلاتر، والصفحة الأولى من لوحة التحكم
+        ومن قائمة الحالات بحجم page_size.
+        """
+        self.lookups.employees()
+        self.lookups.categories()
+        self.get_facets()
+        self.count_cases()
+        for date_field in ('received_date', 'created_date'):
+            self.get_case_years(date_field)
+        self.get_cases_page(active_only=True)
+        self.get_cases_page(page_size=page_size)
+
+    def get_case_list_rows(self, case_ids, year=None, active_only=False):
+        """صفوف قائمة الحالات لحالات محددة {id: dict} (لتحديث القائمة المعروضة بعد حفظ أو حذف)
+
+        الحالات المحذوفة أو التي لم تعد تطابق فلاتر القائمة لا تظهر في النتيجة.
+        """
+        case_ids = list(case_ids)
+        if not case_ids:
+            return {}
+        where_clauses, params = self._case_list_filters(year, active_only)
+        where_clauses.append(f"c.id IN ({', '.join('?' * len(case_ids))})")
+        params.extend(case_ids)
+        query = f"{CASE_LIST_SELECT} WHERE {' AND '.join(where_clauses)}"
+        rows = self.execute_query(query, tuple(params))
+        return {row[0]: dict(zip(CASE_LIST_COLUMNS, row)) for row in rows}
+
+    def iter_cases(self, year=None, active_only=False, page_size=500):
+        """المرور على كل الحالات صفحة بصفحة (للتصدير) دون تحميلها كلها في الذاكرة"""
+        cursor = None
+        while True:
+            cases, cursor = self.get_cases_page(cursor, page_size, year, active_only)
+            yield from cases
+            if cursor is None:
+                return
+
+    def _cached_read(self, key, loader):
+        """نتيجة قراءة مخزنة مؤقتاً حتى أول تعديل على قاعدة البيانات"""
+        version = self.pool.write_version
+        with self._read_lock:
+            entry = self._read_cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        value = loader()
+        with self._read_lock:
+            self._read_cache[key] = (version, value)
+        return value
+
+    def count_cases(self, year=None, active_only=False):
+        """عدد الحالات المطابقة لفلاتر القائمة (مخزن مؤقتاً)"""
+        def load():
+            where_clauses, params = self._case_list_filters(year, active_only)
+            query = "SELECT COUNT(*) FROM cases c"
+            if where_clauses:
+                query += " WHERE " + " AND ".join(where_clauses)
+            rows = self.execute_query(query, tuple(params))
+            return rows[0][0] if rows else 0
+        return self._cached_read(('count', year, active_only), load)
+
+    def get_status_counts(self):
+        """عدد الحالات لكل حالة مشكلة {status: count} (من أوجه كل الحالات المخزنة مؤقتاً)"""
+        return self.get_facets()['status']
+
+    def get_case_years(self, date_field='created_date'):
+        """السنوات الموجودة في حقل التاريخ مرتبة تنازلياً (مخزنة مؤقتاً)"""
+        column = {'created_date': 'created_year', 'received_date': 'received_year'}.get(date_field, 'created_year')
+        def load():
+            rows = self.execute_query(f"SELECT DISTINCT {column} FROM cases WHERE {column} IS NOT NULL ORDER BY 1 DESC")
+            return [str(row[0]) for row in rows]
+        return self._cached_read(('years', column), load)
+
+    def data_version(self):
+        """إصدار البيانات لذاكرات التخزين المؤقت: عداد الكتابات في الذاكرة (pool.write_version) بلا استعلام
+
+        كتابات هذا البرنامج تزيده من المجمع، وكتابات الاتصالات الأخرى من مراقب watch_changes.
+        """
+        return self.pool.write_version
+
     def search_cases(self, search_field, search_value, year=None, date_field='created_date'):
-        """البحث في الحالات مع دعم الفلترة بالسنة ونوع التاريخ (دائماً يرجع قائمة dicts)"""
+        """البحث في الحالات مع دعم الفلترة بالسنة ونوع التاريخ (دائماً يرجع قائمة dicts)
+
+        النتائج مخزنة في search_cache وموسومة بإصدار البيانات، فتكرار نفس البحث بلا كتابة بينهما
+        لا يصل إلى قاعدة البيانات.
+        """
+        value_key = normalize_arabic(search_value) if search_field in NORMALIZED_SEARCH_FIELDS else search_value
+        year_key = str(year) if year and year != "الكل" else None
+        key = (search_field, value_key, year_key, date_field if year_key else None)
+        version = self.data_version()
+        rows = self.search_cache.get(key, version)
+        if rows is None:
+            rows = self._search_cases(search_field, search_value, year, date_field)
+            self.search_cache.put(key, version, rows)
+        # نسخة من القائمة لأن النوافذ ترتبها وتعدلها في مكانها
+        return list(rows)
+
+    def filter_cases(self, tree, limit=None):
+        """الحالات المطابقة لفلتر مركب (انظر FILTER_FIELDS) بأعمدة CASE_LIST_COLUMNS مرتبة بآخر تعديل
+
+        النتائج مخزنة في search_cache مثل نتائج search_cases.
+        """
+        where, params = compile_filter(tree)
+        key = ('filter', json.dumps(tree, ensure_ascii=False), limit)
+        version = self.data_version()
+        rows = self.search_cache.get(key, version)
+        if rows is None:
+            query = f"{CASE_LIST_SELECT} WHERE {where} ORDER BY c.modified_date DESC, c.id DESC"
+            if limit:
+                query += " LIMIT ?"
+                params.append(limit)
+            rows = [dict(zip(CASE_LIST_COLUMNS, row)) for row in self.execute_query(query, tuple(params))]
+            self.search_cache.put(key, version, rows)
+        return list(rows)
+
+    def get_facets(self, tree=None, date_field='created_date'):
+        """عدادات الأوجه للحالات المطابقة لفلتر مركب (أو لكل الحالات إذا كان tree فارغاً)
+
+        ترجع {'total': العدد، 'status': {الحالة: عدد}، 'category': {رقم التصنيف: عدد}،
+        'employee': {رقم الموظف: عدد}، 'year': {السنة: عدد}} من استعلام تجميع واحد على كل
+        التركيبات، ثم تُجمع الأوجه منها (التركيبات قليلة مهما كان عدد الحالات). النتيجة مخزنة في
+        search_cache مثل نتائج filter_cases.
+        """
+        where, params = compile_filter(tree) if tree else ('1', [])
+        year_column = FACET_YEAR_COLUMNS.get(date_field, FACET_YEAR_COLUMNS['created_date'])
+        key = ('facets', json.dumps(tree, ensure_ascii=False) if tree else None, year_column)
+        version = self.data_version()
+        cached = self.search_cache.get(key, version)
+        if cached is None:
+            columns = ', '.join(list(FACET_COLUMNS.values()) + [year_column])
+            rows = self.execute_query(
+                f"SELECT {columns}, COUNT(*) FROM cases c WHERE {where} GROUP BY {columns}", tuple(params)
+            )
+            facets = {'total': 0, 'year': {}}
+            facets.update((name, {}) for name in FACET_COLUMNS)
+            for row in rows:
+                count = row[-1]
+                facets['total'] += count
+                for name, value in zip(list(FACET_COLUMNS) + ['year'], row[:-1]):
+                    if value is not None:
+                        facets[name][value] = facets[name].get(value, 0) + count
+            cached = [facets]
+            self.search_cache.put(key, version, cached)
+        # نسخة لأن المستدعي قد يعدل القواميس
+        return {name: dict(value) if isinstance(value, dict) else value for name, value in cached[0].items()}
+
+    def save_filter(self, name, tree, created_by=None):
+        """حفظ فلتر باسم (يستبدل الفلتر المحفوظ بنفس الاسم)؛ ترفع ValueError للشجرة غير الصالحة"""
+        compile_filter(tree)
+        self.execute_query("""
+            INSERT INTO saved_filters (name, definition, created_by, created_date) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET definition = excluded.definition
+        """, (name, json.dumps(tree, ensure_ascii=False), created_by, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+    def get_saved_filters(self):
+        """الفلاتر المحفوظة [{'id', 'name', 'filter'}] مرتبة بالاسم"""
+        rows = self.execute_query("SELECT id, name, definition FROM saved_filters ORDER BY name")
+        filters = []
+        for filter_id, name, definition in rows:
+            try:
+                filters.append({'id': filter_id, 'name': name, 'filter': json.loads(definition)})
+            except ValueError:
+                print(f"تجاهل فلتر محفوظ تالف: {name}")
+        return filters
+
+    def delete_saved_filter(self, name):
+        """حذف فلتر محفوظ باسمه"""
+        self.execute_query("DELETE FROM saved_filters WHERE name = ?", (name,))
+
+    def get_search_cache_stats(self):
+        """إحصاءات ذاكرة نتائج البحث (انظر SearchResultCache.stats)"""
+        return self.search_cache.stats()
+
+    def _search_cases(self, search_field, search_value, year=None, date_field='created_date'):
+        """تنفيذ البحث على قاعدة البيانات (انظر search_cases)"""
         columns = ['id', 'customer_name', 'subscriber_number', 'status', 'category_name', 'color_code', 'modified_by_name', 'created_date', 'modified_date']
         
         params = []
         where_clauses = []
+        # نص البحث يُوحد مرة واحدة ويُقارن بالصيغ الموحدة المخزنة مسبقاً
+        normalized_value = normalize_arabic(search_value) if search_value else search_value
+
+        # البحث الشامل يمر عبر فهرس النص الكامل (FTS5) مع ترتيب النتائج حسب الصلة
+        use_fts = search_field == "شامل" and bool(search_value) and self.fts_enabled
+        match_expression, short_tokens = self._build_match_expression(search_value) if use_fts else (None, [])
+        if use_fts and not match_expression and not short_tokens:
+            return []
 
         # Base query
-        base_query = """
-            SELECT DISTINCT c.id, c.customer_name, c.subscriber_number, c.status, 
-                   ic.category_name, ic.color_code, e.name as modified_by_name,
-                   c.created_date, c.modified_date
-            FROM cases c
-            LEFT JOIN issue_categories ic ON c.category_id = ic.id
-            LEFT JOIN employees e ON c.modified_by = e.id
-        """
+        if use_fts:
+            base_query = """
+                SELECT c.id, c.customer_name, c.subscriber_number, c.status, 
+                       ic.category_name, ic.color_code, e.name as modified_by_name,
+                       c.created_date, c.modified_date
+                FROM cases_fts
+                JOIN cases c ON c.id = cases_fts.rowid
+                LEFT JOIN issue_categories ic ON c.category_id = ic.id
+                LEFT JOIN employees e ON c.modified_by = e.id
+            """
+            if match_expression:
+                where_clauses.append("cases_fts MATCH ?")
+                params.append(match_expression)
+            for token in short_tokens:
+                where_clauses.append("(" + " OR ".join(f"cases_fts.{column} LIKE ? ESCAPE '\\'" for column in SEARCH_INDEX_COLUMNS) + ")")
+                params.extend([like_contains(token)] * len(SEARCH_INDEX_COLUMNS))
+        else:
+            base_query = """
+                SELECT DISTINCT c.id, c.customer_name, c.subscriber_number, c.status, 
+                       ic.category_name, ic.color_code, e.name as modified_by_name,
+                       c.created_date, c.modified_date
+                FROM cases c
+                LEFT JOIN issue_categories ic ON c.category_id = ic.id
+                LEFT JOIN employees e ON c.modified_by = e.id
+            """
 
-        # Add joins for comprehensive search
-        if search_field == "شامل" and search_value:
+        # Add joins for comprehensive search (عند عدم توفر FTS5 فقط)
+        if search_field == "شامل" and search_value and not use_fts:
             base_query += """
                 LEFT JOIN correspondences co ON c.id = co.case_id
                 LEFT JOIN attachments a ON c.id = a.case_id
             """
 
         # Add search clauses based on search_field and search_value
-        if search_value:
+        if search_value and not use_fts:
             if search_field == "شامل":
-                search_pattern = f"%{search_value}%"
-                where_clauses.append("""(c.customer_name LIKE ? OR c.subscriber_number LIKE ? 
-                   OR c.address LIKE ? OR c.problem_description LIKE ?
-                   OR c.actions_taken LIKE ? OR co.message_content LIKE ?
-                   OR a.description LIKE ?)""")
-                params.extend([search_pattern] * 7)
+                search_pattern = like_contains(normalized_value)
+                search_columns = ('c.customer_name_norm', 'c.subscriber_number_norm', 'c.address_norm',
+                                  'ar_normalize(c.problem_description)', 'ar_normalize(c.actions_taken)',
+                                  'ar_normalize(co.message_content)', 'ar_normalize(a.description)')
+                where_clauses.append("(" + " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in search_columns) + ")")
+                params.extend([search_pattern] * len(search_columns))
             elif search_field in ["اسم العميل", "رقم المشترك", "العنوان"]:
-                field_map = {"اسم العميل": "c.customer_name", "رقم المشترك": "c.subscriber_number", "العنوان": "c.address"}
-                where_clauses.append(f"{field_map[search_field]} LIKE ?")
-                params.append(f"%{search_value}%")
+                field_map = {"اسم العميل": "c.customer_name_norm", "رقم المشترك": "c.subscriber_number_norm", "العنوان": "c.address_norm"}
+                # % و_ حرفية حتى تطابق النتيجة البحث المحلي في TrigramIndex
+                where_clauses.append(f"{field_map[search_field]} LIKE ? ESCAPE '\\'")
+                params.append(like_contains(normalized_value))
             elif search_field in ["تصنيف المشكلة", "حالة المشكلة", "اسم الموظف"]:
                 field_map = {"تصنيف المشكلة": "ic.category_name", "حالة المشكلة": "c.status", "اسم الموظف": "e.name"}
                 where_clauses.append(f"{field_map[search_field]} = ?")
@@ -333,44 +1837,255 @@ class DatabaseManager:
         # Add year filter
         if year and year != "الكل":
             # تحديد حقل التاريخ بناءً على المدخل
-            valid_date_fields = {'created_date': 'c.created_date', 'received_date': 'c.received_date'}
-            date_column = valid_date_fields.get(date_field, 'c.created_date')
-            where_clauses.append(f"strftime('%Y', {date_column}) = ?")
-            params.append(str(year))
+            valid_date_fields = {'created_date': 'c.created_ts', 'received_date': 'c.received_ts'}
+            date_column = valid_date_fields.get(date_field, 'c.created_ts')
+            where_clauses.append(f"{date_column} >= ? AND {date_column} < ?")
+            params.extend(year_bounds(year))
 
         # Construct final query
         query = base_query
         if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
         
-        query += " ORDER BY c.modified_date DESC, c.created_date DESC"
+        if match_expression:
+            # الأوزان بترتيب أعمدة cases_fts: الاسم ورقم المشترك أولاً ثم العنوان ثم بقية النصوص
+            query += " ORDER BY bm25(cases_fts, 10.0, 10.0, 4.0, 2.0, 1.0, 1.0, 1.0), c.modified_date DESC"
+        else:
+            query += " ORDER BY c.modified_date DESC, c.created_date DESC"
 
         rows = self.execute_query(query, tuple(params))
         return [dict(zip(columns, row)) for row in rows]
+
+    def _build_match_expression(self, search_value):
+        """تحويل نص البحث إلى (تعبير MATCH، الكلمات القصيرة)
+
+        كل كلمة موحدة عبارة تطابق أي جزء من النص والكلمات مجتمعة بـ AND؛ الكلمات الأقصر من
+        SEARCH_INDEX_MIN_TOKEN لا يطابقها مقسم الثلاثيات فتُرجع وحدها لتُبحث بـ LIKE.
+        """
+        tokens = tokenize_arabic(search_value)
+        long_tokens = [token for token in tokens if len(token) >= SEARCH_INDEX_MIN_TOKEN]
+        short_tokens = [token for token in tokens if len(token) < SEARCH_INDEX_MIN_TOKEN]
+        return ' '.join(f'"{token}"' for token in long_tokens) or None, short_tokens
     
     def get_case_details(self, case_id):
         """الحصول على تفاصيل حالة محددة"""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row  # هذا يجعل كل صف عبارة عن dict تلقائيًا
-        cursor = conn.cursor()
-        query = """
-            SELECT c.*, ic.category_name, ic.color_code,
-                   creator.name as created_by_name,
-                   modifier.name as modified_by_name,
-                   solver.name as solved_by_name
-            FROM cases c
-            LEFT JOIN issue_categories ic ON c.category_id = ic.id
-            LEFT JOIN employees creator ON c.created_by = creator.id
-            LEFT JOIN employees modifier ON c.modified_by = modifier.id
-            LEFT JOIN employees solver ON c.solved_by = solver.id
-            WHERE c.id = ?
-        """
-        cursor.execute(query, (case_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            # row_factory على المؤشر فقط حتى لا يتغير سلوك الاتصال المشترك
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(CASE_DETAILS_QUERY, (case_id,))
+            row = cursor.fetchone()
+            cursor.close()
         if row:
             return dict(row)  # ترجع dict مباشرة بالأسماء الصحيحة
         return None
+
+    def get_case_bundle(self, case_id, audit_limit=CASE_AUDIT_PAGE_SIZE, parts=None):
+        """تفاصيل الحالة ومرفقاتها ومراسلاتها وأول صفحة من سجل تعديلاتها في معاملة قراءة واحدة
+
+        يرجع CaseBundle أو None إذا لم توجد الحالة؛ audit_limit=None يجلب السجل كاملاً.
+        parts يحدد ما يُقرأ من CASE_BUNDLE_PARTS مع تفاصيل الحالة (None للكل، () للتفاصيل فقط)،
+        وقد تحتوي الحزمة المرجعة أجزاء غير مطلوبة إذا كانت في الذاكرة.
+        الحزم بالحجم الافتراضي تُخدم من ذاكرة LRU حتى تعديل الحالة (invalidate_case_bundle)،
+        والجزء الناقص من حزمة مخزنة يُقرأ وحده ويُضاف إليها.
+        """
+        parts = CASE_BUNDLE_PARTS if parts is None else tuple(parts)
+        if audit_limit != CASE_AUDIT_PAGE_SIZE:
+            return self._read_case_bundle(case_id, audit_limit, parts)
+        key = self._bundle_key(case_id)
+        with self._bundle_lock:
+            cached = self._bundle_cache.get(key)
+            missing = parts
+            if cached is not None:
+                self._bundle_cache.move_to_end(key)
+                missing = tuple(part for part in parts if getattr(cached, part) is None)
+                if not missing:
+                    return cached
+            generation = self._bundle_generation
+        bundle = self._read_case_bundle(case_id, audit_limit, missing)
+        if bundle is None:
+            return None
+        with self._bundle_lock:
+            if generation == self._bundle_generation:
+                if cached is not None:
+                    loaded = {part: getattr(bundle, part) for part in missing}
+                    if 'audit_log' in missing:
+                        loaded['audit_has_more'] = bundle.audit_has_more
+                    bundle = cached._replace(case=bundle.case, **loaded)
+                self._bundle_cache[key] = bundle
+                while len(self._bundle_cache) > CASE_BUNDLE_CACHE_SIZE:
+                    self._bundle_cache.popitem(last=False)
+                return bundle
+        if cached is None:
+            return bundle
+        # تعديل انتهى أثناء القراءة: الأجزاء المخزنة قد تكون أقدم منه، فتُقرأ كل الأجزاء المطلوبة
+        return self._read_case_bundle(case_id, audit_limit, parts)
+
+    @staticmethod
+    def _bundle_key(case_id):
+        """مفتاح موحد للذاكرة (رقم الحالة قد يصل نصاً من الواجهة)"""
+        try:
+            return int(case_id)
+        except (TypeError, ValueError):
+            return case_id
+
+    def invalidate_case_bundle(self, case_id=None):
+        """إبطال حزمة حالة من الذاكرة بعد تعديلها (None يبطل كل الحزم)"""
+        with self._bundle_lock:
+            self._bundle_generation += 1
+            if case_id is None:
+                self._bundle_cache.clear()
+            else:
+                self._bundle_cache.pop(self._bundle_key(case_id), None)
+
+    def prefetch_case_bundles(self, case_ids, parts=None):
+        """جلب حزم الحالات المعطاة (بالأجزاء parts) إلى الذاكرة في خيط خلفي (الطلب الأحدث يلغي ما تبقى من السابق)"""
+        with self._bundle_lock:
+            self._prefetch_ids = list(case_ids)
+            self._prefetch_parts = parts
+            if self._prefetch_thread is None or not self._prefetch_thread.is_alive():
+                self._prefetch_thread = threading.Thread(target=self._prefetch_worker, daemon=True)
+                self._prefetch_thread.start()
+        self._prefetch_event.set()
+
+    def _prefetch_worker(self):
+        """خيط الجلب المسبق: ينتظر طلباً ثم يقرأ الحزم غير المخزنة بالترتيب"""
+        while True:
+            self._prefetch_event.wait()
+            with self._bundle_lock:
+                self._prefetch_event.clear()
+                case_ids, self._prefetch_ids = self._prefetch_ids or [], None
+                parts = self._prefetch_parts
+            for case_id in case_ids:
+                if self._prefetch_event.is_set():
+                    break
+                try:
+                    self.get_case_bundle(case_id, parts=parts)
+                except Exception as e:
+                    print(f"خطأ في الجلب المسبق للحالة {case_id}: {e}")
+
+    def get_change_seq(self):
+        """آخر تسلسل في سجل التغييرات (نقطة البداية لـ get_changes_since)"""
+        rows = self.execute_query("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        return rows[0][0] if rows else 0
+
+    def get_changes_since(self, seq, limit=CHANGE_FEED_LIMIT):
+        """الحالات التي تغيرت بعد التسلسل seq كـ ChangeBatch
+
+        changed أرقام حالات أُضيفت أو عُدلت هي أو مرفقاتها أو مراسلاتها أو سجلها، وremoved حالات حُذفت.
+        إذا حُذفت صفوف بعد seq من السجل (مدة الاحتفاظ أو استعادة نسخة احتياطية) أو تجاوز عددها limit
+        يرجع complete = False دون أرقام، وعلى المستدعي إعادة تحميل ما يعرضه بالكامل.
+        """
+        with self.transaction() as conn:
+            last = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+            last = last[0] if last else 0
+            if seq == last:
+                return ChangeBatch(last, [], [], True)
+            first = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+            rows = conn.execute(
+                "SELECT source, case_id, op FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit + 1)
+            ).fetchall()
+        if seq > last or first is None or first > seq + 1 or len(rows) > limit:
+            return ChangeBatch(last, [], [], False)
+        changed, removed = {}, set()
+        for source, case_id, op in rows:
+            if case_id is None:
+                continue
+            if source == 'cases' and op == 'D':
+                changed.pop(case_id, None)
+                removed.add(case_id)
+            else:
+                removed.discard(case_id)
+                changed[case_id] = True
+        return ChangeBatch(last, list(changed), sorted(removed), True)
+
+    def watch_changes(self, callback, interval=CHANGE_POLL_INTERVAL):
+        """بدء مراقبة كتابات الاتصالات الأخرى؛ callback(ChangeBatch) تُستدعى من خيط المراقبة
+
+        لا يُقرأ سجل التغييرات إلا عندما يتغير PRAGMA data_version، وتُبطل ذاكرات التخزين المؤقت
+        للحالات المتغيرة قبل استدعاء callback.
+        """
+        self.stop_watching_changes()
+        self._change_watch_args = (callback, interval)
+        self._change_seq = self.get_change_seq()
+
+        def on_change():
+            # أي كتابة من اتصال آخر تبطل نتائج البحث المخزنة (data_version) حتى لو لم تمس الحالات
+            self.pool.mark_changed()
+            batch = self.get_changes_since(self._change_seq)
+            if batch.complete and not batch.changed and not batch.removed:
+                self._change_seq = batch.last_seq
+                return
+            self._change_seq = batch.last_seq
+            self.lookups.invalidate()
+            if batch.complete:
+                for case_id in batch.changed + batch.removed:
+                    self.invalidate_case_bundle(case_id)
+            else:
+                self.invalidate_case_bundle()
+            callback(batch)
+
+        self._change_watcher = DataVersionWatcher(self.db_name, on_change, interval)
+        self._change_watcher.start()
+        # تنظيف السجل القديم خارج مسار بدء التشغيل
+        threading.Thread(target=self.prune_change_log, name='change-log-prune', daemon=True).start()
+        return self._change_watcher
+
+    def stop_watching_changes(self):
+        """إيقاف مراقبة التغييرات إن كانت تعمل"""
+        if self._change_watcher is not None:
+            self._change_watcher.stop()
+            self._change_watcher = None
+
+    def _read_case_bundle(self, case_id, audit_limit, parts=CASE_BUNDLE_PARTS):
+        """قراءة حزمة الحالة من قاعدة البيانات بالأجزاء parts فقط (انظر get_case_bundle)"""
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            try:
+                cursor.execute(CASE_DETAILS_QUERY, (case_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                case = dict(row)
+                attachments = correspondences = audit_log = audit_has_more = None
+                if 'attachments' in parts:
+                    cursor.execute("""
+                        SELECT a.id, a.case_id, a.file_name, a.file_path, a.file_type,
+                               a.description, a.upload_date, a.uploaded_by, e.name as uploaded_by_name
+                        FROM attachments a
+                        LEFT JOIN employees e ON a.uploaded_by = e.id
+                        WHERE a.case_id = ?
+                        ORDER BY a.upload_date DESC
+                    """, (case_id,))
+                    attachments = [dict(row) for row in cursor.fetchall()]
+                if 'correspondences' in parts:
+                    cursor.execute("""
+                        SELECT co.id, co.case_id, co.case_sequence_number, co.yearly_sequence_number, co.sender,
+                               co.message_content, co.sent_date, co.created_by, co.created_date, e.name as created_by_name
+                        FROM correspondences co
+                        LEFT JOIN employees e ON co.created_by = e.id
+                        WHERE co.case_id = ?
+                        ORDER BY co.sent_date DESC
+                    """, (case_id,))
+                    correspondences = [dict(row) for row in cursor.fetchall()]
+                if 'audit_log' in parts:
+                    # صف إضافي واحد لمعرفة وجود سجلات أقدم دون عدّها
+                    cursor.execute("""
+                        SELECT al.id, al.case_id, al.action_type, al.action_description, al.performed_by, al.timestamp,
+                               al.old_values, al.new_values, COALESCE(al.performed_by_name, e.name) as performed_by_name
+                        FROM audit_log al
+                        LEFT JOIN employees e ON al.performed_by = e.id
+                        WHERE al.case_id = ?
+                        ORDER BY al.timestamp DESC, al.id DESC
+                        LIMIT ?
+                    """, (case_id, -1 if audit_limit is None else audit_limit + 1))
+                    audit_log = [dict(row) for row in cursor.fetchall()]
+                    audit_has_more = audit_limit is not None and len(audit_log) > audit_limit
+                    audit_log = audit_log[:audit_limit]
+            finally:
+                cursor.close()
+        return CaseBundle(case, attachments, correspondences, audit_log, audit_has_more)
     
     def get_case_correspondences(self, case_id):
         """الحصول على مراسلات الحالة"""
@@ -408,9 +2123,20 @@ class DatabaseManager:
         return self.execute_query(query, (case_id,))
     
     def get_categories(self):
-        """الحصول على تصنيفات المشاكل"""
-        query = "SELECT id, category_name, color_code FROM issue_categories ORDER BY category_name"
-        return self.execute_query(query)
+        """الحصول على تصنيفات المشاكل (من ذاكرة الجداول المشتركة)"""
+        return self.lookups.categories()
+
+    def add_category(self, category_name, description=None, color_code='#95a5a6'):
+        """إضافة تصنيف مشكلة جديد"""
+        query = "INSERT OR IGNORE INTO issue_categories (category_name, description, color_code) VALUES (?, ?, ?)"
+        try:
+            self.execute_query(query, (category_name, description, color_code))
+            return True
+        except Exception as e:
+            print(f"خطأ في إضافة التصنيف: {e}")
+            return False
+        finally:
+            self.lookups.invalidate()
     
     def get_status_options(self):
         """الحصول على خيارات الحالة"""
@@ -422,55 +2148,220 @@ class DatabaseManager:
         ]
     
     def get_next_correspondence_numbers(self, case_id):
-        """الحصول على أرقام المراسلة التالية"""
-        # رقم تسلسلي خاص بالحالة
-        case_seq_query = "SELECT COALESCE(MAX(case_sequence_number), 0) + 1 FROM correspondences WHERE case_id = ?"
-        case_seq_result = self.execute_query(case_seq_query, (case_id,))
-        case_sequence = case_seq_result[0][0] if case_seq_result else 1
-        
-        # رقم تسلسلي عام على مستوى السنة
+        """أرقام المراسلة التالية للعرض فقط؛ الأرقام الفعلية تُحجز عند الحفظ في add_correspondence"""
         current_year = datetime.now().year
-        yearly_seq_query = """
-            SELECT COALESCE(MAX(CAST(SUBSTR(yearly_sequence_number, 1, INSTR(yearly_sequence_number, '-') - 1) AS INTEGER)), 0) + 1
-            FROM correspondences 
-            WHERE yearly_sequence_number LIKE ?
-        """
-        yearly_seq_result = self.execute_query(yearly_seq_query, (f"%-{current_year}",))
-        yearly_sequence = yearly_seq_result[0][0] if yearly_seq_result and yearly_seq_result[0][0] else 1
-        yearly_sequence_number = f"{yearly_sequence}-{current_year}"
-        
-        return case_sequence, yearly_sequence_number
+        rows = dict(self.execute_query(
+            "SELECT name, value FROM sequences WHERE name IN (?, ?)",
+            (f"{CASE_SEQUENCE_PREFIX}{case_id}", f"{YEAR_SEQUENCE_PREFIX}{current_year}"),
+        ))
+        case_sequence = rows.get(f"{CASE_SEQUENCE_PREFIX}{case_id}", 0) + 1
+        yearly_sequence = rows.get(f"{YEAR_SEQUENCE_PREFIX}{current_year}", 0) + 1
+        return case_sequence, f"{yearly_sequence}-{current_year}"
+
+    def _next_sequence(self, conn, name):
+        """زيادة عداد وإرجاع قيمته الجديدة (يُستدعى داخل معاملة كتابة)"""
+        conn.execute("""
+            INSERT INTO sequences (name, value) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1
+        """, (name,))
+        return conn.execute("SELECT value FROM sequences WHERE name = ?", (name,)).fetchone()[0]
+
+    def _advance_sequence(self, conn, name, value):
+        """رفع العداد إلى رقم مستخدم صراحةً حتى لا يتكرر لاحقاً"""
+        conn.execute("""
+            INSERT INTO sequences (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)
+        """, (name, value))
+
+    def _number_correspondence(self, conn, correspondence_data):
+        """حجز رقمي المراسلة (داخل الحالة وعلى مستوى السنة) أو اعتماد الأرقام المعطاة"""
+        correspondence_data = dict(correspondence_data)
+        case_id = correspondence_data.get('case_id')
+        case_key = f"{CASE_SEQUENCE_PREFIX}{case_id}"
+        if correspondence_data.get('case_sequence_number') is None:
+            correspondence_data['case_sequence_number'] = self._next_sequence(conn, case_key)
+        else:
+            self._advance_sequence(conn, case_key, int(correspondence_data['case_sequence_number']))
+        yearly_number = correspondence_data.get('yearly_sequence_number')
+        if not yearly_number:
+            current_year = datetime.now().year
+            yearly_sequence = self._next_sequence(conn, f"{YEAR_SEQUENCE_PREFIX}{current_year}")
+            correspondence_data['yearly_sequence_number'] = f"{yearly_sequence}-{current_year}"
+        else:
+            sequence, _, year = str(yearly_number).partition('-')
+            if sequence.isdigit() and year:
+                self._advance_sequence(conn, f"{YEAR_SEQUENCE_PREFIX}{year}", int(sequence))
+        return correspondence_data
     
     def log_action(self, case_id, action_type, action_description, performed_by, old_values=None, new_values=None):
         """تسجيل إجراء في سجل التعديلات مع حفظ اسم الموظف بشكل دائم"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        # جلب اسم الموظف الحالي
-        emp_name = None
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        try:
-            cursor.execute("SELECT name FROM employees WHERE id = ?", (performed_by,))
-            row = cursor.fetchone()
-            if row:
-                emp_name = row[0]
-        except Exception:
-            pass
-        finally:
-            conn.close()
+        # اسم الموظف يُجلب داخل نفس جملة الإدخال بدلاً من اتصال واستعلام منفصلين
         query = """
             INSERT INTO audit_log (case_id, action_type, action_description, performed_by, timestamp, old_values, new_values, performed_by_name)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, (SELECT name FROM employees WHERE id = ?))
         """
-        self.execute_query(query, (case_id, action_type, action_description, performed_by, timestamp, str(old_values) if old_values else None, str(new_values) if new_values else None, emp_name))
+        self.execute_query(query, (case_id, action_type, action_description, performed_by, timestamp, str(old_values) if old_values else None, str(new_values) if new_values else None, performed_by))
+        self.invalidate_case_bundle(case_id)
     
+    @contextmanager
+    def transaction(self, immediate=False):
+        """اتصال داخل معاملة واحدة: تثبيت عند النجاح وتراجع عند أي خطأ
+
+        immediate=True يحجز قفل الكتابة من البداية (BEGIN IMMEDIATE)، والاستدعاء
+        المتداخل داخل معاملة مفتوحة ينضم إليها بدلاً من بدء معاملة جديدة.
+        """
+        with self.pool.connection() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            conn.transaction_open = True
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                conn.transaction_open = False
+
+    def _bulk_insert(self, table, fields, records, batch_size, defaults, audit_entry, performed_by, index_batch):
+        """إدخال سجلات بـ executemany على دفعات داخل معاملة واحدة مع سجل تعديلات جماعي
+
+        audit_entry(new_id, record) ترجع (case_id, action_type, description, performed_by)،
+        وindex_batch(conn, first_id, batch) تؤدي عمل مشغلات الإدخال المتخطاة للدفعة كلها.
+        يرجع أرقام الصفوف الجديدة بترتيب السجلات المدخلة.
+        """
+        insert_query = f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})"
+        audit_query = """
+            INSERT INTO audit_log (case_id, action_type, action_description, performed_by, timestamp, performed_by_name)
+            VALUES (?, ?, ?, ?, ?, (SELECT name FROM employees WHERE id = ?))
+        """
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        change_case_column = dict(CHANGE_LOG_SOURCES)[table]
+        records = iter(records)
+        new_ids = []
+        with self.transaction(immediate=True) as conn:
+            conn.bulk_loading = True
+            try:
+                while True:
+                    batch = list(islice(records, batch_size))
+                    if not batch:
+                        break
+                    conn.executemany(insert_query, [
+                        tuple(defaults.get(field) if record.get(field) is None else record.get(field) for field in fields)
+                        for record in batch
+                    ])
+                    # قفل الكتابة محجوز طوال المعاملة فأرقام الدفعة متتالية حتى آخر رقم مُدخل
+                    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    batch_ids = range(last_id - len(batch) + 1, last_id + 1)
+                    index_batch(conn, batch_ids[0], batch)
+                    # سطر واحد في سجل التغييرات لكل حالة مستها الدفعة (مشغلات الإدخال متوقفة)
+                    conn.execute(f"""
+                        INSERT INTO change_log (source, case_id, op)
+                        SELECT DISTINCT ?, {change_case_column}, 'I' FROM {table} WHERE id BETWEEN ? AND ?
+                    """, (table, batch_ids[0], batch_ids[-1]))
+                    audit_rows = []
+                    for new_id, record in zip(batch_ids, batch):
+                        case_id, action_type, description, performer = audit_entry(new_id, record)
+                        if performed_by is not None:
+                            performer = performed_by
+                        audit_rows.append((case_id, action_type, description, performer, timestamp, performer))
+                    conn.executemany(audit_query, audit_rows)
+                    new_ids.extend(batch_ids)
+            finally:
+                conn.bulk_loading = False
+        self.invalidate_case_bundle()
+        return new_ids
+
+    def _index_cases_batch(self, conn, first_id, batch):
+        """إضافة دفعة حالات جديدة لفهرس البحث من نصوصها الموحدة المحسوبة مسبقاً"""
+        if not self.fts_enabled:
+            return
+        conn.executemany(
+            f"INSERT INTO cases_fts (rowid, {', '.join(SEARCH_INDEX_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, NULL, NULL)",
+            [
+                (case_id, case['customer_name_norm'], case['subscriber_number_norm'], case['address_norm'],
+                 normalize_arabic(case.get('problem_description')), normalize_arabic(case.get('actions_taken')))
+                for case_id, case in enumerate(batch, first_id)
+            ],
+        )
+
+    def _index_children_batch(self, table, conn, first_id, batch):
+        """تحديث نصوص المراسلات أو المرفقات في فهرس البحث للحالات التي مستها الدفعة"""
+        if not self.fts_enabled:
+            return
+        column, source = next((column, source) for child, column, source in SEARCH_INDEX_CHILD_SOURCES if child == table)
+        conn.execute(f"""
+            UPDATE cases_fts
+            SET {column} = ar_normalize((SELECT group_concat(x.{source}, ' ') FROM {table} x WHERE x.case_id = cases_fts.rowid))
+            WHERE rowid IN (SELECT DISTINCT case_id FROM {table} WHERE id BETWEEN ? AND ?)
+        """, (first_id, first_id + len(batch) - 1))
+
+    def add_cases_bulk(self, cases, batch_size=500, performed_by=None):
+        """إضافة مجموعة حالات (قواميس بنفس مفاتيح add_case) في معاملة واحدة وإرجاع أرقامها"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        def prepare(case):
+            # الأعمدة المشتقة تُحسب هنا بدلاً من مشغلات الإدخال (انظر SEARCH_INDEX_TRIGGERS)
+            case = dict(case)
+            case['created_date'] = case.get('created_date') or now
+            # تاريخ التعديل الافتراضي كما في مشغل trg_cases_modified_default
+            case['modified_date'] = case.get('modified_date') or case['created_date']
+            for column, norm in NORMALIZED_COLUMNS.items():
+                case[norm] = normalize_arabic(case.get(column))
+            for column, key in DATE_KEY_COLUMNS.items():
+                case[key] = date_key(case.get(column))
+            return case
+
+        fields = CASE_FIELDS + tuple(NORMALIZED_COLUMNS.values()) + tuple(DATE_KEY_COLUMNS.values())
+        return self._bulk_insert(
+            'cases', fields, map(prepare, cases), batch_size,
+            {'status': 'جديدة', 'debt_amount': 0},
+            lambda new_id, case: (new_id, "إنشاء", "تم إنشاء الحالة (إدخال جماعي)", case.get('created_by')),
+            performed_by, self._index_cases_batch,
+        )
+
+    def add_correspondences_bulk(self, correspondences, batch_size=500, performed_by=None):
+        """إضافة مجموعة مراسلات (قواميس بنفس مفاتيح add_correspondence) في معاملة واحدة وإرجاع أرقامها"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # الترقيم داخل نفس المعاملة التي يفتحها _bulk_insert (المعاملة المتداخلة تنضم إليها)
+        with self.transaction(immediate=True) as conn:
+            new_ids = self._bulk_insert(
+                'correspondences', CORRESPONDENCE_FIELDS,
+                (self._number_correspondence(conn, corr) for corr in correspondences), batch_size,
+                {'sent_date': now, 'created_date': now},
+                lambda new_id, corr: (corr.get('case_id'), "إضافة مراسلة",
+                                      f"تم إضافة مراسلة رقم {corr.get('case_sequence_number')} (إدخال جماعي)",
+                                      corr.get('created_by')),
+                performed_by, lambda conn, first_id, batch: self._index_children_batch('correspondences', conn, first_id, batch),
+            )
+        # إبطال ثانٍ بعد التثبيت: الإبطال داخل _bulk_insert سبق تثبيت المعاملة الخارجية
+        self.invalidate_case_bundle()
+        return new_ids
+
+    def add_attachments_bulk(self, attachments, batch_size=500, performed_by=None):
+        """إضافة مجموعة مرفقات (قواميس بنفس مفاتيح add_attachment) في معاملة واحدة وإرجاع أرقامها"""
+        return self._bulk_insert(
+            'attachments', ATTACHMENT_FIELDS, attachments, batch_size,
+            {'upload_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")},
+            lambda new_id, att: (att.get('case_id'), "ربط مرفق",
+                                 f"تم ربط المرفق: {att.get('file_name')} (إدخال جماعي)",
+                                 att.get('uploaded_by')),
+            performed_by, lambda conn, first_id, batch: self._index_children_batch('attachments', conn, first_id, batch),
+        )
+
     def add_case(self, case_data):
-        """إضافة حالة جديدة"""
+        """إضافة حالة جديدة وإرجاع رقمها"""
         query = '''
             INSERT INTO cases (
                 customer_name, subscriber_number, phone, address, category_id, status, 
                 problem_description, actions_taken, last_meter_reading, last_reading_date, 
                 debt_amount, received_date, created_date, created_by, modified_date, modified_by, solved_by, solved_date
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
         '''
         params = (
             case_data.get('customer_name'),
@@ -493,7 +2384,9 @@ class DatabaseManager:
             case_data.get('solved_date')
         )
         print("PARAMS TO SAVE:", params)
-        self.execute_query(query, params)
+        rows = self.execute_query(query, params)
+        # رقم الحالة الجديدة (تعتمد عليه نافذة الحالات لإضافة بطاقتها)
+        return rows[0][0] if rows else None
 
     def update_case(self, case_id, case_data):
         """تحديث بيانات حالة"""
@@ -524,6 +2417,7 @@ class DatabaseManager:
             case_id
         )
         self.execute_query(query, params)
+        self.invalidate_case_bundle(case_id)
 
     def add_attachment(self, attachment_data):
         """إضافة مرفق جديد"""
@@ -542,25 +2436,28 @@ class DatabaseManager:
             attachment_data.get('uploaded_by')
         )
         self.execute_query(query, params)
+        self.invalidate_case_bundle(attachment_data.get('case_id'))
 
     def add_correspondence(self, correspondence_data):
-        """إضافة مراسلة جديدة"""
+        """إضافة مراسلة جديدة وإرجاع رقميها (case_sequence_number, yearly_sequence_number)
+
+        الأرقام غير المعطاة تُحجز من جدول العدادات في نفس معاملة الإدخال
+        (BEGIN IMMEDIATE) فلا يحصل موظفان على نفس الرقم.
+        """
         query = '''
             INSERT INTO correspondences (
                 case_id, case_sequence_number, yearly_sequence_number, sender, message_content, sent_date, created_by, created_date
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         '''
-        params = (
-            correspondence_data.get('case_id'),
-            correspondence_data.get('case_sequence_number'),
-            correspondence_data.get('yearly_sequence_number'),
-            correspondence_data.get('sender'),
-            correspondence_data.get('message_content'),
-            correspondence_data.get('sent_date'),
-            correspondence_data.get('created_by'),
-            correspondence_data.get('created_date')
-        )
-        self.execute_query(query, params)
+        try:
+            with self.transaction(immediate=True) as conn:
+                correspondence_data = self._number_correspondence(conn, correspondence_data)
+                conn.execute(query, tuple(correspondence_data.get(field) for field in CORRESPONDENCE_FIELDS))
+        except Exception as e:
+            print(f"خطأ في إضافة المراسلة: {e}")
+            return None
+        self.invalidate_case_bundle(correspondence_data.get('case_id'))
+        return correspondence_data['case_sequence_number'], correspondence_data['yearly_sequence_number']
 
     def get_all_cases(self):
         """الحصول على جميع الحالات كقوائم dict مع العنوان وتاريخ الورود"""
@@ -571,7 +2468,7 @@ class DatabaseManager:
             FROM cases c
             LEFT JOIN issue_categories ic ON c.category_id = ic.id
             LEFT JOIN employees e ON c.modified_by = e.id
-            ORDER BY c.modified_date DESC, c.created_date DESC
+            ORDER BY c.modified_date DESC, c.id DESC
         '''
         rows = self.execute_query(query)
         columns = ['id', 'customer_name', 'customer_address', 'subscriber_number', 'status', 'category_name', 'color_code', 'modified_by_name', 'received_date', 'created_date', 'modified_date']
@@ -594,37 +2491,83 @@ class DatabaseManager:
         """حذف مرفق حسب رقم المرفق"""
         query = "DELETE FROM attachments WHERE id = ?"
         self.execute_query(query, (attachment_id,))
+        self.invalidate_case_bundle()
 
     def delete_correspondence(self, correspondence_id):
         """حذف مراسلة حسب رقم المراسلة"""
         query = "DELETE FROM correspondences WHERE id = ?"
         self.execute_query(query, (correspondence_id,))
+        self.invalidate_case_bundle()
+
+# فحص مطابقة البحث الشامل لأجزاء الكلمات على قاعدة مؤقتة: (الحقل، النص، هل يجب أن تُوجد الحالة)
+SEARCH_CHECK_CASE = {'customer_name': 'أحمد علي', 'subscriber_number': '9912345', 'address': 'شارع النيل',
+                     'problem_description': 'انقطاع الكهرباء', 'category_id': 1}
+SEARCH_CHECKS = [
+    ('شامل', '2345', True),     # جزء من رقم المشترك
+    ('شامل', 'حم', True),       # منتصف الاسم بأقل من ثلاثة حروف
+    ('شامل', 'حمد', True),      # منتصف الاسم عبر فهرس الثلاثيات
+    ('شامل', 'احمد علي', True),
+    ('شامل', 'كهربا', True),
+    ('شامل', '5432', False),
+    ('رقم المشترك', '2345', True),
+]
+
+
+def check_search_matching():
+    """تشغيل SEARCH_CHECKS على قاعدة بيانات مؤقتة ويرجع 0 إذا نجحت كلها (يُشغل في CI)"""
+    import shutil
+    import tempfile
+    folder = tempfile.mkdtemp()
+    db = DatabaseManager(os.path.join(folder, 'search_check.db'))
+    try:
+        db.open()
+        case_id = db.add_case(SEARCH_CHECK_CASE)
+        mode = "FTS5 trigram" if db.fts_enabled else "LIKE"
+        failures = 0
+        for field, value, expected in SEARCH_CHECKS:
+            found = case_id in [row['id'] for row in db.search_cases(field, value)]
+            if found != expected:
+                failures += 1
+            print(f"{'✅' if found == expected else '❌'} {field}: {value} ({mode})")
+        return 1 if failures else 0
+    finally:
+        db.close()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def check_bulk_insert_atomicity(batch_size=2, failing_batch=3):
+    """إدخال جماعي تفشل دفعته رقم failing_batch على قاعدة مؤقتة محدثة أُعيد فتحها، ويرجع 0 إذا لم يبق أي صف
+
+    إعادة الفتح تجعل أول قراءة للإعدادات (مثل fts_enabled) تحدث بعد فتح الملف لا أثناء الترحيل.
+    """
+    import shutil
+    import tempfile
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'bulk_check.db')
+    # الترحيلات تُطبق بمثيل أول، فالمثيل الثاني يفتح ملفاً محدثاً كما في التشغيل العادي
+    migrated = DatabaseManager(path)
+    migrated.open()
+    migrated.close()
+    db = DatabaseManager(path)
+    try:
+        db.open()
+        cases = [dict(SEARCH_CHECK_CASE, subscriber_number=str(1000 + i)) for i in range(batch_size * failing_batch)]
+        # subscriber_number NOT NULL: أول صف في الدفعة الفاشلة
+        cases[batch_size * (failing_batch - 1)]['subscriber_number'] = None
+        try:
+            db.add_cases_bulk(cases, batch_size=batch_size)
+            print("❌ الإدخال الجماعي لم يفشل في الدفعة المعيبة")
+            return 1
+        except sqlite3.Error as e:
+            print(f"فشل الإدخال الجماعي في الدفعة {failing_batch} كما هو متوقع: {e}")
+        remaining = db.execute_query("SELECT COUNT(*) FROM cases")[0][0]
+        ok = remaining == 0
+        print(f"{'✅' if ok else '❌'} الصفوف المتبقية بعد التراجع: {remaining}")
+        return 0 if ok else 1
+    finally:
+        db.close()
+        shutil.rmtree(folder, ignore_errors=True)
 
-    def add_missing_columns(self):
-        """إضافة الأعمدة الناقصة (مثل received_date) إذا لم تكن موجودًا، وأجعلها تُنفذ تلقائيًا عند تهيئة قاعدة البيانات."""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        # تحقق من وجود العمود
-        cursor.execute("PRAGMA table_info(cases)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'received_date' not in columns:
-            try:
-                cursor.execute("ALTER TABLE cases ADD COLUMN received_date TEXT")
-                conn.commit()
-                print("تم إضافة العمود received_date بنجاح.")
-            except Exception as e:
-                print(f"[ERROR] فشل في إضافة العمود received_date: {e}")
-        # أضف عمود performed_by_name إذا لم يكن موجودًا
-        cursor.execute("PRAGMA table_info(audit_log)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'performed_by_name' not in columns:
-            try:
-                cursor.execute("ALTER TABLE audit_log ADD COLUMN performed_by_name TEXT")
-                conn.commit()
-                print("تم إضافة العمود performed_by_name بنجاح.")
-            except Exception as e:
-                print(f"[ERROR] فشل في إضافة العمود performed_by_name: {e}")
-        conn.close()
 
 # إنشاء مثيل قاعدة البيانات المحسنة
 enhanced_db = DatabaseManager()
\ No newline at end of file
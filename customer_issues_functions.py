@@ -1,7 +1,6 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox
 from datetime import datetime
-import json
 from customer_issues_database import enhanced_db
 
 class EnhancedFunctions:
@@ -26,13 +25,7 @@ class EnhancedFunctions:
         """تحميل سنوات البيانات"""
         try:
             # الحصول على السنوات المتاحة
-            query = "SELECT DISTINCT strftime('%Y', created_date) as year FROM cases ORDER BY year DESC"
-            years_data = enhanced_db.execute_query(query)
-            
-            years = ["الكل"]
-            for year_row in years_data:
-                if year_row[0]:
-                    years.append(year_row[0])
+            years = ["الكل"] + enhanced_db.get_case_years('created_date')
             
             # إضافة السنة الحالية إذا لم تكن موجودة
             current_year = str(datetime.now().year)
@@ -81,13 +74,8 @@ class EnhancedFunctions:
     def load_cases(self, year=None):
         """تحميل الحالات"""
         try:
-            if year and year != "الكل":
-                cases_data = enhanced_db.get_cases_by_year(int(year))
-            else:
-                cases_data = enhanced_db.get_cases_by_year()
-            
-            self.main_window.cases_data = cases_data
-            self.main_window.filtered_cases = cases_data.copy()
+            # الصفحة الأولى فقط، والصفحات التالية تُجلب عند التمرير
+            self.main_window.load_cases_first_page(year)
             self.refresh_cases_display()
             
         except Exception as e:
@@ -95,104 +83,8 @@ class EnhancedFunctions:
             messagebox.showerror("خطأ", f"فشل في تحميل الحالات: {e}")
     
     def refresh_cases_display(self):
-        """تحديث عرض الحالات"""
-        # مسح العرض الحالي
-        for widget in self.main_window.scrollable_frame.winfo_children():
-            widget.destroy()
-        
-        # عرض الحالات
-        for i, case_data in enumerate(self.main_window.filtered_cases):
-            self.create_case_card(case_data, i)
-        
-        # تحديث منطقة السكرول
-        self.main_window.scrollable_frame.update_idletasks()
-        self.main_window.cases_canvas.configure(scrollregion=self.main_window.cases_canvas.bbox("all"))
-    
-    def create_case_card(self, case_data, index, return_widget=False):
-        """إنشاء بطاقة الحالة مع تصميم محسن"""
-        # دعم dict أو tuple
-        if isinstance(case_data, dict):
-            case_id = case_data.get('id')
-            customer_name = case_data.get('customer_name', '')
-            subscriber_number = case_data.get('subscriber_number', '')
-            status = case_data.get('status', '')
-            category_name = case_data.get('category_name', '')
-            color_code = case_data.get('color_code', '')
-            modified_by_name = case_data.get('modified_by_name', '')
-            created_date = case_data.get('created_date', '')
-            modified_date = case_data.get('modified_date', '')
-        else:
-            case_id, customer_name, subscriber_number, status, category_name, color_code, modified_by_name, created_date, modified_date = case_data
-        
-        # إطار البطاقة مع تصميم محسن
-        card_frame = tk.Frame(self.main_window.scrollable_frame, bg='#ffffff', relief='solid', bd=1, padx=15, pady=12)
-        card_frame.pack(fill='x', padx=10, pady=5)
-        
-        # لون الحدود حسب الحالة
-        status_colors = {
-            'جديدة': '#3498db',
-            'قيد التنفيذ': '#f39c12',
-            'تم حلها': '#27ae60',
-            'مغلقة': '#95a5a6'
-        }
-        border_color = status_colors.get(status, '#95a5a6')
-        card_frame.configure(highlightbackground=border_color, highlightthickness=2)
-        
-        # اسم العميل
-        name_label = tk.Label(card_frame, text=customer_name, 
-                             font=self.main_window.fonts['subheader'], fg='#2c3e50', bg='#ffffff')
-        name_label.pack(anchor='e', pady=(0, 5))
-        
-        # رقم المشترك
-        if subscriber_number:
-            subscriber_label = tk.Label(card_frame, text=f"رقم المشترك: {subscriber_number}", 
-                                       font=self.main_window.fonts['normal'], fg='#7f8c8d', bg='#ffffff')
-            subscriber_label.pack(anchor='e', pady=2)
-        
-        # تصنيف المشكلة
-        if category_name:
-            category_label = tk.Label(card_frame, text=f"التصنيف: {category_name}", 
-                                     font=self.main_window.fonts['normal'], fg='#7f8c8d', bg='#ffffff')
-            category_label.pack(anchor='e', pady=2)
-        
-        # شارة الحالة
-        status_frame = tk.Frame(card_frame, bg='#ffffff')
-        status_frame.pack(anchor='e', pady=5)
-        
-        status_badge = tk.Label(status_frame, text=status,
-                               font=self.main_window.fonts['small'], fg='white',
-                               bg=border_color, padx=10, pady=3, relief='flat')
-        status_badge.pack(side='right')
-        
-        # تاريخ الإنشاء
-        if created_date:
-            try:
-                date_obj = datetime.strptime(created_date, "%Y-%m-%d %H:%M:%S")
-                formatted_date = date_obj.strftime("%Y/%m/%d")
-                date_label = tk.Label(card_frame, text=f"تاريخ الإنشاء: {formatted_date}", 
-                                     font=self.main_window.fonts['small'], fg='#95a5a6', bg='#ffffff')
-                date_label.pack(anchor='e', pady=2)
-            except:
-                pass
-        
-        # آخر مُعدِّل
-        if modified_by_name:
-            modifier_label = tk.Label(card_frame, text=f"آخر تعديل: {modified_by_name}", 
-                                     font=self.main_window.fonts['small'], fg='#95a5a6', bg='#ffffff')
-            modifier_label.pack(anchor='e', pady=(2, 0))
-        
-        # ربط النقر لاختيار الحالة
-        def on_card_click(event, cid=case_id):
-            self.select_case(cid)
-        
-        # ربط النقر لجميع عناصر البطاقة
-        for widget in [card_frame, name_label, status_badge]:
-            widget.bind("<Button-1>", on_card_click)
-            widget.bind("<Enter>", lambda e, w=widget: w.configure(bg='#f8f9fa'))
-            widget.bind("<Leave>", lambda e, w=widget: w.configure(bg='#ffffff'))
-        
-        if return_widget:
-            return card_frame
+        """تحديث عرض الحالات (القائمة الافتراضية ترسم الحالات الظاهرة فقط)"""
+        self.main_window.update_cases_list()
     
     def select_case(self, case_id):
         """اختيار حالة"""
@@ -206,10 +98,11 @@ class EnhancedFunctions:
     def load_case_details(self, case_id):
         """تحميل تفاصيل الحالة"""
         try:
-            # تحميل البيانات الأساسية
-            case_details = enhanced_db.get_case_details(case_id)
+            # الحالة وما يعرضه التبويب الظاهر في معاملة قراءة واحدة
+            bundle = enhanced_db.get_case_bundle(case_id, parts=self.main_window.visible_case_parts())
             
-            if case_details:
+            if bundle:
+                case_details = bundle.case
                 # تحديث رأس العرض
                 self.main_window.customer_name_label.configure(text=case_details.get('customer_name', ''))
                 if case_details.get('solved_by_name'):
@@ -220,14 +113,8 @@ class EnhancedFunctions:
                 # ملء البيانات الأساسية
                 self.fill_basic_data(case_details)
                 
-                # تحميل المرفقات
-                self.load_case_attachments(case_id)
-                
-                # تحميل المراسلات
-                self.load_case_correspondences(case_id)
-                
-                # تحميل سجل التعديلات
-                self.load_case_audit_log(case_id)
+                # تحميل التبويب الظاهر (المرفقات والمراسلات وسجل التعديلات تُحمل عند اختيار تبويبها)
+                self.main_window.render_case_bundle(bundle)
         
         except Exception as e:
             print(f"خطأ في تحميل تفاصيل الحالة: {e}")
@@ -300,7 +187,7 @@ class EnhancedFunctions:
             except Exception:
                 pass
     
-    def load_case_attachments(self, case_id):
+    def load_case_attachments(self, case_id, attachments=None):
         """تحميل مرفقات الحالة (النسخة المصححة)."""
         try:
             # مسح الجدول الحالي
@@ -308,7 +195,8 @@ class EnhancedFunctions:
                 self.main_window.attachments_tree.delete(item)
             
             # get_attachments تعيد الآن قائمة من القواميس (dict) بالأسماء الصحيحة
-            attachments = enhanced_db.get_attachments(case_id)
+            if attachments is None:
+                attachments = enhanced_db.get_attachments(case_id)
             
             for att in attachments:
                 # إدخال البيانات بالترتيب الصحيح والمتوقع للجدول
@@ -325,7 +213,7 @@ class EnhancedFunctions:
         except Exception as e:
             print(f"خطأ في تحميل المرفقات: {e}")
     
-    def load_case_correspondences(self, case_id):
+    def load_case_correspondences(self, case_id, correspondences=None):
         """تحميل مراسلات الحالة"""
         try:
             # مسح الجدول الحالي
@@ -333,38 +221,42 @@ class EnhancedFunctions:
                 self.main_window.correspondences_tree.delete(item)
             
             # تحميل المراسلات
-            correspondences = enhanced_db.get_case_correspondences(case_id)
+            if correspondences is None:
+                correspondences = enhanced_db.get_correspondences(case_id)
             
             for correspondence in correspondences:
+                content = correspondence.get('message_content') or ''
                 self.main_window.correspondences_tree.insert('', 'end', values=(
-                    correspondence[0],  # ID
-                    correspondence[2],  # case_sequence_number
-                    correspondence[3],  # yearly_sequence_number
-                    correspondence[4],  # sender
-                    correspondence[5][:50] + '...' if len(correspondence[5]) > 50 else correspondence[5],  # message_content (مقطوع)
-                    correspondence[6],  # sent_date
-                    correspondence[9] or ''  # created_by_name
+                    correspondence.get('id'),
+                    correspondence.get('case_sequence_number'),
+                    correspondence.get('yearly_sequence_number'),
+                    correspondence.get('sender'),
+                    content[:50] + '...' if len(content) > 50 else content,  # message_content (مقطوع)
+                    correspondence.get('sent_date'),
+                    correspondence.get('created_by_name') or ''
                 ))
         
         except Exception as e:
             print(f"خطأ في تحميل المراسلات: {e}")
     
-    def load_case_audit_log(self, case_id):
-        """تحميل سجل تعديلات الحالة"""
+    def load_case_audit_log(self, case_id, audit_logs=None):
+        """تحميل سجل تعديلات الحالة (أول صفحة من get_case_bundle إذا لم يُمرر السجل)"""
         try:
             # مسح الجدول الحالي
             for item in self.main_window.audit_tree.get_children():
                 self.main_window.audit_tree.delete(item)
             
             # تحميل سجل التعديلات
-            audit_logs = enhanced_db.get_case_audit_log(case_id)
+            if audit_logs is None:
+                bundle = enhanced_db.get_case_bundle(case_id, parts=('audit_log',))
+                audit_logs = bundle.audit_log if bundle else []
             
             for log in audit_logs:
                 self.main_window.audit_tree.insert('', 'end', values=(
-                    log[5],  # timestamp
-                    log[7] or '',  # performed_by_name
-                    log[2],  # action_type
-                    log[3]   # action_description
+                    log.get('timestamp'),
+                    log.get('performed_by_name') or '',
+                    log.get('action_type'),
+                    log.get('action_description')
                 ))
         
         except Exception as e:
@@ -416,6 +308,7 @@ class EnhancedFunctions:
         # مسح البحث الحالي
         self.main_window.search_value_var.set('')
         self.main_window.filtered_cases = self.main_window.cases_data.copy()
+        self.main_window.cases_list_paged = True
         self.refresh_cases_display()
     
     def perform_search(self, event=None):
@@ -429,6 +322,7 @@ class EnhancedFunctions:
         if not search_value.strip():
             # إذا كان البحث فارغ، عرض جميع الحالات
             self.main_window.filtered_cases = self.main_window.cases_data.copy()
+            self.main_window.cases_list_paged = True
         else:
             # تنفيذ البحث
             try:
@@ -438,6 +332,7 @@ class EnhancedFunctions:
                     stype = "تصنيف المشكلة"
                 search_results = enhanced_db.search_cases(stype, search_value.strip())
                 self.main_window.filtered_cases = search_results
+                self.main_window.cases_list_paged = False
             except Exception as e:
                 print(f"خطأ في البحث: {e}")
                 messagebox.showerror("خطأ", f"فشل في البحث: {e}")
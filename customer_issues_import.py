@@ -0,0 +1,226 @@
+import csv
+import os
+from datetime import datetime
+from itertools import islice
+
+from customer_issues_database import enhanced_db, normalize_arabic
+
+
+# أسماء الأعمدة المقبولة في ملفات الاستيراد لكل حقل (تُقارن بعد توحيد الكتابة العربية)
+COLUMN_ALIASES = {
+    'customer_name': ('customer_name', 'اسم العميل', 'العميل', 'الاسم'),
+    'subscriber_number': ('subscriber_number', 'رقم المشترك', 'رقم الاشتراك'),
+    'phone': ('phone', 'الهاتف', 'رقم الهاتف', 'التليفون'),
+    'address': ('address', 'customer_address', 'العنوان', 'عنوان العميل'),
+    'category_name': ('category_name', 'تصنيف المشكلة', 'التصنيف', 'نوع المشكلة'),
+    'status': ('status', 'حالة المشكلة', 'الحالة'),
+    'problem_description': ('problem_description', 'وصف المشكلة', 'المشكلة'),
+    'actions_taken': ('actions_taken', 'ما تم تنفيذه', 'الإجراءات', 'الإجراءات المتخذة'),
+    'last_meter_reading': ('last_meter_reading', 'آخر قراءة', 'قراءة العداد'),
+    'last_reading_date': ('last_reading_date', 'تاريخ آخر قراءة'),
+    'debt_amount': ('debt_amount', 'المديونية', 'قيمة المديونية'),
+    'received_date': ('received_date', 'تاريخ ورود المشكلة', 'تاريخ الورود'),
+    'created_date': ('created_date', 'تاريخ الإضافة', 'تاريخ الإدخال'),
+    'employee_name': ('employee_name', 'اسم الموظف', 'الموظف', 'الموظف المسؤول'),
+}
+
+REQUIRED_FIELDS = ('customer_name', 'subscriber_number')
+
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%Y/%m/%d', '%d/%m/%Y', '%d-%m-%Y')
+
+REJECT_REASON_COLUMN = 'سبب الرفض'
+
+
+class ImportRowError(ValueError):
+    """صف غير صالح للاستيراد (الرسالة هي سبب الرفض في التقرير)"""
+
+
+def _cell_text(value):
+    """قيمة خلية كنص منظف (None للخلايا الفارغة)"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def parse_import_date(value):
+    """تحويل تاريخ من الملف (نص أو datetime من Excel) إلى صيغة قاعدة البيانات"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    text = normalize_arabic(_cell_text(value))
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    raise ImportRowError(f"تاريخ غير صالح: {value}")
+
+
+def iter_csv_rows(path, chunk_size=1000):
+    """قراءة ملف CSV صفاً صفاً على دفعات؛ يرجع (الصفوف، نسبة التقدم) لكل دفعة"""
+    total_bytes = os.path.getsize(path) or 1
+    with open(path, 'r', newline='', encoding='utf-8-sig') as csv_file:
+        reader = csv.reader(csv_file)
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return
+            yield chunk, min(csv_file.buffer.tell() / total_bytes, 1.0)
+
+
+def iter_xlsx_rows(path, chunk_size=1000):
+    """قراءة ورقة Excel الأولى في وضع القراءة فقط (ذاكرة ثابتة) على دفعات"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total_rows = sheet.max_row or 0
+        rows = sheet.iter_rows(values_only=True)
+        read = 0
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            read += len(chunk)
+            yield chunk, min(read / total_rows, 1.0) if total_rows else None
+    finally:
+        workbook.close()
+
+
+class CaseImporter:
+    """استيراد الحالات من ملفات CSV/XLSX بالتدفق: تحقق الصفوف وإدخالها على دفعات وتقرير بالمرفوض"""
+
+    def __init__(self, db=None, batch_size=2000, performed_by=None):
+        self.db = db or enhanced_db
+        self.batch_size = batch_size
+        self.performed_by = performed_by
+        self.categories = {}
+        self.employees = {}
+        self.statuses = set()
+
+    def load_lookups(self):
+        """جداول التحويل من الأسماء إلى الأرقام (مرة واحدة لكل عملية استيراد)"""
+        self.categories = {normalize_arabic(row[1]): row[0] for row in self.db.get_categories()}
+        self.employees = {normalize_arabic(row[1]): row[0] for row in self.db.get_employees(active_only=False)}
+        self.statuses = {status for status, _ in self.db.get_status_options()}
+
+    def map_header(self, header):
+        """ربط أعمدة الملف بالحقول: يرجع {field: رقم العمود}"""
+        aliases = {normalize_arabic(alias).lower(): field
+                   for field, names in COLUMN_ALIASES.items() for alias in names}
+        mapping = {}
+        for index, title in enumerate(header):
+            field = aliases.get(normalize_arabic(_cell_text(title) or '').lower())
+            if field and field not in mapping:
+                mapping[field] = index
+        missing = [field for field in REQUIRED_FIELDS if field not in mapping]
+        if missing:
+            raise ValueError(f"أعمدة مطلوبة غير موجودة في الملف: {', '.join(missing)}")
+        return mapping
+
+    def build_case(self, row, mapping):
+        """تحويل صف إلى قاموس حالة جاهز لـ add_cases_bulk أو رفع ImportRowError"""
+        values = {field: row[index] if index < len(row) else None for field, index in mapping.items()}
+
+        case = {}
+        for field in ('customer_name', 'phone', 'address', 'problem_description', 'actions_taken'):
+            case[field] = _cell_text(values.get(field))
+        if not case['customer_name']:
+            raise ImportRowError("اسم العميل فارغ")
+
+        subscriber_number = normalize_arabic(_cell_text(values.get('subscriber_number')) or '')
+        subscriber_number = subscriber_number.replace(' ', '').replace('-', '')
+        if not subscriber_number.isdigit():
+            raise ImportRowError(f"رقم مشترك غير صالح: {values.get('subscriber_number')}")
+        case['subscriber_number'] = subscriber_number
+
+        category_name = _cell_text(values.get('category_name'))
+        if category_name:
+            case['category_id'] = self.categories.get(normalize_arabic(category_name))
+            if case['category_id'] is None:
+                raise ImportRowError(f"تصنيف غير معروف: {category_name}")
+
+        status = _cell_text(values.get('status'))
+        if status:
+            if status not in self.statuses:
+                raise ImportRowError(f"حالة غير معروفة: {status}")
+            case['status'] = status
+
+        employee_name = _cell_text(values.get('employee_name'))
+        employee_id = self.performed_by
+        if employee_name:
+            employee_id = self.employees.get(normalize_arabic(employee_name))
+            if employee_id is None:
+                raise ImportRowError(f"موظف غير معروف: {employee_name}")
+        case['created_by'] = case['modified_by'] = employee_id
+
+        for field in ('received_date', 'created_date', 'last_reading_date'):
+            case[field] = parse_import_date(values.get(field))
+
+        for field in ('debt_amount', 'last_meter_reading'):
+            number = _cell_text(values.get(field))
+            if number:
+                try:
+                    case[field] = float(normalize_arabic(number).replace(',', ''))
+                except ValueError:
+                    raise ImportRowError(f"قيمة رقمية غير صالحة في {field}: {number}")
+        return case
+
+    def run(self, path, rejects_path=None, progress=None, cancel_event=None):
+        """تنفيذ الاستيراد وإرجاع ملخص {'imported', 'rejected', 'rows', 'rejects_path', 'cancelled'}
+
+        progress(rows, fraction) تُستدعى بعد كل دفعة (fraction قد تكون None)،
+        وcancel_event (threading.Event) يوقف الاستيراد بين الدفعات بعد كتابة الصفوف المقروءة
+        والمتحقق منها، فيبقى imported + rejected مساوياً لـ rows.
+        """
+        if path.lower().endswith(('.xlsx', '.xlsm')):
+            chunks = iter_xlsx_rows(path)
+        else:
+            chunks = iter_csv_rows(path)
+        if rejects_path is None:
+            base, _ = os.path.splitext(path)
+            rejects_path = f"{base}_rejects_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+
+        self.load_lookups()
+        summary = {'imported': 0, 'rejected': 0, 'rows': 0, 'rejects_path': None, 'cancelled': False}
+        header = mapping = None
+        rejects_file = rejects_writer = None
+        pending = []
+        try:
+            for chunk, fraction in chunks:
+                for row in chunk:
+                    if mapping is None:
+                        header = list(row)
+                        mapping = self.map_header(header)
+                        continue
+                    if not any(_cell_text(cell) for cell in row):
+                        continue
+                    summary['rows'] += 1
+                    try:
+                        pending.append(self.build_case(row, mapping))
+                    except ImportRowError as e:
+                        if rejects_writer is None:
+                            rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8-sig')
+                            rejects_writer = csv.writer(rejects_file)
+                            rejects_writer.writerow([_cell_text(title) or '' for title in header] + [REJECT_REASON_COLUMN])
+                            summary['rejects_path'] = rejects_path
+                        rejects_writer.writerow([_cell_text(cell) or '' for cell in row] + [str(e)])
+                        summary['rejected'] += 1
+                    if len(pending) >= self.batch_size:
+                        summary['imported'] += len(self.db.add_cases_bulk(pending, performed_by=self.performed_by))
+                        pending = []
+                if progress:
+                    progress(summary['rows'], fraction)
+                if cancel_event is not None and cancel_event.is_set():
+                    summary['cancelled'] = True
+                    break
+            if pending:
+                summary['imported'] += len(self.db.add_cases_bulk(pending, performed_by=self.performed_by))
+        finally:
+            if rejects_file:
+                rejects_file.close()
+        return summary
@@ -0,0 +1,158 @@
+"""
+تقرير زمن الاستيراد البارد لوحدات البرنامج، مثل python -X importtime لكنه مدمج في البرنامج
+فيعمل أيضاً في نسخة exe (sys.frozen) التي لا تقبل خيارات المفسر:
+
+    python customer_issues_importtime.py [--module اسم] [--top عدد] [--budget ms]
+    customer_issues.exe --import-report
+
+يرجع 1 إذا تجاوز استيراد الوحدة الميزانية import_budget_ms في config.json (يُشغل في CI).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+DEFAULT_MODULE = 'customer_issues_window'
+DEFAULT_BUDGET_MS = 1000
+REPORT_TOP = 15
+
+if getattr(sys, 'frozen', False):
+    APP_DIR = os.path.dirname(sys.executable)
+else:
+    APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class _TimedLoader:
+    """غلاف لمحمل الوحدة الأصلي يقيس زمن البحث عنها وإنشائها وتنفيذها"""
+
+    def __init__(self, loader, timer, name, started):
+        self._loader = loader
+        self._timer = timer
+        self._name = name
+        self._started = started
+        self._entered = False
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def _enter(self):
+        if not self._entered:
+            self._entered = True
+            self._timer.enter(self._name, self._started)
+
+    def create_module(self, spec):
+        self._enter()
+        try:
+            create = getattr(self._loader, 'create_module', None)
+            return create(spec) if create is not None else None
+        except BaseException:
+            self._timer.leave()
+            raise
+
+    def exec_module(self, module):
+        # importlib.reload ينفذ الوحدة دون إنشائها من جديد
+        self._enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._entered = False
+            self._started = time.perf_counter()
+            self._timer.leave()
+
+
+class ImportTimer:
+    """باحث في أول sys.meta_path يغلف محمل كل وحدة جديدة ويسجل لها (الاسم، الزمن الذاتي، التراكمي) بالثواني"""
+
+    def __init__(self):
+        self.records = []
+        self._stack = []
+
+    def __enter__(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def __exit__(self, *exc):
+        sys.meta_path.remove(self)
+        return False
+
+    def find_spec(self, name, path, target=None):
+        started = time.perf_counter()
+        for finder in sys.meta_path:
+            find = getattr(finder, 'find_spec', None)
+            if finder is self or find is None:
+                continue
+            spec = find(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, self, name, started)
+        return spec
+
+    def enter(self, name, started):
+        # [الاسم، البداية، مجموع أزمنة الوحدات المستوردة من داخلها]
+        self._stack.append([name, started, 0.0])
+
+    def leave(self):
+        name, started, children = self._stack.pop()
+        cumulative = time.perf_counter() - started
+        if self._stack:
+            self._stack[-1][2] += cumulative
+        self.records.append((name, cumulative - children, cumulative))
+
+
+def measure(module_name):
+    """استيراد الوحدة مع قياس كل ما تستورده؛ يرجع (الزمن الكلي بالثواني، السجلات)"""
+    if module_name in sys.modules:
+        raise RuntimeError(f"الوحدة {module_name} مستوردة مسبقاً، فلا يمكن قياس استيرادها البارد")
+    started = time.perf_counter()
+    with ImportTimer() as timer:
+        __import__(module_name)
+    return time.perf_counter() - started, timer.records
+
+
+def load_budget():
+    """ميزانية زمن الاستيراد بالمللي ثانية من config.json (import_budget_ms)"""
+    try:
+        with open(os.path.join(APP_DIR, 'config.json'), encoding='utf-8') as f:
+            return float(json.load(f).get('import_budget_ms', DEFAULT_BUDGET_MS))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return float(DEFAULT_BUDGET_MS)
+
+
+def format_report(module_name, total, records, budget_ms, top=REPORT_TOP):
+    """نص التقرير: الزمن الكلي ثم أبطأ الوحدات بزمنها الذاتي"""
+    lines = [
+        f"زمن الاستيراد البارد لـ {module_name}: {total * 1000:.1f} ms "
+        f"(الميزانية {budget_ms:.0f} ms، {len(records)} وحدة)",
+        "  self [ms] | cumulative [ms] | module",
+    ]
+    for name, self_time, cumulative in sorted(records, key=lambda r: r[1], reverse=True)[:top]:
+        lines.append(f"  {self_time * 1000:9.1f} | {cumulative * 1000:15.1f} | {name}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="تقرير زمن الاستيراد البارد")
+    parser.add_argument('--module', default=DEFAULT_MODULE)
+    parser.add_argument('--top', type=int, default=REPORT_TOP)
+    parser.add_argument('--budget', type=float, default=None, help="بالمللي ثانية (الافتراضي من config.json)")
+    args, _ = parser.parse_known_args(argv)
+    budget_ms = args.budget if args.budget is not None else load_budget()
+    try:
+        total, records = measure(args.module)
+    except Exception as e:
+        print(f"خطأ في استيراد {args.module}: {e}")
+        return 1
+    print(format_report(args.module, total, records, budget_ms, args.top))
+    if total * 1000 > budget_ms:
+        print(f"❌ تجاوز زمن الاستيراد الميزانية ({total * 1000:.1f} ms > {budget_ms:.0f} ms)")
+        return 1
+    print("✅ زمن الاستيراد ضمن الميزانية")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+مجدول مهام الخلفية وموزع نتائجها على خيط الواجهة
+
+Tk لا يقبل أي استدعاء من خيط غير الرئيسي (ولا حتى root.after)، لذلك لا تلمس خيوط العمل الواجهة:
+كل ما يخص الواجهة (النتيجة، الخطأ، التقدم، مؤشر الانشغال) يُرسل إلى طابور يفرغه UIDispatcher
+على الخيط الرئيسي بفحص دوري عبر root.after.
+"""
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+# الأولوية: الرقم الأصغر يُنفذ أولاً
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+# عدد خيوط العمل وفترة فحص طابور الواجهة وأقصى زمن لتفريغه في المرة الواحدة (حتى لا تتجمد الواجهة)
+JOB_WORKERS = 3
+DISPATCH_INTERVAL_MS = 30
+DISPATCH_BUDGET_SECONDS = 0.05
+
+
+class JobCancelled(Exception):
+    """تُرفع داخل المهمة (Job.check_cancelled) لإيقافها بعد طلب الإلغاء"""
+
+
+class UIDispatcher:
+    """طابور استدعاءات يُنفذ على خيط الواجهة: call() آمنة من أي خيط والتفريغ بـ root.after"""
+
+    def __init__(self, root, interval_ms=DISPATCH_INTERVAL_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._queue = queue.SimpleQueue()
+        self._after_id = None
+        self._closed = False
+
+    def call(self, func, *args):
+        """جدولة func(*args) على خيط الواجهة"""
+        if not self._closed:
+            self._queue.put((func, args))
+
+    def start(self):
+        """بدء الفحص الدوري (من خيط الواجهة)"""
+        self._closed = False
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        """إيقاف الفحص وإهمال ما تبقى في الطابور (عند إغلاق النافذة)"""
+        self._closed = True
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _drain(self):
+        self._after_id = None
+        deadline = time.monotonic() + DISPATCH_BUDGET_SECONDS
+        while not self._closed and time.monotonic() < deadline:
+            try:
+                func, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"خطأ في تنفيذ استدعاء على خيط الواجهة: {e}")
+        if not self._closed:
+            try:
+                self._after_id = self.root.after(self.interval_ms, self._drain)
+            except Exception:
+                # النافذة دُمرت
+                self._closed = True
+
+
+class Job:
+    """مهمة خلفية ينفذها JobScheduler: func(job, *args) على خيط عمل
+
+    الدالة تتابع الإلغاء بـ job.cancelled أو job.check_cancelled() (أو تمرر job.cancel_event)،
+    وترسل تقدمها بـ job.report_progress(fraction, message). المهمة تُعد ملغاة إذا أُلغيت قبل
+    أن تبدأ أو رفعت JobCancelled أو حلت محلها مهمة أحدث في مجموعتها.
+    """
+
+    def __init__(self, scheduler, name, func, args, priority, busy, cancellable, group,
+                 on_done, on_error, on_progress, on_cancel):
+        self._scheduler = scheduler
+        self.name = name
+        self.func = func
+        self.args = args
+        self.priority = priority
+        # نص مؤشر الانشغال (None للمهام الصامتة مثل الجلب المسبق والعدادات)
+        self.busy = busy
+        self.cancellable = cancellable
+        self.group = group
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancel = on_cancel
+        self.cancel_event = threading.Event()
+        self.state = 'pending'
+        self.progress = None
+        self.message = None
+        self.result = None
+        self.error = None
+        self._finished = threading.Event()
+
+    def __repr__(self):
+        return f"<Job {self.name} {self.state}>"
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """طلب الإلغاء: المهمة المنتظرة تُحذف فوراً، والجارية تتوقف عند أول فحص للإلغاء"""
+        self.cancel_event.set()
+        self._scheduler._drop_pending(self)
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def report_progress(self, fraction=None, message=None):
+        """تحديث التقدم (fraction بين 0 و1 أو None إذا كان غير معروف) من خيط المهمة"""
+        self.progress, self.message = fraction, message
+        self._scheduler._progress(self)
+
+    def wait(self, timeout=None):
+        """انتظار انتهاء المهمة (لا يُستدعى من خيط الواجهة)"""
+        return self._finished.wait(timeout)
+
+
+class JobScheduler:
+    """مجمع محدود من خيوط العمل ينفذ المهام حسب الأولوية ثم ترتيب الإرسال
+
+    نتائج المهام تصل لخيط الواجهة عبر UIDispatcher: on_done(result) أو on_error(exception)
+    أو on_cancel()، وon_progress(fraction, message) أثناء العمل. on_busy(jobs) تُستدعى
+    على خيط الواجهة كلما تغيرت المهام التي لها نص انشغال أو تقدمها (مؤشر موحد للانشغال).
+    """
+
+    def __init__(self, dispatcher, max_workers=JOB_WORKERS):
+        self.dispatcher = dispatcher
+        self.max_workers = max_workers
+        self.on_busy = None
+        self._cond = threading.Condition()
+        self._heap = []
+        self._order = itertools.count()
+        self._workers = []
+        self._idle = 0
+        self._groups = {}
+        self._running = set()
+        self._busy = []
+        self._busy_pending = False
+        self._closed = False
+
+    def submit(self, name, func, *args, priority=PRIORITY_NORMAL, busy=None, cancellable=False, group=None,
+               on_done=None, on_error=None, on_progress=None, on_cancel=None):
+        """إرسال مهمة وإرجاع Job
+
+        group: مهمة جديدة في نفس المجموعة تلغي السابقة (أحدث بحث أو تحديث فقط هو المهم).
+        """
+        job = Job(self, name, func, args, priority, busy, cancellable, group,
+                  on_done, on_error, on_progress, on_cancel)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("مجدول المهام متوقف")
+            previous = self._groups.get(group) if group is not None else None
+            if group is not None:
+                self._groups[group] = job
+            heapq.heappush(self._heap, (priority, next(self._order), job))
+            if busy:
+                self._busy.append(job)
+            if self._idle == 0 and len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._worker, name=f'job-worker-{len(self._workers) + 1}', daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._cond.notify()
+        if previous is not None:
+            previous.cancel()
+        if busy:
+            self._notify_busy()
+        return job
+
+    def cancel_group(self, group):
+        """إلغاء مهمة المجموعة الحالية إن وجدت"""
+        with self._cond:
+            job = self._groups.get(group)
+        if job is not None:
+            job.cancel()
+
+    def active_jobs(self):
+        """المهام ذات نص الانشغال التي لم تنته بعد"""
+        with self._cond:
+            return list(self._busy)
+
+    def shutdown(self):
+        """إلغاء كل المهام وإيقاف الخيوط بعد انتهاء ما يعمل منها (عند إغلاق البرنامج)"""
+        with self._cond:
+            self._closed = True
+            pending = [job for _, _, job in self._heap]
+            self._heap.clear()
+            running = list(self._running)
+            self._busy.clear()
+            self._cond.notify_all()
+        for job in pending + running:
+            job.cancel_event.set()
+        for job in pending:
+            job.state = 'cancelled'
+            job._finished.set()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._heap and not self._closed:
+                    self._cond.wait()
+                self._idle -= 1
+                if self._closed:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                job.state = 'running'
+                self._running.add(job)
+            self._run(job)
+
+    def _run(self, job):
+        result = error = None
+        cancelled = job.cancelled
+        if not cancelled:
+            try:
+                result = job.func(job, *job.args)
+            except JobCancelled:
+                cancelled = True
+            except Exception as e:
+                error = e
+        with self._cond:
+            superseded = job.group is not None and self._groups.get(job.group) is not job
+        # نتيجة مهمة حلت محلها أحدث في مجموعتها لا تُسلم؛ أما الدالة التي أكملت عملها رغم طلب
+        # الإلغاء (مثل الاستيراد يتوقف بين الدفعات) فنتيجتها صحيحة وتُسلم
+        if cancelled or superseded:
+            self._finish(job, 'cancelled', job.on_cancel)
+        elif error is not None:
+            job.error = error
+            if job.on_error is None:
+                print(f"خطأ في المهمة {job.name}: {error}")
+            self._finish(job, 'failed', job.on_error, error)
+        else:
+            job.result = result
+            self._finish(job, 'done', job.on_done, result)
+
+    def _finish(self, job, state, callback, *args):
+        with self._cond:
+            job.state = state
+            self._running.discard(job)
+            if job.group is not None and self._groups.get(job.group) is job:
+                del self._groups[job.group]
+            was_busy = job in self._busy
+            if was_busy:
+                self._busy.remove(job)
+            closed = self._closed
+        if callback is not None and not closed:
+            self.dispatcher.call(callback, *args)
+        job._finished.set()
+        if was_busy:
+            self._notify_busy()
+
+    def _drop_pending(self, job):
+        """حذف مهمة ملغاة من الطابور قبل أن تبدأ"""
+        with self._cond:
+            if job.state != 'pending':
+                return
+            for i, entry in enumerate(self._heap):
+                if entry[2] is job:
+                    self._heap[i] = self._heap[-1]
+                    self._heap.pop()
+                    heapq.heapify(self._heap)
+                    break
+            else:
+                return
+        self._finish(job, 'cancelled', job.on_cancel)
+
+    def _progress(self, job):
+        if job.on_progress is not None:
+            self.dispatcher.call(job.on_progress, job.progress, job.message)
+        if job.busy:
+            self._notify_busy()
+
+    def _notify_busy(self):
+        # تحديث واحد منتظر على الأكثر في طابور الواجهة مهما كثرت تقارير التقدم
+        with self._cond:
+            if self._busy_pending or self.on_busy is None:
+                return
+            self._busy_pending = True
+        self.dispatcher.call(self._deliver_busy)
+
+    def _deliver_busy(self):
+        with self._cond:
+            self._busy_pending = False
+            jobs = list(self._busy)
+        if self.on_busy is not None:
+            self.on_busy(jobs)
@@ -16,13 +16,14 @@ import sys
 from error_handler import handle_error
 import os
 import logging
-import tkinter as tk
-from tkinter import messagebox
-import sqlite3
 from datetime import datetime
 import shutil
 import platform
 import time
+import threading
+
+# بداية التشغيل لقياس زمن الوصول إلى نافذة رئيسية جاهزة
+STARTUP_STARTED = time.perf_counter()
 
 
 # إعداد المسارات بحيث يعمل البرنامج بشكل صحيح كملف exe أو كود بايثون
@@ -70,6 +71,7 @@ def check_requirements():
     if python_version.major < 3 or (python_version.major == 3 and python_version.minor < 7):
         error_msg = f"يتطلب النظام Python 3.7 أو أحدث. الإصدار الحالي: {python_version.major}.{python_version.minor}"
         logging.error(error_msg)
+        from tkinter import messagebox
         messagebox.showerror("خطأ في المتطلبات", error_msg)
         return False
     
@@ -86,6 +88,7 @@ def check_requirements():
     if missing_modules:
         error_msg = f"المكتبات التالية مفقودة: {', '.join(missing_modules)}"
         logging.error(error_msg)
+        from tkinter import messagebox
         messagebox.showerror("خطأ في المتطلبات", error_msg)
         return False
     
@@ -113,121 +116,157 @@ def create_backup():
                     logging.info(f"تم حذف النسخة الاحتياطية القديمة: {old_backup}")
             # إشعار المستخدم بنجاح النسخ الاحتياطي (يظهر فقط عند النسخ اليدوي وليس عند بدء التشغيل)
             if not getattr(create_backup, 'silent', False):
+                from tkinter import messagebox
                 messagebox.showinfo("نسخ احتياطي", "تم إنشاء نسخة احتياطية بنجاح.")
         return True
     except Exception as e:
-        handle_error("خطأ في إنشاء النسخة الاحتياطية", e)
+        # النسخ الصامت يعمل على خيط خلفي عند بدء التشغيل فلا يعرض نوافذ
+        handle_error("خطأ في إنشاء النسخة الاحتياطية", e, show_messagebox=not getattr(create_backup, 'silent', False))
         return False
 
-def initialize_system():
-    """تهيئة النظام"""
-    logging.info("بدء تهيئة النظام...")
-    
-    # إنشاء المجلدات الأساسية
+def create_directories():
+    """إنشاء المجلدات الأساسية"""
     dirs_to_create = ['files', 'backups', 'reports', 'logs']
     for dir_name in dirs_to_create:
         dir_path = os.path.join(CURRENT_DIR, dir_name)
         os.makedirs(dir_path, exist_ok=True)
-        logging.info(f"تم إنشاء/فحص المجلد: {dir_path}")
-    
-    # إنشاء نسخة احتياطية
-    # عند بدء التشغيل، لا تظهر رسالة النسخ الاحتياطي
+
+
+def create_startup_backup():
+    """نسخة احتياطية عند بدء التشغيل (بدون رسالة)"""
     create_backup.silent = True
-    create_backup()
-    create_backup.silent = False
-    
-    # تهيئة قاعدة البيانات
     try:
-        from customer_issues_database import DatabaseManager
-        db_manager = DatabaseManager()
-        db_manager.init_database()
-        # إضافة مستخدم admin الثابت إذا لم يكن موجودًا
+        create_backup()
+    finally:
+        create_backup.silent = False
+
+
+def initialize_database():
+    """فتح قاعدة البيانات وتطبيق ترحيلاتها (قراءة PRAGMA واحدة للملف المحدث)"""
+    from customer_issues_database import enhanced_db, SCHEMA_VERSION
+    version = enhanced_db.open()
+    if version < SCHEMA_VERSION:
+        raise RuntimeError(f"لم تكتمل ترحيلات قاعدة البيانات (الإصدار {version} من {SCHEMA_VERSION})")
+    return enhanced_db
+
+
+def load_first_page():
+    """الصفحة الأولى من الحالات وعدادات لوحة التحكم والجداول المشتركة في ذاكرة enhanced_db"""
+    from customer_issues_database import enhanced_db
+    enhanced_db.warm_caches()
+
+
+def import_main_window():
+    """استيراد وحدات الواجهة الرئيسية (تعريفات فقط، بدون إنشاء عناصر Tk)"""
+    import customer_issues_window  # noqa: F401
+
+
+# خطوات بدء التشغيل بالترتيب على خيط خلفي: (الاسم، الوصف على شاشة البداية، الدالة).
+# النسخة الاحتياطية قبل الترحيلات حتى تحفظ الملف كما كان قبل تعديل مخططه
+STARTUP_STEPS = [
+    ('directories', "جاري تجهيز المجلدات...", create_directories),
+    ('backup', "جاري إنشاء نسخة احتياطية...", create_startup_backup),
+    ('database', "جاري تجهيز قاعدة البيانات...", initialize_database),
+    ('first_page', "جاري تحميل الحالات...", load_first_page),
+    ('interface', "جاري تحميل الواجهة...", import_main_window),
+]
+
+
+class StartupPipeline:
+    """بدء التشغيل على نافذة Tk واحدة
+
+    شاشة البداية وشاشة الدخول تظهران فوراً، وخطوات STARTUP_STEPS تعمل على خيط خلفي أثناءهما.
+    شاشة البداية تُغلق عند انتهاء الخطوات فعلاً، والدخول ينتظر جاهزية قاعدة البيانات فقط، والنافذة
+    الرئيسية تُبنى على نفس النافذة بعد الدخول وانتهاء الخطوات. زمن الوصول إلى نافذة رئيسية جاهزة
+    يُسجل بدون الوقت الذي انتظر فيه البرنامج المستخدم في شاشة الدخول.
+    """
+
+    poll_interval_ms = 30
+
+    def __init__(self, root):
+        self.root = root
+        self.splash = None
+        self.login = None
+        self.db_ready = threading.Event()
+        self.done = threading.Event()
+        self.current_step = None
+        self.timings = []
+        self.error = None
+        self.user = None
+        self.finished_at = None
+        self.login_at = None
+
+    def start(self):
+        from login_window import LoginWindow
+        self.splash = show_splash_screen(self.root)
+        self.login = LoginWindow(None, self.on_login, master=self.root, ready=self.db_ready)
+        threading.Thread(target=self._run_steps, name='startup', daemon=True).start()
+        self.root.after(self.poll_interval_ms, self._poll)
+
+    def _run_steps(self):
         try:
-            with sqlite3.connect(os.path.join(CURRENT_DIR, 'customer_issues_enhanced.db')) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM employees WHERE performance_number = 1")
-                exists = cursor.fetchone()[0]
-                if not exists:
-                    cursor.execute("INSERT INTO employees (name, position, performance_number, created_date, is_active) VALUES (?, ?, ?, ?, 1)",
-                                   ("admin", "مدير النظام", 1, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-                    conn.commit()
-        except Exception as admin_err:
-            handle_error("خطأ في إضافة مستخدم admin", admin_err, show_messagebox=True)
-        # تأكد من وجود عمود performance_number في كل تشغيل
+            for name, description, step in STARTUP_STEPS:
+                self.current_step = description
+                started = time.perf_counter()
+                result = step()
+                self.timings.append((name, time.perf_counter() - started))
+                if name == 'database':
+                    # شاشة الدخول تستخدم نفس ملف enhanced_db الذي تعمل عليه النافذة الرئيسية
+                    self.login.db_path = os.path.abspath(result.db_name)
+                    self.db_ready.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished_at = time.perf_counter()
+            self.done.set()
+
+    def _poll(self):
+        """متابعة الخيط الخلفي من خيط الواجهة"""
+        if not self.done.is_set():
+            if self.splash is not None and self.splash.winfo_exists() and self.current_step:
+                self.splash.progress_label.config(text=self.current_step)
+            self.root.after(self.poll_interval_ms, self._poll)
+            return
+        if self.splash is not None and self.splash.winfo_exists():
+            self.splash.destroy()
+        self.splash = None
+        if self.error is not None:
+            handle_error("خطأ في تهيئة النظام", self.error, show_messagebox=True)
+            self.root.destroy()
+            return
+        steps = ', '.join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.timings)
+        logging.info(f"✅ تم تهيئة النظام بنجاح ({steps})")
+        if self.user is not None:
+            self.open_main_window()
+
+    def on_login(self, user_id, user_name, performance_number):
+        self.login_at = time.perf_counter()
+        self.user = (user_id, user_name, performance_number)
+        logging.info(f"تسجيل دخول: {user_name}")
+        if self.done.is_set() and self.error is None:
+            self.open_main_window()
+
+    def open_main_window(self):
+        # تُستدعى من root.after فلا يصل استثناؤها إلى main، والنافذة المخفية تبقي البرنامج يعمل بلا واجهة
         try:
-            with sqlite3.connect(os.path.join(CURRENT_DIR, 'customer_issues_enhanced.db')) as conn:
-                cursor = conn.cursor()
-                cursor.execute("PRAGMA table_info(employees)")
-                columns = [row[1] for row in cursor.fetchall()]
-                perf_col = None
-                for row in cursor.execute("PRAGMA table_info(employees)"):
-                    if row[1] == 'performance_number':
-                        perf_col = row
-                # إذا العمود غير موجود أو ليس INTEGER/UNIQUE، أعد بناء الجدول
-                need_migration = False
-                if not perf_col:
-                    need_migration = True
-                elif perf_col[2].upper() != 'INTEGER':
-                    need_migration = True
-                # ترحيل الجدول إذا لزم الأمر
-                if need_migration:
-                    logging.info("يتم ترحيل جدول الموظفين لجعل رقم الأداء INT وفريد...")
-                    # إنشاء جدول مؤقت
-                    cursor.execute('''
-                        CREATE TABLE IF NOT EXISTS employees_new (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            name TEXT,
-                            position TEXT,
-                            performance_number INTEGER UNIQUE NOT NULL,
-                            created_date TEXT,
-                            is_active INTEGER DEFAULT 1
-                        )
-                    ''')
-                    # جلب كل الموظفين القدامى
-                    cursor.execute("SELECT id, name, position, created_date, is_active FROM employees")
-                    old_emps = cursor.fetchall()
-                    # توليد أرقام أداء صحيحة متفردة
-                    used_numbers = set()
-                    next_perf = 1001
-                    for emp in old_emps:
-                        emp_id, name, position, created_date, is_active = emp
-                        # حاول استخراج رقم صحيح من performance_number القديم إن وجد
-                        perf_num = None
-                        try:
-                            cursor.execute("SELECT performance_number FROM employees WHERE id=?", (emp_id,))
-                            val = cursor.fetchone()
-                            if val and val[0]:
-                                try:
-                                    perf_num = int(val[0])
-                                except:
-                                    perf_num = None
-                        except:
-                            perf_num = None
-                        # إذا لم يوجد أو غير صالح، أعطه رقم جديد متفرد
-                        while perf_num is None or perf_num in used_numbers:
-                            perf_num = next_perf
-                            next_perf += 1
-                        used_numbers.add(perf_num)
-                        cursor.execute("INSERT INTO employees_new (name, position, performance_number, created_date, is_active) VALUES (?, ?, ?, ?, ?)",
-                                       (name, position, perf_num, created_date, is_active))
-                    conn.commit()
-                    # حذف الجدول القديم وإعادة تسمية الجديد
-                    cursor.execute("DROP TABLE employees")
-                    cursor.execute("ALTER TABLE employees_new RENAME TO employees")
-                    conn.commit()
-        except Exception as alter_err:
-            handle_error("خطأ في معالجة عمود رقم الأداء", alter_err, show_messagebox=True)
-        logging.info("✅ تم تهيئة قاعدة البيانات بنجاح")
-    except Exception as e:
-        handle_error("خطأ في تهيئة قاعدة البيانات", e, show_messagebox=True)
-        return False
-    
-    logging.info("✅ تم تهيئة النظام بنجاح")
-    return True
-
-def show_splash_screen():
-    """عرض شاشة البداية"""
-    splash = tk.Toplevel()
+            from customer_issues_window import EnhancedMainWindow
+            EnhancedMainWindow(self.root, show_dashboard=True)
+            self.root.deiconify()
+            self.root.update_idletasks()
+        except Exception as e:
+            self.error = e
+            handle_error("خطأ في فتح النافذة الرئيسية", e, show_messagebox=True)
+            self.root.destroy()
+            return
+        # الوقت بين انتهاء الخطوات وضغط المستخدم على الدخول انتظار للمستخدم وليس للبرنامج
+        waited = max(0.0, self.login_at - self.finished_at)
+        elapsed = time.perf_counter() - STARTUP_STARTED - waited
+        logging.info(f"✅ النافذة الرئيسية جاهزة بعد {elapsed * 1000:.0f} ms من بدء التشغيل (بدون انتظار تسجيل الدخول)")
+
+def show_splash_screen(master=None):
+    """عرض شاشة البداية (progress_label فيها لنص الخطوة الجارية)"""
+    import tkinter as tk
+    splash = tk.Toplevel(master)
     splash.title("نظام إدارة مشاكل العملاء v5.0.1")
     splash.geometry("600x400")
     splash.resizable(False, False)
@@ -318,6 +357,7 @@ def show_splash_screen():
         bg='#2c3e50'
     )
     progress_label.pack()
+    splash.progress_label = progress_label
     
     # معلومات المطور
     dev_label = tk.Label(
@@ -340,54 +380,29 @@ def main():
     setup_logging()
     
     logging.info("=" * 50)
-    logging.info("بدء تشغيل نظام إدارة مشاكل العملاء v5.0.1")
+    logging.info(f"بدء تشغيل نظام إدارة مشاكل العملاء v{VERSION}")
     logging.info(f"نظام التشغيل: {platform.system()} {platform.release()}")
     logging.info(f"إصدار Python: {sys.version}")
     logging.info("=" * 50)
     
-    # إنشاء نافذة root مخفية
+    # نافذة root واحدة للبرنامج كله: مخفية حتى تُبنى عليها النافذة الرئيسية
+    import tkinter as tk
     root = tk.Tk()
     root.withdraw()
     
     try:
-        # عرض شاشة البداية
-        splash = show_splash_screen()
-        splash.update()
-
         # فحص المتطلبات
         if not check_requirements():
-            splash.destroy()
-            return 1
-
-        # تهيئة النظام
-        splash.update()
-        if not initialize_system():
-            splash.destroy()
+            root.destroy()
             return 1
 
-        # استيراد وتشغيل الواجهة الرئيسية
-        splash.update()
-        time.sleep(5)  # عرض splash screen لمدة 3 ثواني
-        try:
-            from customer_issues_window import EnhancedMainWindow
-
-            # إغلاق شاشة البداية
-            splash.destroy()
-
-            # إظهار النافذة الرئيسية
-            root.destroy()  # Destroy the hidden root window
-
-            # تطبيق النافذة الرئيسية
-            app = EnhancedMainWindow()
+        # شاشة البداية وشاشة الدخول والتهيئة في الخلفية، ثم النافذة الرئيسية بعد الدخول
+        pipeline = StartupPipeline(root)
+        pipeline.start()
 
-            logging.info("✅ تم تشغيل النظام بنجاح")
-
-            # بدء حلقة الأحداث الرئيسية
-            app.run()
-
-        except ImportError as e:
-            handle_error("خطأ في استيراد الواجهة الرئيسية", e, show_messagebox=True)
-            return 1
+        # بدء حلقة الأحداث الرئيسية
+        root.mainloop()
+        return 1 if pipeline.error is not None else 0
 
     except Exception as e:
         handle_error("خطأ عام في النظام", e, show_messagebox=True)
@@ -402,68 +417,17 @@ def main():
         logging.info("=" * 50)
 
 if __name__ == "__main__":
-    # تهيئة قاعدة البيانات وإنشاء الجداول والمستخدم admin قبل أي واجهة
-    from customer_issues_database import DatabaseManager
-    db_path = os.path.join(CURRENT_DIR, 'customer_issues_enhanced.db')
-    db_manager = DatabaseManager(db_name=db_path)
-    db_manager.init_database()
-    # إضافة مستخدم admin إذا لم يكن موجودًا
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM employees WHERE performance_number = 1")
-        exists = cursor.fetchone()[0]
-        if not exists:
-            cursor.execute("INSERT INTO employees (name, position, performance_number, created_date, is_active) VALUES (?, ?, ?, ?, 1)",
-                           ("admin", "مدير النظام", 1, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-            conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"[DB INIT ERROR] {e}")
-
-    # شاشة الدخول بعد شاشة السبلاش
-    def start_main_app(user_id, user_name, performance_number):
-        sys.exit(main())
-
-    from login_window import LoginWindow
-
-
-    # عرض شاشة السبلاش أولاً مع حماية المؤقتات من أخطاء after
-    import tkinter as tk
-    splash_root = tk.Tk()
-    splash_root.withdraw()
-    splash = show_splash_screen()
-    splash.update()
-
-
-    # --- إدارة مؤقتات after splash بشكل آمن ---
-    splash_timer = None
-    splash_root_timer = None
-
-    def safe_destroy(widget, timer_id=None):
-        try:
-            if timer_id and widget and widget.winfo_exists():
-                widget.after_cancel(timer_id)
-        except Exception:
-            pass
-        try:
-            if widget and widget.winfo_exists():
-                widget.destroy()
-        except Exception:
-            pass
-
-    def destroy_splash():
-        safe_destroy(splash, splash_timer)
-
-    def destroy_splash_root():
-        safe_destroy(splash_root, splash_root_timer)
-
-    splash_timer = splash.after(2000, destroy_splash)
-    splash_root_timer = splash_root.after(2200, destroy_splash_root)
-    try:
-        splash_root.mainloop()
-    except Exception:
-        pass
-
-    # بعد السبلاش، أظهر شاشة الدخول
-    LoginWindow(db_path, on_success=start_main_app)
\ No newline at end of file
+    # --import-report: زمن الاستيراد البارد للنافذة الرئيسية (يعمل في نسخة exe أيضاً)،
+    # لذلك لا تستورد هذه الوحدة tkinter ولا وحدات البرنامج قبل هذا السطر
+    if '--import-report' in sys.argv[1:]:
+        from customer_issues_importtime import main as import_report
+        sys.exit(import_report(sys.argv[1:]))
+    # --search-check: مطابقة البحث الشامل لأجزاء الكلمات وأرقام المشتركين على قاعدة مؤقتة
+    if '--search-check' in sys.argv[1:]:
+        from customer_issues_database import check_search_matching
+        sys.exit(check_search_matching())
+    # --bulk-check: فشل دفعة في الإدخال الجماعي يتراجع عن كل الدفعات السابقة
+    if '--bulk-check' in sys.argv[1:]:
+        from customer_issues_database import check_bulk_insert_atomicity
+        sys.exit(check_bulk_insert_atomicity())
+    sys.exit(main())
@@ -0,0 +1,109 @@
+from customer_issues_database import normalize_arabic
+
+
+# أنواع البحث التي يجيب عنها الفهرس المحلي من ملخصات الحالات المحملة (نوع البحث ← مفتاح الحقل)،
+# وبقية الأنواع تُبحث في قاعدة البيانات
+LOCAL_SEARCH_FIELDS = {
+    "اسم العميل": 'customer_name',
+    "رقم المشترك": 'subscriber_number',
+    "العنوان": 'customer_address',
+}
+
+GRAM_SIZE = 3
+
+
+def _index_text(value):
+    """الصيغة المفهرسة للنص: نفس توحيد قاعدة البيانات مع تجاهل حالة الأحرف اللاتينية كما في LIKE"""
+    if value is None:
+        return ''
+    return normalize_arabic(value).lower()
+
+
+def _grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class TrigramIndex:
+    """فهرس مقلوب لثلاثيات الحروف في الذاكرة للبحث الجزئي (مثل LIKE '%نص%') في حقول الحالات
+
+    لكل حقل: ثلاثية ← أرقام الحالات التي تحتويها، مع النص الموحد لكل حالة للتحقق من المرشحين.
+    النصوص الأقصر من ثلاثة أحرف تُطابق بالمرور على نصوص الحقل مباشرة.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.postings = {field: {} for field in self.fields}
+        self.texts = {field: {} for field in self.fields}
+
+    def __len__(self):
+        return len(self.texts[self.fields[0]]) if self.fields else 0
+
+    def clear(self):
+        for field in self.fields:
+            self.postings[field].clear()
+            self.texts[field].clear()
+
+    def build(self, cases):
+        """إعادة بناء الفهرس من قائمة حالات (dicts)"""
+        self.clear()
+        for field in self.fields:
+            postings, texts = self.postings[field], self.texts[field]
+            for case in cases:
+                text = texts[case['id']] = _index_text(case.get(field))
+                for gram in _grams(text):
+                    ids = postings.get(gram)
+                    if ids is None:
+                        postings[gram] = {case['id']}
+                    else:
+                        ids.add(case['id'])
+
+    def add(self, case):
+        """فهرسة حالة أو إعادة فهرستها بعد تعديلها"""
+        case_id = case['id']
+        for field in self.fields:
+            text = _index_text(case.get(field))
+            old_text = self.texts[field].get(case_id)
+            if old_text == text:
+                continue
+            postings = self.postings[field]
+            if old_text is not None:
+                self._unlink(postings, case_id, _grams(old_text))
+            self.texts[field][case_id] = text
+            for gram in _grams(text):
+                postings.setdefault(gram, set()).add(case_id)
+
+    def remove(self, case_id):
+        """حذف حالة من الفهرس"""
+        for field in self.fields:
+            old_text = self.texts[field].pop(case_id, None)
+            if old_text is not None:
+                self._unlink(self.postings[field], case_id, _grams(old_text))
+
+    @staticmethod
+    def _unlink(postings, case_id, grams):
+        for gram in grams:
+            ids = postings.get(gram)
+            if ids is not None:
+                ids.discard(case_id)
+                if not ids:
+                    del postings[gram]
+
+    def search(self, field, query):
+        """أرقام الحالات التي يحتوي حقلها field على النص query (مجموعة)"""
+        query = _index_text(query).strip()
+        texts = self.texts[field]
+        if not query:
+            return set(texts)
+        if len(query) < GRAM_SIZE:
+            return {case_id for case_id, text in texts.items() if query in text}
+        postings = self.postings[field]
+        candidates = None
+        # التقاطع يبدأ بأصغر القوائم
+        for ids in sorted((postings.get(gram, ()) for gram in _grams(query)), key=len):
+            if not ids:
+                return set()
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        # الثلاثيات قد تتطابق بترتيب مختلف عن النص المطلوب، فيُتحقق من كل مرشح
+        return {case_id for case_id in candidates if query in texts[case_id]}
@@ -0,0 +1,447 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import namedtuple
+from datetime import datetime
+
+
+# ما تغير في قائمة الحالات بعد تطبيق تحديث: حالات جديدة وحالات معدلة (كلاهما dicts) وأرقام المحذوفة
+CaseListDelta = namedtuple('CaseListDelta', ['inserted', 'updated', 'removed'])
+
+
+def case_list_key(case):
+    """مفتاح ترتيب قائمة الحالات (تنازلياً) كما في get_cases_page: (modified_date, id)"""
+    return (case.get('modified_date') or '', case.get('id') or 0)
+
+
+class CaseListModel:
+    """الحالات المحملة في القائمة مرتبة بآخر تعديل ومفهرسة برقم الحالة
+
+    التحديثات تُطبق كفروق (إضافة، تعديل في المكان، حذف، إعادة ترتيب) والحالات التي لم تتغير
+    تبقى نفس الكائنات، فلا تعيد القائمة الافتراضية تعبئة إلا بطاقات الحالات المتغيرة.
+    index (اختياري، مثل TrigramIndex) يُحدث مع كل تغيير ليبحث فيه search.
+    """
+
+    def __init__(self, index=None):
+        self.items = []
+        self.by_id = {}
+        self.index = index
+
+    def __len__(self):
+        return len(self.items)
+
+    def reset(self, cases):
+        """استبدال المحتوى بالكامل (مع الإبقاء على نفس كائن القائمة items)"""
+        self.items[:] = cases
+        self.by_id = {case['id']: case for case in cases}
+        if self.index is not None:
+            self.index.build(cases)
+
+    def extend(self, cases):
+        """إلحاق صفحة تالية"""
+        self.items.extend(cases)
+        self.by_id.update((case['id'], case) for case in cases)
+        if self.index is not None:
+            for case in cases:
+                self.index.add(case)
+
+    def position(self, case_id):
+        """موقع الحالة في القائمة أو None"""
+        case = self.by_id.get(case_id)
+        if case is None:
+            return None
+        return next(i for i, item in enumerate(self.items) if item is case)
+
+    def _insertion_point(self, case):
+        key = case_list_key(case)
+        for i, item in enumerate(self.items):
+            if case_list_key(item) < key:
+                return i
+        return len(self.items)
+
+    def upsert(self, case, has_more=False):
+        """إضافة حالة أو تحديثها في موضعها الصحيح من الترتيب
+
+        has_more تعني وجود صفحات لم تُحمل بعد: الحالة التي يقع ترتيبها بعد آخر حالة محملة
+        لا تُضاف (ستأتي مع صفحتها). يرجع CaseListDelta بما تغير فعلاً.
+        """
+        existing = self.by_id.get(case['id'])
+        if existing is not None:
+            if existing == case:
+                return CaseListDelta([], [], [])
+            del self.items[self.position(case['id'])]
+            del self.by_id[case['id']]
+        index = self._insertion_point(case)
+        if has_more and index == len(self.items):
+            if existing is not None and self.index is not None:
+                self.index.remove(case['id'])
+            return CaseListDelta([], [], [case['id']] if existing is not None else [])
+        self.items.insert(index, case)
+        self.by_id[case['id']] = case
+        if self.index is not None:
+            self.index.add(case)
+        if existing is not None:
+            return CaseListDelta([], [case], [])
+        return CaseListDelta([case], [], [])
+
+    def remove(self, case_id):
+        """حذف حالة من القائمة إن كانت محملة"""
+        index = self.position(case_id)
+        if index is None:
+            return CaseListDelta([], [], [])
+        del self.items[index]
+        del self.by_id[case_id]
+        if self.index is not None:
+            self.index.remove(case_id)
+        return CaseListDelta([], [], [case_id])
+
+    def apply_snapshot(self, cases):
+        """مقارنة القائمة بنسخة جديدة من قاعدة البيانات وتطبيق الفروق فقط
+
+        cases هي الحالات الحالية لنفس النطاق المحمل بالترتيب الصحيح؛ الحالات المطابقة
+        تبقى نفس الكائنات القديمة.
+        """
+        inserted, updated = [], []
+        merged = []
+        for case in cases:
+            existing = self.by_id.get(case['id'])
+            if existing is None:
+                inserted.append(case)
+            elif existing != case:
+                updated.append(case)
+            else:
+                case = existing
+            merged.append(case)
+        fresh_ids = {case['id'] for case in merged}
+        removed = [case_id for case_id in self.by_id if case_id not in fresh_ids]
+        self.items[:] = merged
+        self.by_id = {case['id']: case for case in merged}
+        if self.index is not None:
+            for case_id in removed:
+                self.index.remove(case_id)
+            for case in inserted + updated:
+                self.index.add(case)
+        return CaseListDelta(inserted, updated, removed)
+
+    def search(self, field, query):
+        """الحالات المحملة التي يحتوي حقلها field على query بترتيب القائمة (يتطلب index)"""
+        matches = self.index.search(field, query)
+        # القائمة مرتبة بنفس المفتاح: النتائج القليلة تُرتب وحدها، والكثيرة تُؤخذ بالمرور على القائمة
+        if len(matches) * 8 < len(self.items):
+            return sorted((self.by_id[case_id] for case_id in matches), key=case_list_key, reverse=True)
+        return [case for case in self.items if case['id'] in matches]
+
+    @staticmethod
+    def patch_view(view, delta, insert_new=True):
+        """تطبيق فروق على قائمة عرض بترتيب خاص (نتائج بحث أو ترتيب يدوي) دون إعادة ترتيبها
+
+        المعدلة تُستبدل في مكانها والمحذوفة تُزال، والجديدة تُضاف في أول القائمة إذا insert_new.
+        """
+        changed = {case['id']: case for case in delta.updated}
+        removed = set(delta.removed)
+        if changed or removed:
+            view[:] = [changed.get(case['id'], case) for case in view if case['id'] not in removed]
+        if insert_new and delta.inserted:
+            present = {case['id'] for case in view}
+            view[:0] = [case for case in delta.inserted if case['id'] not in present]
+        return view
+
+
+class CaseCard:
+    """بطاقة حالة قابلة لإعادة الاستخدام: أدواتها تُنشأ مرة واحدة ثم تُعاد تعبئتها ببيانات أي حالة"""
+
+    def __init__(self, case_list):
+        self.case_list = case_list
+        colors = case_list.colors
+        fonts = case_list.fonts
+        self.index = None
+        self.case = None
+        self._painted = None
+
+        self.frame = tk.Frame(case_list.canvas, bg=colors['bg_light'], relief='solid', bd=1, padx=12, pady=8,
+                              highlightbackground=colors['border_light'], highlightthickness=1)
+        self.window = case_list.canvas.create_window(0, 0, window=self.frame, anchor='nw', state='hidden')
+
+        content_frame = tk.Frame(self.frame, bg=colors['bg_light'])
+        content_frame.pack(fill='both', expand=True)
+
+        # رأس البطاقة: اسم العميل يميناً وشارة الحالة يساراً
+        header_frame = tk.Frame(content_frame, bg=colors['bg_light'])
+        header_frame.pack(fill='x', pady=(0, 8))
+        self.name_label = tk.Label(header_frame, font=fonts['subheader'], fg=colors['text_main'], bg=colors['bg_light'])
+        self.name_label.pack(side='right')
+        self.status_badge = tk.Label(header_frame, font=fonts['small'], fg='white', padx=10, pady=3, relief='flat')
+        self.status_badge.pack(side='left')
+
+        # أسطر التفاصيل ثابتة العدد حتى يتساوى ارتفاع كل البطاقات (السطر الفارغ يبقى بلا نص)
+        details_frame = tk.Frame(content_frame, bg=colors['bg_light'])
+        details_frame.pack(fill='x', pady=(0, 8))
+        self.detail_rows = []
+        for font_name in ('normal', 'normal', 'small', 'small'):
+            row_frame = tk.Frame(details_frame, bg=colors['bg_light'])
+            row_frame.pack(fill='x', pady=2)
+            icon_label = tk.Label(row_frame, font=fonts['small'], bg=colors['bg_light'])
+            icon_label.pack(side='right', padx=(0, 5))
+            text_label = tk.Label(row_frame, font=fonts[font_name], fg=colors['text_subtle'], bg=colors['bg_light'])
+            text_label.pack(side='right')
+            self.detail_rows.append((icon_label, text_label))
+
+        # كل الأدوات عدا شارة الحالة تأخذ لون خلفية البطاقة عند التمييز أو المرور
+        self._background_widgets = [content_frame, header_frame, self.name_label, details_frame]
+        for icon_label, text_label in self.detail_rows:
+            self._background_widgets.extend((icon_label.master, icon_label, text_label))
+
+        for widget in [self.frame, self.status_badge] + self._background_widgets:
+            widget.bind('<Button-1>', lambda e: case_list._on_card_click(self))
+            widget.bind('<Enter>', lambda e: case_list._on_card_hover(self, True))
+            widget.bind('<Leave>', lambda e: case_list._on_card_hover(self, False))
+            case_list._bind_scrolling(widget)
+
+    def bind_case(self, index, case):
+        """تعبئة البطاقة ببيانات الحالة رقم index في القائمة"""
+        self.index = index
+        self.case = case
+        if isinstance(case, dict):
+            customer_name = case.get('customer_name') or 'بدون اسم'
+            subscriber_number = case.get('subscriber_number', '')
+            status = case.get('status') or 'غير محدد'
+            category_name = case.get('category_name', '')
+            created_date = case.get('created_date', '')
+            modified_by_name = case.get('modified_by_name', '')
+        else:
+            _, customer_name, subscriber_number, status, category_name, _, modified_by_name, created_date, _ = case
+
+        formatted_date = ''
+        if created_date:
+            try:
+                formatted_date = datetime.strptime(created_date, "%Y-%m-%d %H:%M:%S").strftime("%Y/%m/%d")
+            except (TypeError, ValueError):
+                pass
+
+        self.name_label.config(text=customer_name)
+        self.status_badge.config(text=status, bg=self.case_list.status_color(status))
+        details = (
+            ("📞", f"رقم المشترك: {subscriber_number}" if subscriber_number else ''),
+            ("🏷️", f"التصنيف: {category_name}" if category_name else ''),
+            ("📅", f"تاريخ الإنشاء: {formatted_date}" if formatted_date else ''),
+            ("👤", f"آخر تعديل: {modified_by_name}" if modified_by_name else ''),
+        )
+        for (icon_label, text_label), (icon, text) in zip(self.detail_rows, details):
+            icon_label.config(text=icon if text else '')
+            text_label.config(text=text)
+
+    def paint(self, selected, hovered):
+        """تلوين البطاقة حسب التحديد ومرور الماوس (دون إعادة تلوين إذا لم تتغير الحالة)"""
+        state = (selected, hovered)
+        if state == self._painted:
+            return
+        self._painted = state
+        colors = self.case_list.colors
+        bg = colors['bg_card'] if selected or hovered else colors['bg_light']
+        self.frame.config(
+            bg=bg,
+            relief='raised' if hovered else 'solid', bd=2 if hovered else 1,
+            highlightbackground=colors['button_action'] if selected else colors['border_light'],
+            highlightthickness=2 if selected else 1,
+        )
+        for widget in self._background_widgets:
+            widget.config(bg=bg)
+
+
+class VirtualCaseList:
+    """قائمة بطاقات حالات افتراضية: عدد صغير من البطاقات بحجم منطقة العرض يُعاد ربطه بالبيانات عند التمرير
+
+    كل حالة تشغل خانة بارتفاع ثابت في منطقة تمرير بطول القائمة كلها، والبطاقات الظاهرة فقط
+    هي التي تُنقل إلى خاناتها وتُعبأ ببياناتها. on_select(index) تُستدعى عند اختيار حالة بالنقر
+    أو بالأسهم، وon_near_end() عند الاقتراب من نهاية القائمة (لجلب الصفحة التالية).
+    """
+
+    STATUS_COLOR_KEYS = {
+        'جديدة': 'status_new',
+        'قيد التنفيذ': 'status_inprogress',
+        'تم حلها': 'status_solved',
+        'مغلقة': 'status_closed',
+    }
+
+    def __init__(self, parent, colors, fonts, on_select=None, on_near_end=None, spacing=6):
+        self.colors = colors
+        self.fonts = fonts
+        self.on_select = on_select
+        self.on_near_end = on_near_end
+        self.spacing = spacing
+        self.items = []
+        self.selected_index = 0
+        self.hovered_card = None
+        self.cards = []
+        self.row_height = None
+
+        self.frame = tk.Frame(parent, bg=colors['bg_light'])
+        self.canvas = tk.Canvas(self.frame, bg=colors['bg_light'], highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient='vertical', command=self.canvas.yview, style='AlwaysOn.TScrollbar')
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.canvas.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.canvas.bind('<Configure>', lambda e: self.refresh())
+        self._bind_scrolling(self.canvas)
+        self.canvas.bind('<Up>', lambda e: self.move_selection(-1))
+        self.canvas.bind('<Down>', lambda e: self.move_selection(1))
+        self.canvas.bind('<Prior>', lambda e: self.move_selection(-self._visible_rows()))
+        self.canvas.bind('<Next>', lambda e: self.move_selection(self._visible_rows()))
+        # تركيز لوحة المفاتيح عند النقر
+        self.canvas.bind('<Button-1>', lambda e: self.canvas.focus_set())
+
+    def status_color(self, status):
+        """لون شارة الحالة"""
+        return self.colors[self.STATUS_COLOR_KEYS.get(status, 'status_closed')]
+
+    def set_items(self, items, selected_index=0):
+        """عرض قائمة جديدة من الحالات من أولها"""
+        self.items = items
+        self.selected_index = selected_index
+        self.canvas.yview_moveto(0)
+        self.refresh()
+
+    def update_items(self, items, selected_index=None, see=False):
+        """عرض قائمة بعد تحديث جزئي مع الإبقاء على موضع التمرير
+
+        البطاقات التي بقيت حالاتها نفس الكائنات لا يُعاد تعبئتها.
+        """
+        self.items = items
+        if selected_index is not None:
+            self.selected_index = selected_index
+        if self.items:
+            self.selected_index = max(0, min(self.selected_index, len(self.items) - 1))
+        self.refresh()
+        if see and self.items:
+            self.see(self.selected_index)
+            self._render()
+
+    def refresh(self):
+        """إعادة حساب منطقة التمرير وعرض البطاقات الظاهرة (بعد تغير القائمة أو حجم النافذة)"""
+        if self.row_height is None and self.items:
+            self._measure_row_height()
+        if self.row_height:
+            width = max(self.canvas.winfo_width(), 1)
+            self.canvas.configure(scrollregion=(0, 0, width, len(self.items) * self.row_height))
+        self._render()
+
+    def select(self, index, see=True):
+        """تحديد حالة وتمييز بطاقتها دون استدعاء on_select"""
+        if not self.items:
+            return
+        self.selected_index = max(0, min(index, len(self.items) - 1))
+        if see:
+            self.see(self.selected_index)
+        self._render()
+
+    def move_selection(self, step):
+        """نقل التحديد بالأسهم واستدعاء on_select للحالة الجديدة"""
+        if not self.items:
+            return 'break'
+        index = max(0, min(self.selected_index + step, len(self.items) - 1))
+        if index != self.selected_index:
+            self.select(index)
+            if self.on_select:
+                self.on_select(index)
+        return 'break'
+
+    def see(self, index):
+        """تمرير القائمة حتى تظهر الحالة رقم index كاملة"""
+        if not self.row_height or not self.items:
+            return
+        total = len(self.items) * self.row_height
+        top = self.canvas.canvasy(0)
+        view_height = self.canvas.winfo_height()
+        row_top = index * self.row_height
+        row_bottom = row_top + self.row_height
+        if row_top < top:
+            self.canvas.yview_moveto(row_top / total)
+        elif row_bottom > top + view_height:
+            self.canvas.yview_moveto(max(row_bottom - view_height, 0) / total)
+
+    def _measure_row_height(self):
+        """ارتفاع الخانة من ارتفاع بطاقة فعلية معبأة بأول حالة"""
+        card = self._ensure_cards(1)[0]
+        card.bind_case(0, self.items[0])
+        card.frame.update_idletasks()
+        self.row_height = card.frame.winfo_reqheight() + self.spacing
+
+    def _visible_rows(self):
+        if not self.row_height:
+            return 1
+        return max(self.canvas.winfo_height() // self.row_height, 1)
+
+    def _ensure_cards(self, count):
+        """إنشاء بطاقات إضافية حتى يصل عددها إلى count (لا تُحذف البطاقات الزائدة بل تُخفى)"""
+        while len(self.cards) < count:
+            self.cards.append(CaseCard(self))
+        return self.cards
+
+    def _render(self):
+        """نقل البطاقات إلى خانات الحالات الظاهرة وتعبئتها وإخفاء الباقي"""
+        if not self.row_height or not self.items:
+            for card in self.cards:
+                self._hide(card)
+            return
+        first = max(int(self.canvas.canvasy(0)) // self.row_height, 0)
+        # صف إضافي للبطاقة الظاهرة جزئياً في أسفل منطقة العرض
+        cards = self._ensure_cards(self._visible_rows() + 2)
+        last = min(first + len(cards), len(self.items))
+        width = max(self.canvas.winfo_width() - 2 * self.spacing, 1)
+
+        # البطاقة التي تعرض نفس كائن الحالة تنتقل إلى خانتها الجديدة دون إعادة تعبئة
+        # (بعد إضافة حالة أو حذفها تتزحزح الخانات ولا تتغير إلا البطاقات المعنية)
+        shown = {id(card.case): card for card in cards if card.index is not None}
+        placed = {}
+        for index in range(first, last):
+            card = shown.pop(id(self.items[index]), None)
+            if card is not None:
+                placed[index] = card
+        spare = [card for card in cards if card not in placed.values()]
+
+        for index in range(first, last):
+            card = placed.get(index) or spare.pop()
+            if card.case is not self.items[index]:
+                card.bind_case(index, self.items[index])
+            card.index = index
+            self.canvas.coords(card.window, self.spacing, index * self.row_height + self.spacing // 2)
+            self.canvas.itemconfigure(card.window, state='normal', width=width, height=self.row_height - self.spacing)
+            card.paint(index == self.selected_index, card is self.hovered_card)
+        for card in spare:
+            self._hide(card)
+
+    def _hide(self, card):
+        """إخفاء بطاقة زائدة (ونقلها خارج منطقة التمرير احتياطاً)"""
+        if card.index is None:
+            return
+        card.index = None
+        self.canvas.coords(card.window, 0, -10000)
+        self.canvas.itemconfigure(card.window, state='hidden')
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._render()
+        if float(last) >= 0.95 and self.on_near_end:
+            self.on_near_end()
+
+    def _on_card_click(self, card):
+        if card.index is None:
+            return
+        self.canvas.focus_set()
+        self.select(card.index, see=False)
+        if self.on_select:
+            self.on_select(card.index)
+
+    def _on_card_hover(self, card, inside):
+        if inside:
+            self.hovered_card = card
+        elif self.hovered_card is card:
+            self.hovered_card = None
+        if card.index is not None:
+            card.paint(card.index == self.selected_index, card is self.hovered_card)
+
+    def _bind_scrolling(self, widget):
+        """تمرير بعجلة الماوس فوق القائمة أو أي بطاقة (Windows/macOS وLinux)"""
+        widget.bind('<MouseWheel>', lambda e: self.canvas.yview_scroll(int(-1 * (e.delta / 120)) or (-1 if e.delta > 0 else 1), 'units'))
+        widget.bind('<Button-4>', lambda e: self.canvas.yview_scroll(-1, 'units'))
+        widget.bind('<Button-5>', lambda e: self.canvas.yview_scroll(1, 'units'))
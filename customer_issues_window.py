@@ -3,16 +3,31 @@ from tkinter import ttk, messagebox, filedialog, Menu
 from datetime import datetime
 import os
 import json
-from customer_issues_database import enhanced_db
+from customer_issues_database import enhanced_db, SCHEMA_VERSION
 from customer_issues_file_manager import FileManager
-import sqlite3
-import threading
+from customer_issues_widgets import VirtualCaseList, CaseListModel, CaseListDelta
+from customer_issues_trigram import TrigramIndex, LOCAL_SEARCH_FIELDS
+from customer_issues_jobs import JobScheduler, UIDispatcher, JobCancelled, PRIORITY_HIGH, PRIORITY_LOW
 import time
-import shutil
+
+# تبويبات الحالة بترتيب إضافتها (RTL): (المفتاح، العنوان، دالة البناء، جزء حزمة الحالة الذي يعرضه).
+# كل تبويب يُبنى عند أول اختيار له، وبيانات الحالة تُقرأ للتبويب الظاهر فقط (get_case_bundle parts)
+CASE_TABS = [
+    ('reports', "التقارير", 'create_reports_tab', None),
+    ('audit_log', "سجل التعديلات", 'create_audit_log_tab', 'audit_log'),
+    ('correspondences', "المراسلات", 'create_correspondences_tab', 'correspondences'),
+    ('attachments', "المرفقات", 'create_attachments_tab', 'attachments'),
+    ('basic_data', "البيانات الأساسية", 'create_basic_data_tab', None),
+]
+
 
 class EnhancedMainWindow:
-    def __init__(self):
-        self.root = tk.Tk()
+    def __init__(self, root=None, show_dashboard=False):
+        """root: نافذة Tk قائمة (من مسار بدء التشغيل) بدل إنشاء نافذة جديدة
+
+        show_dashboard=True يعرض لوحة التحكم مباشرة بدل بناء الواجهة الرئيسية ثم استبدالها في run().
+        """
+        self.root = root if root is not None else tk.Tk()
         # --- لوحة الألوان الموحدة المحسنة ---
         self.colors = {
             'bg_main': '#f8f9fa',
@@ -68,29 +83,53 @@ class EnhancedMainWindow:
         except Exception:
             pass
 
-        # إنشاء قائمة منسدلة
-        self.create_menu_bar()
-        
-        # إزالة Header ثابت لتوفير مساحة
-
-        # إنشاء شريط الأدوات
-        self.create_toolbar()
-
         # المتغيرات
         self.file_manager = FileManager()
         self.current_case_id = None
-        self.cases_data = []
+        # الحالات المحملة (نموذج القائمة مع فهرس ثلاثيات للبحث المحلي) والحالات المعروضة بعد البحث أو الترتيب
+        self.case_model = CaseListModel(TrigramIndex(LOCAL_SEARCH_FIELDS.values()))
+        self.cases_data = self.case_model.items
         self.filtered_cases = []
+        # ترقيم قائمة الحالات: الصفحات التالية تُجلب عند التمرير لآخر القائمة
+        self.cases_page_size = 100
+        # عدد الحالات المجاورة (قبل وبعد) التي تُجلب مسبقاً للتنقل بالأسهم
+        self.case_prefetch_radius = 5
+        self.cases_next_cursor = None
+        self.cases_page_year = None
+        self.cases_list_paged = True
+        self._loading_more_cases = False
+        # حالات معدلة تنتظر قراءة صفوفها في الخلفية (apply_case_changes)
+        self._pending_case_changes = set()
+        self._pending_case_see = False
+        # البحث أثناء الكتابة: مهلة التأخير ثم مهمة بحث تلغي السابقة،
+        # والجيل يزداد مع كل طلب حتى تُهمل نتائج الطلبات الأقدم
+        self.search_debounce_ms = 250
+        self._search_after_id = None
+        self._search_generation = 0
+        # الفلتر المركب المطبق حالياً على القائمة وعدادات أوجهه في الشريط الجانبي
+        self.active_case_filter = None
+        self.facet_display_limit = 5
+        self._facet_generation = 0
         self.basic_data_widgets = {}
-        self.scrollable_frame = None
+        # سجل التبويبات: المفتاح ← (الإطار، دالة البناء، جزء الحزمة)، والمبني منها،
+        # ورقم الحالة المعروضة بياناتها في كل تبويب
+        self.tab_factories = {}
+        self.built_tabs = set()
+        self.tab_case_ids = {}
+        self.case_list = None
         self.original_received_date = None
         self.current_case_status = None
         self.created_years = []
         self.received_years = []
         self.notification_label = None
-        self.loading_indicator = None
-        self.is_loading = False
         self.pending_dashboard_case = None
+        # كل عمل طويل (تحديث، بحث، تصدير، استيراد، استعادة نسخة) مهمة في مجمع خيوط محدود؛
+        # نتائجها تصل لخيط الواجهة عبر الموزع ومؤشر الانشغال في شريط الحالة
+        self.dispatcher = UIDispatcher(self.root)
+        self.jobs = JobScheduler(self.dispatcher)
+        self.jobs.on_busy = self.show_busy_jobs
+        self.busy_job = None
+        self.dispatcher.start()
 
         # ربط وظائف النظام
         try:
@@ -99,14 +138,12 @@ class EnhancedMainWindow:
         except Exception as e:
             self.functions = None
 
-        # إنشاء الواجهة
-        self.create_main_layout()
-
-        # إنشاء شريط الحالة
-        self.create_status_bar()
-
-        # تحميل البيانات الأولية بعد إنشاء كل عناصر الواجهة (لضمان وجود scrollable_frame)
-        self.after_main_layout()
+        # إنشاء الواجهة: لوحة التحكم، أو القوائم وشريط الأدوات والتخطيط الرئيسي وشريط الحالة
+        # ثم البيانات الأولية بعد إنشاء كل العناصر (لضمان وجود قائمة الحالات)
+        if show_dashboard:
+            self.show_dashboard()
+        else:
+            self.show_main_window()
 
         # ربط أحداث الإغلاق
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -131,7 +168,9 @@ class EnhancedMainWindow:
         file_menu.add_separator()
         file_menu.add_command(label="🖨️ طباعة", command=self.print_case, accelerator="Ctrl+P")
         file_menu.add_command(label="📊 تصدير البيانات", command=self.export_cases_data)
+        file_menu.add_command(label="📥 استيراد حالات (CSV/Excel)", command=self.import_cases_data)
         file_menu.add_command(label="📥 استعادة نسخة احتياطية", command=self.restore_backup)
+        file_menu.add_command(label="🛠️ صيانة قاعدة البيانات", command=self.maintain_database)
         file_menu.add_separator()
         file_menu.add_command(label="⚙️ الإعدادات", command=self.show_settings_window)
         file_menu.add_separator()
@@ -271,6 +310,19 @@ class EnhancedMainWindow:
                                          bg=self.colors['header'])
         self.cases_count_label.pack(side='right', padx=5)
         
+        # مؤشر المهام الجارية في الخلفية (يظهر أثناء عملها فقط، مع زر إلغاء للمهام القابلة للإلغاء)
+        self.busy_frame = tk.Frame(info_frame, bg=self.colors['header'])
+        self.busy_label = tk.Label(self.busy_frame, text="", font=self.fonts['small'], fg='white',
+                                   bg=self.colors['header'])
+        self.busy_label.pack(side='right', padx=5)
+        self.busy_progress = ttk.Progressbar(self.busy_frame, mode='indeterminate', length=120, maximum=100)
+        self.busy_progress.pack(side='right', padx=5)
+        self.busy_cancel_btn = tk.Button(self.busy_frame, text="✖ إلغاء", command=self.cancel_busy_job,
+                                         font=self.fonts['small'], bg=self.colors['button_delete'], fg='white',
+                                         relief='flat', padx=6, pady=0)
+        self._busy_animating = False
+        self.show_busy_jobs(self.jobs.active_jobs())
+        
         # الوقت والتاريخ (يسار)
         time_frame = tk.Frame(info_frame, bg=self.colors['header'])
         time_frame.pack(side='left', fill='y')
@@ -357,72 +409,46 @@ class EnhancedMainWindow:
         # تحويل العودة إلى hex
         return '#{:02x}{:02x}{:02x}'.format(*lightened)
 
-    def show_loading_indicator(self, message="جاري التحميل..."):
-        """عرض مؤشر التحميل محسن"""
-        if self.loading_indicator:
-            self.hide_loading_indicator()
-        
-        self.is_loading = True
-        
-        # إنشاء نافذة التحميل
-        self.loading_indicator = tk.Toplevel(self.root)
-        self.loading_indicator.title("جاري التحميل")
-        self.loading_indicator.geometry("400x200")
-        self.loading_indicator.resizable(False, False)
-        self.loading_indicator.transient(self.root)
-        self.loading_indicator.grab_set()
-        
-        # توسيط النافذة
-        self.loading_indicator.update_idletasks()
-        x = (self.root.winfo_screenwidth() // 2) - (400 // 2)
-        y = (self.root.winfo_screenheight() // 2) - (200 // 2)
-        self.loading_indicator.geometry(f"400x200+{x}+{y}")
-        
-        # إزالة أزرار النافذة
-        self.loading_indicator.overrideredirect(True)
-        
-        # الإطار الرئيسي
-        main_frame = tk.Frame(self.loading_indicator, bg=self.colors['bg_main'], padx=20, pady=20)
-        main_frame.pack(fill='both', expand=True)
-        
-        # أيقونة التحميل
-        loading_icon = tk.Label(main_frame, text="⏳", font=('Arial', 48), 
-                               bg=self.colors['bg_main'], fg=self.colors['button_action'])
-        loading_icon.pack(pady=(0, 20))
-        
-        # رسالة التحميل
-        message_label = tk.Label(main_frame, text=message, 
-                                font=self.fonts['subheader'], 
-                                bg=self.colors['bg_main'], fg=self.colors['text_main'])
-        message_label.pack(pady=(0, 20))
-        
-        # شريط التقدم
-        progress_frame = tk.Frame(main_frame, bg=self.colors['bg_main'])
-        progress_frame.pack(fill='x', pady=(0, 10))
-        
-        self.progress_bar = ttk.Progressbar(progress_frame, mode='indeterminate', 
-                                           length=300, style='TProgressbar')
-        self.progress_bar.pack()
-        self.progress_bar.start(10)
-        
-        # نص إضافي
-        info_label = tk.Label(main_frame, text="يرجى الانتظار...", 
-                             font=self.fonts['small'], 
-                             bg=self.colors['bg_main'], fg=self.colors['text_subtle'])
-        info_label.pack()
-        
-        # تحديث النافذة
-        self.loading_indicator.update()
-    
-    def hide_loading_indicator(self):
-        """إخفاء مؤشر التحميل"""
-        self.is_loading = False
-        if self.loading_indicator:
-            try:
-                self.loading_indicator.destroy()
-                self.loading_indicator = None
-            except:
-                pass
+    def show_busy_jobs(self, jobs):
+        """مؤشر الانشغال الموحد في شريط الحالة لمهام الخلفية الجارية (يُستدعى من JobScheduler.on_busy)"""
+        if not hasattr(self, 'busy_frame') or not self.busy_frame.winfo_exists():
+            return
+        if not jobs:
+            self.busy_job = None
+            self.busy_progress.stop()
+            self._busy_animating = False
+            self.busy_frame.pack_forget()
+            return
+        # أحدث مهمة هي المعروضة، والباقي عددها فقط
+        job = self.busy_job = jobs[-1]
+        text = f"⏳ {job.busy}"
+        if job.message:
+            text += f" - {job.message}"
+        if len(jobs) > 1:
+            text += f" (+{len(jobs) - 1})"
+        self.busy_label.config(text=text)
+        if job.progress is None:
+            if not self._busy_animating:
+                self.busy_progress.config(mode='indeterminate')
+                self.busy_progress.start(15)
+                self._busy_animating = True
+        else:
+            if self._busy_animating:
+                self.busy_progress.stop()
+                self._busy_animating = False
+            self.busy_progress.config(mode='determinate', value=job.progress * 100)
+        if job.cancellable:
+            self.busy_cancel_btn.pack(side='right', padx=5)
+        else:
+            self.busy_cancel_btn.pack_forget()
+        if not self.busy_frame.winfo_ismapped():
+            self.busy_frame.pack(side='right', fill='y', padx=10)
+
+    def cancel_busy_job(self):
+        """إلغاء المهمة المعروضة في مؤشر الانشغال"""
+        if self.busy_job is not None and self.busy_job.cancellable:
+            self.busy_job.cancel()
+            self.busy_label.config(text=f"⏳ {self.busy_job.busy} - جاري الإلغاء...")
 
     def show_notification(self, message, duration=3000, notification_type="info"):
         """عرض إشعار محسن مع أنواع مختلفة وتصميم أفضل"""
@@ -656,14 +682,53 @@ Escape     - مسح التحديد
         if not confirm:
             return
 
-        try:
-            db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'customer_issues_enhanced.db')
-            shutil.copy2(backup_file, db_path)
+        # النسخ إلى الملف الحي بـ Connection.backup على خيط عمل دون إغلاق الاتصالات: ما يطلبه
+        # المستخدم أثناء الاستعادة ينتظرها ثم يقرأ النسخة المستعادة بعد ترحيلها
+        def restored(migrated):
+            if not migrated:
+                messagebox.showerror(
+                    "خطأ في الاستعادة",
+                    "تم نسخ الملف لكن تعذر ترحيله إلى إصدار المخطط الحالي "
+                    f"(الإصدار {enhanced_db.schema_version} من {SCHEMA_VERSION}).\n"
+                    "استعد نسخة أخرى قبل متابعة العمل."
+                )
+                return
             self.show_notification("تم استعادة النسخة الاحتياطية بنجاح. سيتم إعادة تحميل البيانات.", notification_type="success")
             self.refresh_data()
-        except Exception as e:
+
+        def failed(e):
             messagebox.showerror("خطأ في الاستعادة", f"فشل في استعادة النسخة الاحتياطية:\n{e}")
 
+        self.jobs.submit('restore', lambda job: enhanced_db.restore_from(backup_file), priority=PRIORITY_HIGH,
+                         busy="جاري استعادة النسخة الاحتياطية...", on_done=restored, on_error=failed)
+
+    def maintain_database(self):
+        """صيانة الفهارس (REINDEX/ANALYZE) وفهرس البحث الشامل في الخلفية وعرض تقرير بحالتها"""
+        def maintain(job):
+            if not enhanced_db.reindex():
+                return None
+            lines = []
+            for index in enhanced_db.get_index_report():
+                mark = "✅" if index['ok'] else "❌"
+                lines.append(f"{mark} {index['name']} ({index['table']}: {index['columns']})\n    {index['purpose']}")
+            if enhanced_db.fts_enabled:
+                mark = "✅" if enhanced_db.rebuild_search_index() else "❌"
+                lines.append(f"{mark} cases_fts (FTS5 trigram)\n    search_cases: شامل")
+            else:
+                lines.append("⚠️ فهرس البحث الشامل (FTS5 trigram) غير متاح - يتم البحث بـ LIKE")
+            return lines
+
+        def show_report(lines):
+            if lines is None:
+                messagebox.showerror("خطأ", "فشل في صيانة قاعدة البيانات.")
+                return
+            self.show_info_dialog("تقرير الفهارس", "\n".join(lines))
+            self.show_notification("تمت صيانة قاعدة البيانات بنجاح", notification_type="success")
+
+        self.jobs.submit('maintenance', maintain, busy="جاري صيانة قاعدة البيانات...", group='maintenance',
+                         on_done=show_report,
+                         on_error=lambda e: messagebox.showerror("خطأ", f"فشل في صيانة قاعدة البيانات:\n{e}"))
+
     def hide_notification(self):
         """إخفاء الإشعار"""
         if self.notification_label:
@@ -763,6 +828,10 @@ Escape     - مسح التحديد
             self.functions.load_initial_data()
         else:
             self.load_initial_data()
+        self.refresh_case_facets()
+        
+        # متابعة تعديلات الموظفين الآخرين على نفس ملف قاعدة البيانات (تُطبق على خيط الواجهة)
+        enhanced_db.watch_changes(lambda batch: self.dispatcher.call(self.apply_external_changes, batch))
         
         # تحميل الحالة المعلقة من لوحة التحكم إذا وجدت
         if hasattr(self, 'pending_dashboard_case') and self.pending_dashboard_case:
@@ -867,58 +936,206 @@ Escape     - مسح التحديد
         widget.bind('<Enter>', show_tooltip)
     
     def refresh_data(self):
-        """إعادة تحميل البيانات من قاعدة البيانات"""
-        try:
-            # فحص وجود عناصر الواجهة قبل التحديث
-            if hasattr(self, 'status_label') and self.status_label and self.status_label.winfo_exists():
-                self.status_label.config(text="جاري تحديث البيانات...")
-            self.show_loading_indicator("جاري تحديث البيانات...")
-            
-            # تشغيل التحديث في خيط منفصل لتجنب تجميد الواجهة
-            def update_data():
-                try:
-                    # تحديث البيانات الأساسية فقط
-                    self.cases_data = enhanced_db.get_all_cases() if hasattr(enhanced_db, 'get_all_cases') else []
-                    self.filtered_cases = self.cases_data.copy()
-                    
-                    # تحديث قائمة الحالات
-                    self.update_cases_list()
-                    
-                    # تحديث شريط الحالة
-                    try:
-                        if hasattr(self, 'cases_count_label') and self.cases_count_label and self.cases_count_label.winfo_exists():
-                            total_cases = len(self.cases_data)
-                            self.cases_count_label.config(text=f"📋 جميع الحالات: {total_cases}")
-                    except Exception:
-                        pass
-                    
-                    # تحديث قوائم السنوات
-                    self.received_years = sorted({str(case.get('received_date', '')).split('-')[0] for case in self.cases_data if case.get('received_date')}, reverse=True)
-                    self.created_years = sorted({str(case.get('created_date', '')).split('-')[0] for case in self.cases_data if case.get('created_date')}, reverse=True)
-                    
-                    # تحديث خيارات السنة
-                    self.update_year_filter_options()
-                    
-                    # تحديث التبويبات إذا كانت الحالة محملة
-                    if self.current_case_id:
-                        self.load_attachments()
-                        self.load_correspondences()
-                        self.load_audit_log()
-                    
-                    self.root.after(0, lambda: self.show_notification("تم إعادة تحميل البيانات بنجاح", notification_type="success"))
-                    self.root.after(0, lambda: self.status_label.config(text="جاهز") if hasattr(self, 'status_label') and self.status_label and self.status_label.winfo_exists() else None)
-                except Exception as e:
-                    self.root.after(0, lambda e=e: self.show_notification(f"خطأ في إعادة تحميل البيانات: {str(e)}", notification_type="error"))
-                    self.root.after(0, lambda e=e: messagebox.showerror("خطأ", f"فشل في إعادة تحميل البيانات:\n{e}"))
-                finally:
-                    self.root.after(0, self.hide_loading_indicator)
-            
-            threading.Thread(target=update_data, daemon=True).start()
-            
-        except Exception as e:
-            self.hide_loading_indicator()
+        """إعادة تحميل البيانات من قاعدة البيانات (مهمة خلفية تحل محل أي تحديث لم ينته)"""
+        # المعطيات تُقرأ هنا لأن المهمة لا تلمس عناصر Tk
+        case_id = self.current_case_id
+        parts = self.visible_case_parts()
+        page_size = max(len(self.case_model), self.cases_page_size)
+        year = self.cases_page_year
+
+        def update_data(job):
+            # إعادة قراءة النطاق المحمل من القائمة (تُطبق الفروق فقط) والتبويب الظاهر للحالة المحملة
+            cases, next_cursor = enhanced_db.get_cases_page(page_size=page_size, year=year)
+            bundle = enhanced_db.get_case_bundle(case_id, parts=parts) if case_id else None
+            return cases, next_cursor, bundle
+
+        def show_data(result):
+            cases, next_cursor, bundle = result
+            self.apply_case_snapshot(cases, next_cursor)
+            if bundle and case_id == self.current_case_id:
+                self.render_case_bundle(bundle)
+            self.show_notification("تم إعادة تحميل البيانات بنجاح", notification_type="success")
+            self._set_search_status("✅ جاهز")
+
+        def show_error(e):
             self.show_notification(f"خطأ في إعادة تحميل البيانات: {str(e)}", notification_type="error")
             messagebox.showerror("خطأ", f"فشل في إعادة تحميل البيانات:\n{e}")
+
+        self.jobs.submit('refresh', update_data, busy="جاري تحديث البيانات...", group='refresh',
+                         on_done=show_data, on_error=show_error)
+
+    def load_cases_first_page(self, year=None):
+        """تحميل الصفحة الأولى من قائمة الحالات (الصفحات التالية تُجلب عند التمرير)"""
+        self.cases_page_year = year if year and year != "الكل" else None
+        cases, self.cases_next_cursor = enhanced_db.get_cases_page(
+            page_size=self.cases_page_size, year=self.cases_page_year)
+        self.case_model.reset(cases)
+        self.filtered_cases = self.cases_data.copy()
+        self.cases_list_paged = True
+        # السنوات من قاعدة البيانات لأن الصفحة الأولى لا تضم كل الحالات
+        self.received_years = enhanced_db.get_case_years('received_date')
+        self.created_years = enhanced_db.get_case_years('created_date')
+
+    def load_more_cases(self):
+        """جلب الصفحة التالية في الخلفية وإلحاق بطاقاتها بالقائمة دون إعادة بنائها"""
+        if not self.cases_list_paged or self.cases_next_cursor is None:
+            self._loading_more_cases = False
+            return
+        cursor = self.cases_next_cursor
+        page_size = self.cases_page_size
+        year = self.cases_page_year
+
+        def append_page(result):
+            self._loading_more_cases = False
+            # القائمة أُعيد تحميلها أثناء الجلب (تحديث أو تغيير السنة) فالصفحة لم تعد تاليتها
+            if cursor != self.cases_next_cursor or year != self.cases_page_year:
+                return
+            cases, self.cases_next_cursor = result
+            self.case_model.extend(cases)
+            self.filtered_cases.extend(cases)
+            if self.case_list and self.cases_canvas.winfo_exists():
+                self.case_list.refresh()
+
+        def failed(e):
+            self._loading_more_cases = False
+            print(f"خطأ في تحميل الصفحة التالية من الحالات: {e}")
+
+        self.jobs.submit('more-cases', lambda job: enhanced_db.get_cases_page(cursor, page_size, year),
+                         priority=PRIORITY_HIGH, group='more-cases', on_done=append_page, on_error=failed,
+                         on_cancel=lambda: setattr(self, '_loading_more_cases', False))
+
+    def apply_case_changes(self, changed_ids=(), removed_ids=(), see=False):
+        """تحديث قائمة الحالات بعد حفظ أو حذف بفروق مستهدفة بدل إعادة تحميلها
+
+        removed_ids حالات حُذفت تُزال فوراً، وchanged_ids حالات أُضيفت أو عُدلت تُقرأ صفوفها في
+        الخلفية. كل استدعاء يعيد قراءة كل الحالات المنتظرة في مهمة تحل محل السابقة.
+        """
+        removed_ids = list(removed_ids)
+        if removed_ids:
+            for case_id in removed_ids:
+                self._pending_case_changes.discard(case_id)
+                self.case_model.remove(case_id)
+            self._apply_case_delta(CaseListDelta([], [], removed_ids))
+        self._pending_case_changes.update(changed_ids)
+        self._pending_case_see = self._pending_case_see or see
+        if not self._pending_case_changes:
+            return
+        case_ids = list(self._pending_case_changes)
+        year = self.cases_page_year
+        self.jobs.submit('case-rows', lambda job: enhanced_db.get_case_list_rows(case_ids, year),
+                         priority=PRIORITY_HIGH, group='case-rows',
+                         on_done=lambda rows: self._apply_case_rows(case_ids, rows, year),
+                         on_error=lambda e: print(f"خطأ في تحديث بطاقات الحالات: {e}"))
+
+    def _apply_case_rows(self, case_ids, rows, year):
+        """تطبيق صفوف الحالات المعدلة التي قرأتها apply_case_changes على النموذج والعرض"""
+        # حالة حُذفت بعد إرسال القراءة لم تعد منتظرة، فصفها المقروء قبل الحذف يُهمل
+        case_ids = [case_id for case_id in case_ids if case_id in self._pending_case_changes]
+        self._pending_case_changes.difference_update(case_ids)
+        see, self._pending_case_see = self._pending_case_see, False
+        if year != self.cases_page_year:
+            # القائمة أُعيد تحميلها بفلتر سنة آخر بعد القراءة
+            return
+        has_more = self.cases_next_cursor is not None
+        inserted, updated, removed = [], [], []
+        for case_id in case_ids:
+            case = rows.get(case_id)
+            if case is None:
+                # لم تعد تطابق فلتر السنة
+                self.case_model.remove(case_id)
+                removed.append(case_id)
+                continue
+            delta = self.case_model.upsert(case, has_more)
+            if delta.inserted:
+                inserted.append(case)
+            else:
+                updated.append(case)
+        self._apply_case_delta(CaseListDelta(inserted, updated, removed), see)
+
+    def apply_case_snapshot(self, cases, next_cursor):
+        """تطبيق نسخة جديدة من النطاق المحمل من القائمة كفروق على النموذج والعرض"""
+        delta = self.case_model.apply_snapshot(cases)
+        self.cases_next_cursor = next_cursor
+        self._apply_case_delta(delta)
+        self.update_cases_count_label()
+        self.refresh_year_filter_values()
+
+    def apply_external_changes(self, batch):
+        """تطبيق تغييرات سجل التغييرات (ChangeBatch) على القائمة والحالة المعروضة"""
+        if getattr(self, 'is_closing', False) or self.case_list is None or not self.cases_canvas.winfo_exists():
+            return
+        # الدفعات الكبيرة (استيراد مثلاً) أو السجل الناقص: مزامنة النطاق المحمل كله بالفروق
+        if not batch.complete or len(batch.changed) + len(batch.removed) > self.cases_page_size:
+            self.resync_case_list()
+            return
+        self.apply_case_changes(batch.changed, batch.removed)
+        if self.current_case_id in batch.removed:
+            self.show_notification("تم حذف الحالة المعروضة من مستخدم آخر", notification_type="warning")
+        elif self.current_case_id in batch.changed:
+            # التبويبات للعرض فقط؛ حقول البيانات الأساسية لا تُستبدل حتى لا يضيع تعديل لم يُحفظ
+            self.reload_case_tabs()
+        self.update_cases_count_label()
+
+    def resync_case_list(self):
+        """إعادة قراءة النطاق المحمل من القائمة في الخلفية وتطبيقه كفروق"""
+        page_size = max(len(self.case_model), self.cases_page_size)
+        year = self.cases_page_year
+
+        def read_snapshot(job):
+            return enhanced_db.get_cases_page(page_size=page_size, year=year)
+
+        self.jobs.submit('resync', read_snapshot, priority=PRIORITY_LOW, group='resync',
+                         on_done=lambda result: self.apply_case_snapshot(*result),
+                         on_error=lambda e: print(f"خطأ في مزامنة قائمة الحالات: {e}"))
+
+    def _apply_case_delta(self, delta, see=False):
+        """نقل فروق النموذج إلى قائمة العرض وتحديث البطاقات المتغيرة فقط"""
+        if self.cases_list_paged:
+            # العرض هو الحالات المحملة نفسها بترتيبها
+            self.filtered_cases = self.cases_data.copy()
+        else:
+            CaseListModel.patch_view(self.filtered_cases, delta)
+        for index, case in enumerate(self.filtered_cases):
+            if case.get('id') == self.current_case_id:
+                self.selected_case_index = index
+                break
+        if self.case_list and self.cases_canvas.winfo_exists():
+            self.case_list.update_items(self.filtered_cases, self.selected_case_index, see)
+
+    def update_cases_count_label(self):
+        """تحديث عدد الحالات في شريط الحالة من استعلام العد المخزن مؤقتاً"""
+        try:
+            if hasattr(self, 'cases_count_label') and self.cases_count_label and self.cases_count_label.winfo_exists():
+                self.cases_count_label.config(text=f"📋 جميع الحالات: {enhanced_db.count_cases()}")
+        except Exception:
+            pass
+        # أي تغيير في عدد الحالات قد يغير الأوجه أيضاً
+        self.refresh_case_facets()
+
+    def attach_tree_pager(self, tree, scrollbar, fetch_page, insert_case):
+        """تعبئة Treeview صفحة بصفحة: الصفحة الأولى فوراً والتالية عند التمرير لآخر الجدول
+
+        fetch_page(cursor) ترجع (الحالات، المؤشر التالي) وinsert_case(case) تضيف صفاً واحداً
+        """
+        state = {'cursor': None, 'done': False, 'pending': False}
+
+        def load_page():
+            state['pending'] = False
+            if state['done'] or not tree.winfo_exists():
+                return
+            cases, state['cursor'] = fetch_page(state['cursor'])
+            state['done'] = state['cursor'] is None
+            for case in cases:
+                insert_case(case)
+
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            if float(last) >= 0.95 and not state['done'] and not state['pending']:
+                state['pending'] = True
+                tree.after_idle(load_page)
+
+        tree.configure(yscrollcommand=on_scroll)
+        load_page()
     
     def create_main_layout(self):
         """إنشاء التخطيط الرئيسي محسن مع استغلال أفضل للمساحات"""
@@ -1026,7 +1243,9 @@ Escape     - مسح التحديد
         self.search_entry = tk.Entry(search_input_frame, textvariable=self.search_value_var,
                                     font=self.fonts['small'])
         self.search_entry.pack(fill='x')
-        self.search_entry.bind('<KeyRelease>', self.perform_search)
+        # البحث يبدأ بعد توقف الكتابة لحظة، وEnter ينفذه فوراً
+        self.search_value_var.trace_add('write', self._on_search_value_changed)
+        self.search_entry.bind('<Return>', self.perform_search)
         
         # سيتم إنشاء الكومبو بوكس ديناميكياً حسب نوع البحث
         self.search_combo = None
@@ -1040,251 +1259,340 @@ Escape     - مسح التحديد
         self.sort_combo = ttk.Combobox(sort_frame, textvariable=self.sort_var, values=sort_options, state='readonly', width=15)
         self.sort_combo.pack(side='right', padx=(3, 0))
         self.sort_combo.bind('<<ComboboxSelected>>', self.apply_sorting)
+        
+        # الفلتر المركب والفلاتر المحفوظة وعدادات الأوجه
+        self.create_filter_panel(parent)
+        self.create_facet_panel(parent)
+    
+    def create_filter_panel(self, parent):
+        """لوحة الفلتر المركب في الشريط الجانبي: فلاتر محفوظة وشروط متعددة تُترجم إلى filter_cases"""
+        panel = tk.Frame(parent, bg=self.colors['bg_light'])
+        panel.pack(fill='x', padx=8, pady=(0, 6))
+        
+        header = tk.Frame(panel, bg=self.colors['bg_light'])
+        header.pack(fill='x')
+        tk.Label(header, text="فلتر:", font=self.fonts['small'], bg=self.colors['bg_light']).pack(side='right')
+        self.saved_filter_var = tk.StringVar()
+        self.saved_filter_combo = ttk.Combobox(header, textvariable=self.saved_filter_var, state='readonly', width=14)
+        self.saved_filter_combo.pack(side='right', padx=(3, 0), fill='x', expand=True)
+        self.saved_filter_combo.bind('<<ComboboxSelected>>', self.apply_saved_filter)
+        self.filter_toggle_btn = tk.Button(header, text="🧰 ▼", font=self.fonts['small'], relief='flat',
+                                           bg=self.colors['bg_light'], cursor='hand2', command=self.toggle_filter_panel)
+        self.filter_toggle_btn.pack(side='left')
+        
+        # الشروط (مخفية حتى فتح اللوحة)
+        body = tk.Frame(panel, bg=self.colors['bg_light'])
+        self.filter_body = body
+        label_options = {'font': self.fonts['small'], 'bg': self.colors['bg_light']}
+        
+        mode_row = tk.Frame(body, bg=self.colors['bg_light'])
+        mode_row.pack(fill='x', pady=(4, 0))
+        tk.Label(mode_row, text="المطابقة:", **label_options).pack(side='right')
+        self.filter_mode_var = tk.StringVar(value="كل الشروط")
+        ttk.Combobox(mode_row, textvariable=self.filter_mode_var, values=["كل الشروط", "أي شرط"],
+                     state='readonly', width=10).pack(side='right', padx=(3, 0))
+        
+        lists_row = tk.Frame(body, bg=self.colors['bg_light'])
+        lists_row.pack(fill='x', pady=(4, 0))
+        status_frame = tk.Frame(lists_row, bg=self.colors['bg_light'])
+        status_frame.pack(side='right', fill='x', expand=True)
+        tk.Label(status_frame, text="الحالة:", **label_options).pack(anchor='e')
+        self.filter_status_list = tk.Listbox(status_frame, selectmode='multiple', height=4, exportselection=False,
+                                             font=self.fonts['small'], justify='right')
+        self.filter_status_list.pack(fill='x')
+        category_frame = tk.Frame(lists_row, bg=self.colors['bg_light'])
+        category_frame.pack(side='right', fill='x', expand=True, padx=(0, 4))
+        tk.Label(category_frame, text="التصنيف:", **label_options).pack(anchor='e')
+        self.filter_category_list = tk.Listbox(category_frame, selectmode='multiple', height=4, exportselection=False,
+                                               font=self.fonts['small'], justify='right')
+        self.filter_category_list.pack(fill='x')
+        
+        employee_row = tk.Frame(body, bg=self.colors['bg_light'])
+        employee_row.pack(fill='x', pady=(4, 0))
+        tk.Label(employee_row, text="الموظف:", **label_options).pack(side='right')
+        self.filter_employee_var = tk.StringVar()
+        self.filter_employee_combo = ttk.Combobox(employee_row, textvariable=self.filter_employee_var,
+                                                  state='readonly', width=14)
+        self.filter_employee_combo.pack(side='right', padx=(3, 0), fill='x', expand=True)
+        
+        date_row = tk.Frame(body, bg=self.colors['bg_light'])
+        date_row.pack(fill='x', pady=(4, 0))
+        self.filter_date_field_map = {"تاريخ الورود": 'received_date', "تاريخ الإدخال": 'created_date', "تاريخ الحل": 'solved_date'}
+        self.filter_date_field_var = tk.StringVar(value="تاريخ الورود")
+        ttk.Combobox(date_row, textvariable=self.filter_date_field_var, values=list(self.filter_date_field_map),
+                     state='readonly', width=9).pack(side='right')
+        self.filter_date_from_var = tk.StringVar()
+        self.filter_date_to_var = tk.StringVar()
+        tk.Label(date_row, text="من", **label_options).pack(side='right', padx=(3, 0))
+        tk.Entry(date_row, textvariable=self.filter_date_from_var, width=10, font=self.fonts['small']).pack(side='right')
+        tk.Label(date_row, text="إلى", **label_options).pack(side='right', padx=(3, 0))
+        tk.Entry(date_row, textvariable=self.filter_date_to_var, width=10, font=self.fonts['small']).pack(side='right')
+        
+        debt_row = tk.Frame(body, bg=self.colors['bg_light'])
+        debt_row.pack(fill='x', pady=(4, 0))
+        tk.Label(debt_row, text="المديونية من", **label_options).pack(side='right')
+        self.filter_debt_min_var = tk.StringVar()
+        self.filter_debt_max_var = tk.StringVar()
+        tk.Entry(debt_row, textvariable=self.filter_debt_min_var, width=8, font=self.fonts['small']).pack(side='right', padx=(3, 0))
+        tk.Label(debt_row, text="إلى", **label_options).pack(side='right', padx=(3, 0))
+        tk.Entry(debt_row, textvariable=self.filter_debt_max_var, width=8, font=self.fonts['small']).pack(side='right')
+        
+        buttons_row = tk.Frame(body, bg=self.colors['bg_light'])
+        buttons_row.pack(fill='x', pady=(6, 0))
+        for text, command, color in (("تطبيق", self.apply_case_filter, 'button_action'),
+                                     ("مسح", self.clear_case_filter, 'button_secondary'),
+                                     ("حفظ", self.save_current_filter, 'button_save'),
+                                     ("حذف", self.delete_current_filter, 'button_delete')):
+            tk.Button(buttons_row, text=text, font=self.fonts['small'], bg=self.colors[color], fg='white',
+                      relief='flat', cursor='hand2', command=command).pack(side='right', padx=(0, 3))
+        
+        self.saved_filters = {}
+        self.load_saved_filters()
+
+    def toggle_filter_panel(self):
+        """إظهار أو إخفاء شروط الفلتر المركب (القيم تُحدث عند كل فتح)"""
+        if self.filter_body.winfo_ismapped():
+            self.filter_body.pack_forget()
+            self.filter_toggle_btn.config(text="🧰 ▼")
+            return
+        selected_statuses = {self.filter_status_list.get(i) for i in self.filter_status_list.curselection()}
+        selected_categories = {self.filter_category_list.get(i) for i in self.filter_category_list.curselection()}
+        self._fill_filter_listbox(self.filter_status_list, [s[0] for s in enhanced_db.get_status_options()], selected_statuses)
+        self._fill_filter_listbox(self.filter_category_list, [c[1] for c in enhanced_db.get_categories()], selected_categories)
+        self.filter_employee_combo['values'] = [""] + [e[1] for e in enhanced_db.get_employees(active_only=False)]
+        self.filter_body.pack(fill='x')
+        self.filter_toggle_btn.config(text="🧰 ▲")
+
+    @staticmethod
+    def _fill_filter_listbox(listbox, values, selected):
+        listbox.delete(0, tk.END)
+        for index, value in enumerate(values):
+            listbox.insert(tk.END, value)
+            if value in selected:
+                listbox.selection_set(index)
+
+    def build_case_filter(self):
+        """شجرة الفلتر من قيم اللوحة (None مع رسالة خطأ إذا كانت قيمة غير صالحة)"""
+        conditions = []
+        statuses = [self.filter_status_list.get(i) for i in self.filter_status_list.curselection()]
+        if statuses:
+            conditions.append(['status', 'in', statuses])
+        categories = [enhanced_db.lookups.category_id(self.filter_category_list.get(i))
+                      for i in self.filter_category_list.curselection()]
+        categories = [c for c in categories if c is not None]
+        if categories:
+            conditions.append(['category_id', 'in', categories])
+        employee_id = enhanced_db.lookups.employee_id(self.filter_employee_var.get())
+        if employee_id is not None:
+            conditions.append(['modified_by', '=', employee_id])
+        date_field = self.filter_date_field_map[self.filter_date_field_var.get()]
+        try:
+            for var, op in ((self.filter_date_from_var, '>='), (self.filter_date_to_var, '<=')):
+                value = var.get().strip().replace('/', '-')
+                if value:
+                    datetime.strptime(value, "%Y-%m-%d")
+                    conditions.append([date_field, op, value])
+        except ValueError:
+            messagebox.showerror("خطأ في الفلتر", "صيغة التاريخ يجب أن تكون YYYY-MM-DD")
+            return None
+        try:
+            for var, op in ((self.filter_debt_min_var, '>='), (self.filter_debt_max_var, '<=')):
+                value = var.get().strip()
+                if value:
+                    conditions.append(['debt_amount', op, float(value)])
+        except ValueError:
+            messagebox.showerror("خطأ في الفلتر", "قيمة المديونية يجب أن تكون رقماً")
+            return None
+        return ['and' if self.filter_mode_var.get() == "كل الشروط" else 'or'] + conditions
+
+    def _fill_filter_form(self, tree):
+        """عرض شجرة فلتر محفوظ في اللوحة (الشجرة التي تنشئها build_case_filter)"""
+        self.clear_filter_form()
+        self.filter_mode_var.set("كل الشروط" if tree[0] == 'and' else "أي شرط")
+        if not self.filter_body.winfo_ismapped():
+            self.toggle_filter_panel()
+        date_fields = {field: label for label, field in self.filter_date_field_map.items()}
+        for condition in tree[1:]:
+            field, op, value = condition[0], condition[1], condition[-1]
+            if field == 'status':
+                self._fill_filter_listbox(self.filter_status_list, self.filter_status_list.get(0, tk.END), set(value))
+            elif field == 'category_id':
+                names = {enhanced_db.lookups.category_name(c) for c in value}
+                self._fill_filter_listbox(self.filter_category_list, self.filter_category_list.get(0, tk.END), names)
+            elif field == 'modified_by':
+                self.filter_employee_var.set(enhanced_db.lookups.employee_name(value, ""))
+            elif field in date_fields:
+                self.filter_date_field_var.set(date_fields[field])
+                (self.filter_date_from_var if op == '>=' else self.filter_date_to_var).set(value)
+            elif field == 'debt_amount':
+                (self.filter_debt_min_var if op == '>=' else self.filter_debt_max_var).set(f"{value:g}")
+
+    def clear_filter_form(self):
+        self.filter_status_list.selection_clear(0, tk.END)
+        self.filter_category_list.selection_clear(0, tk.END)
+        for var in (self.filter_employee_var, self.filter_date_from_var, self.filter_date_to_var,
+                    self.filter_debt_min_var, self.filter_debt_max_var):
+            var.set("")
+
+    def apply_case_filter(self, tree=None):
+        """تنفيذ فلتر مركب كمهمة بحث في الخلفية وعرض نتيجته في القائمة"""
+        if tree is None:
+            tree = self.build_case_filter()
+            if tree is None:
+                return
+        if len(tree) == 1:
+            self.clear_case_filter()
+            return
+        self._search_generation += 1
+        self.active_case_filter = tree
+        self._submit_search(enhanced_db.filter_cases, (tree,), True)
+        self.refresh_case_facets()
+
+    def clear_case_filter(self):
+        """مسح شروط الفلتر وعرض كل الحالات"""
+        self.clear_filter_form()
+        self.saved_filter_var.set("")
+        self.perform_search()
+
+    def create_facet_panel(self, parent):
+        """عدادات الأوجه (الحالة، التصنيف، الموظف، السنة) للفلتر الحالي؛ النقر على قيمة يضيفها للفلتر"""
+        self.facets_frame = tk.Frame(parent, bg=self.colors['bg_light'])
+        self.facets_frame.pack(fill='x', padx=8, pady=(0, 6))
+
+    def facet_date_field(self):
+        """حقل التاريخ لوجه السنة: حقل تاريخ البحث في الشريط الجانبي"""
+        return self.date_field_map.get(self.date_field_var.get(), 'received_date')
+
+    def refresh_case_facets(self):
+        """قراءة عدادات أوجه الفلتر الحالي في الخلفية (النتيجة مخزنة في ذاكرة نتائج البحث)"""
+        if not hasattr(self, 'facets_frame'):
+            return
+        self._facet_generation += 1
+        generation, tree, date_field = self._facet_generation, self.active_case_filter, self.facet_date_field()
+
+        self.jobs.submit('facets', lambda job: enhanced_db.get_facets(tree, date_field),
+                         priority=PRIORITY_LOW, group='facets',
+                         on_done=lambda facets: self.show_case_facets(generation, facets),
+                         on_error=lambda e: print(f"خطأ في قراءة عدادات الأوجه: {e}"))
+
+    def show_case_facets(self, generation, facets):
+        """رسم عدادات الأوجه (أكبر القيم في كل وجه) كروابط قابلة للنقر"""
+        if generation != self._facet_generation or getattr(self, 'is_closing', False):
+            return
+        if not self.facets_frame.winfo_exists():
+            return
+        for child in self.facets_frame.winfo_children():
+            child.destroy()
+        lookups = enhanced_db.lookups
+        sections = (
+            ("الحالة", 'status', lambda value: value),
+            ("التصنيف", 'category', lambda value: lookups.category_name(value, str(value))),
+            ("الموظف", 'employee', lambda value: lookups.employee_name(value, str(value))),
+            ("السنة", 'year', str),
+        )
+        for title, facet, label_of in sections:
+            counts = facets.get(facet) or {}
+            if not counts:
+                continue
+            row = tk.Frame(self.facets_frame, bg=self.colors['bg_light'])
+            row.pack(fill='x', pady=(2, 0))
+            tk.Label(row, text=f"{title}:", font=self.fonts['small'], fg=self.colors['text_subtle'],
+                     bg=self.colors['bg_light']).pack(side='right')
+            top = sorted(counts.items(), key=lambda item: -item[1])[:self.facet_display_limit]
+            for value, count in top:
+                link = tk.Label(row, text=f"{label_of(value)} ({count})", font=self.fonts['small'],
+                                fg=self.colors['info'], bg=self.colors['bg_light'], cursor='hand2')
+                link.pack(side='right', padx=(4, 0))
+                link.bind('<Button-1>', lambda e, f=facet, v=value: self.on_facet_click(f, v))
+
+    def on_facet_click(self, facet, value):
+        """تضييق الفلتر بقيمة وجه: تُكتب في لوحة الفلتر ثم يُطبق الفلتر منها"""
+        if not self.filter_body.winfo_ismapped():
+            self.toggle_filter_panel()
+        if facet == 'status':
+            self._fill_filter_listbox(self.filter_status_list, self.filter_status_list.get(0, tk.END), {value})
+        elif facet == 'category':
+            self._fill_filter_listbox(self.filter_category_list, self.filter_category_list.get(0, tk.END),
+                                      {enhanced_db.lookups.category_name(value)})
+        elif facet == 'employee':
+            self.filter_employee_var.set(enhanced_db.lookups.employee_name(value, ""))
+        elif facet == 'year':
+            labels = {field: label for label, field in self.filter_date_field_map.items()}
+            self.filter_date_field_var.set(labels[self.facet_date_field()])
+            self.filter_date_from_var.set(f"{value}-01-01")
+            self.filter_date_to_var.set(f"{value}-12-31")
+        self.apply_case_filter()
+
+    def load_saved_filters(self):
+        """تحميل أسماء الفلاتر المحفوظة في القائمة المنسدلة"""
+        self.saved_filters = {f['name']: f['filter'] for f in enhanced_db.get_saved_filters()}
+        self.saved_filter_combo['values'] = list(self.saved_filters)
+
+    def apply_saved_filter(self, event=None):
+        tree = self.saved_filters.get(self.saved_filter_var.get())
+        if tree:
+            self._fill_filter_form(tree)
+            self.apply_case_filter(tree)
+
+    def save_current_filter(self):
+        """حفظ شروط اللوحة كفلتر مسمى"""
+        from tkinter import simpledialog
+        tree = self.build_case_filter()
+        if tree is None or len(tree) == 1:
+            messagebox.showwarning("تنبيه", "حدد شرطاً واحداً على الأقل قبل الحفظ.")
+            return
+        name = simpledialog.askstring("حفظ الفلتر", "اسم الفلتر:", initialvalue=self.saved_filter_var.get(), parent=self.root)
+        if not name or not name.strip():
+            return
+        try:
+            enhanced_db.save_filter(name.strip(), tree)
+        except ValueError as e:
+            messagebox.showerror("خطأ في الفلتر", str(e))
+            return
+        self.load_saved_filters()
+        self.saved_filter_var.set(name.strip())
+        self.show_notification(f"تم حفظ الفلتر: {name.strip()}", notification_type="success")
+
+    def delete_current_filter(self):
+        name = self.saved_filter_var.get()
+        if not name:
+            return
+        if not messagebox.askyesno("تأكيد الحذف", f"حذف الفلتر المحفوظ '{name}'؟"):
+            return
+        enhanced_db.delete_saved_filter(name)
+        self.load_saved_filters()
+        self.saved_filter_var.set("")
     
     def create_cases_list(self, parent):
         """
-        إنشاء قائمة الحالات محسنة مع استغلال أفضل للمساحة
+        إنشاء قائمة الحالات: بطاقات افتراضية تُرسم للحالات الظاهرة فقط مهما طالت القائمة
         """
         list_frame = tk.Frame(parent, bg=self.colors['bg_light'])
         list_frame.pack(fill='both', expand=True, padx=6, pady=6)
         
-        list_canvas = tk.Canvas(list_frame, bg=self.colors['bg_light'], highlightthickness=0)
         style = ttk.Style()
         style.layout('AlwaysOn.TScrollbar',
             [('Vertical.Scrollbar.trough', {'children': [('Vertical.Scrollbar.thumb', {'expand': '1', 'sticky': 'nswe'})], 'sticky': 'ns'})]
         )
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=list_canvas.yview, style='AlwaysOn.TScrollbar')
-        self.scrollable_frame = tk.Frame(list_canvas, bg=self.colors['bg_light'])
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: list_canvas.configure(scrollregion=list_canvas.bbox("all"))
-        )
-        # anchor='nw' حتى تظهر البطاقات بشكل صحيح
-        list_canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        list_canvas.configure(yscrollcommand=scrollbar.set)
-        list_canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        self.cases_canvas = list_canvas
-        self.cases_scrollbar = scrollbar
-        
-        # دعم تمرير بالماوس
-        def _on_mousewheel(event):
-            list_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        list_canvas.bind("<MouseWheel>", _on_mousewheel)
-        
-        # دعم تمرير بالأسهم
-        def _on_arrow_key(event):
-            if event.keysym == 'Up':
-                self._on_case_list_up(event)
-            elif event.keysym == 'Down':
-                self._on_case_list_down(event)
-        
-        list_canvas.bind("<Up>", _on_arrow_key)
-        list_canvas.bind("<Down>", _on_arrow_key)
-        
-        # تركيز لوحة المفاتيح عند النقر
-        list_canvas.bind("<Button-1>", lambda e: list_canvas.focus_set())
+        self.case_list = VirtualCaseList(list_frame, self.colors, self.fonts,
+                                         on_select=self._on_case_list_select,
+                                         on_near_end=self._on_case_list_near_end)
+        self.case_list.frame.pack(fill='both', expand=True)
+        self.cases_canvas = self.case_list.canvas
+        self.cases_scrollbar = self.case_list.scrollbar
         
         self.selected_case_index = 0
-        self.case_card_widgets = []
 
-    def add_case_card(self, case_data):
-        """إضافة بطاقة حالة للقائمة مع تصميم محسن وتأثيرات تفاعلية"""
-        try:
-            # فحص وجود الإطار القابل للتمرير
-            if not self.scrollable_frame or not self.scrollable_frame.winfo_exists():
-                return
-                
-            # استخراج البيانات
-            if isinstance(case_data, dict):
-                case_id = case_data.get('id')
-                customer_name = case_data.get('customer_name', 'بدون اسم')
-                subscriber_number = case_data.get('subscriber_number', '')
-                status = case_data.get('status', 'غير محدد')
-                category_name = case_data.get('category_name', '')
-                created_date = case_data.get('created_date', '')
-                modified_by_name = case_data.get('modified_by_name', '')
-            else:
-                case_id, customer_name, subscriber_number, status, category_name, _, modified_by_name, created_date, _ = case_data
-            
-            # إنشاء إطار البطاقة مع تصميم محسن وأكثر إحكاما
-            card_frame = tk.Frame(self.scrollable_frame, bg=self.colors['bg_light'], 
-                                 relief='solid', bd=1, padx=12, pady=8)
-            card_frame.pack(fill='x', padx=6, pady=3)
-            
-            # لون الحدود حسب الحالة
-            status_colors = {
-                'جديدة': self.colors['status_new'],
-                'قيد التنفيذ': self.colors['status_inprogress'],
-                'تم حلها': self.colors['status_solved'],
-                'مغلقة': self.colors['status_closed']
-            }
-            border_color = status_colors.get(status, self.colors['status_closed'])
-            card_frame.configure(highlightbackground=border_color, highlightthickness=2)
-            
-            # إطار المحتوى الرئيسي
-            content_frame = tk.Frame(card_frame, bg=self.colors['bg_light'])
-            content_frame.pack(fill='both', expand=True)
-            
-            # رأس البطاقة مع اسم العميل
-            header_frame = tk.Frame(content_frame, bg=self.colors['bg_light'])
-            header_frame.pack(fill='x', pady=(0, 8))
-            
-            name_label = tk.Label(header_frame, text=customer_name, 
-                                 font=self.fonts['subheader'], fg=self.colors['text_main'], 
-                                 bg=self.colors['bg_light'])
-            name_label.pack(side='right')
-            
-            # شارة الحالة في الجانب الأيسر
-            status_badge = tk.Label(header_frame, text=status,
-                                   font=self.fonts['small'], fg='white',
-                                   bg=border_color, padx=10, pady=3, relief='flat')
-            status_badge.pack(side='left')
-            
-            # تفاصيل الحالة
-            details_frame = tk.Frame(content_frame, bg=self.colors['bg_light'])
-            details_frame.pack(fill='x', pady=(0, 8))
-            
-            # رقم المشترك
-            if subscriber_number:
-                subscriber_frame = tk.Frame(details_frame, bg=self.colors['bg_light'])
-                subscriber_frame.pack(fill='x', pady=2)
-                
-                subscriber_icon = tk.Label(subscriber_frame, text="📞", 
-                                          font=self.fonts['small'], bg=self.colors['bg_light'])
-                subscriber_icon.pack(side='right', padx=(0, 5))
-                
-                subscriber_label = tk.Label(subscriber_frame, text=f"رقم المشترك: {subscriber_number}", 
-                                           font=self.fonts['normal'], fg=self.colors['text_subtle'], 
-                                           bg=self.colors['bg_light'])
-                subscriber_label.pack(side='right')
-            
-            # تصنيف المشكلة
-            if category_name:
-                category_frame = tk.Frame(details_frame, bg=self.colors['bg_light'])
-                category_frame.pack(fill='x', pady=2)
-                
-                category_icon = tk.Label(category_frame, text="🏷️", 
-                                        font=self.fonts['small'], bg=self.colors['bg_light'])
-                category_icon.pack(side='right', padx=(0, 5))
-                
-                category_label = tk.Label(category_frame, text=f"التصنيف: {category_name}", 
-                                         font=self.fonts['normal'], fg=self.colors['text_subtle'], 
-                                         bg=self.colors['bg_light'])
-                category_label.pack(side='right')
-            
-            # تاريخ الإنشاء
-            if created_date:
-                try:
-                    date_obj = datetime.strptime(created_date, "%Y-%m-%d %H:%M:%S")
-                    formatted_date = date_obj.strftime("%Y/%m/%d")
-                    
-                    date_frame = tk.Frame(details_frame, bg=self.colors['bg_light'])
-                    date_frame.pack(fill='x', pady=2)
-                    
-                    date_icon = tk.Label(date_frame, text="📅", 
-                                        font=self.fonts['small'], bg=self.colors['bg_light'])
-                    date_icon.pack(side='right', padx=(0, 5))
-                    
-                    date_label = tk.Label(date_frame, text=f"تاريخ الإنشاء: {formatted_date}", 
-                                         font=self.fonts['small'], fg=self.colors['text_subtle'], 
-                                         bg=self.colors['bg_light'])
-                    date_label.pack(side='right')
-                except:
-                    pass
-            
-            # آخر مُعدِّل
-            if modified_by_name:
-                modifier_frame = tk.Frame(details_frame, bg=self.colors['bg_light'])
-                modifier_frame.pack(fill='x', pady=2)
-                
-                modifier_icon = tk.Label(modifier_frame, text="👤", 
-                                        font=self.fonts['small'], bg=self.colors['bg_light'])
-                modifier_icon.pack(side='right', padx=(0, 5))
-                
-                modifier_label = tk.Label(modifier_frame, text=f"آخر تعديل: {modified_by_name}", 
-                                         font=self.fonts['small'], fg=self.colors['text_subtle'], 
-                                         bg=self.colors['bg_light'])
-                modifier_label.pack(side='right')
-            
-            # إضافة البطاقة للقائمة
-            self.case_card_widgets.append(card_frame)
-            
-            # ربط حدث النقر
-            def on_card_click(event, case_data=case_data):
-                self.load_case(case_data)
-                self._update_selected_case_index(case_data.get('id') if isinstance(case_data, dict) else case_data[0])
-                self._highlight_selected_case_card()
-            
-            # ربط الأحداث للبطاقة الرئيسية
-            card_frame.bind('<Button-1>', on_card_click)
-            card_frame.bind('<Enter>', lambda e: self._on_card_hover_enter(e, card_frame))
-            card_frame.bind('<Leave>', lambda e: self._on_card_hover_leave(e, card_frame))
-            
-            # جعل جميع العناصر الداخلية قابلة للنقر بشكل متكرر
-            def bind_click_to_widget(widget):
-                widget.bind('<Button-1>', on_card_click)
-                widget.bind('<Enter>', lambda e: self._on_card_hover_enter(e, card_frame))
-                widget.bind('<Leave>', lambda e: self._on_card_hover_leave(e, card_frame))
-                
-                # ربط الأحداث للعناصر الفرعية أيضاً
-                for child in widget.winfo_children():
-                    bind_click_to_widget(child)
-            
-            # تطبيق الربط على جميع العناصر الداخلية
-            for child in card_frame.winfo_children():
-                bind_click_to_widget(child)
-        except Exception as e:
-            # تجاهل الأخطاء في إضافة البطاقات
-            pass
-    
-    def _on_card_hover_enter(self, event, card_frame):
-        """تأثير عند دخول الماوس للبطاقة"""
-        try:
-            card_frame.config(relief='raised', bd=2)
-            card_frame.config(bg=self.colors['bg_card'])
-            
-            # تغيير لون خلفية جميع العناصر الداخلية مع حماية شارة الحالة
-            for child in card_frame.winfo_children():
-                if isinstance(child, tk.Label):
-                    # لا تغير لون شارة الحالة (التي لها خلفية ملونة)
-                    if child.cget('bg') not in [self.colors['status_new'], self.colors['status_inprogress'], 
-                                               self.colors['status_solved'], self.colors['status_closed']]:
-                        child.config(bg=self.colors['bg_card'])
-                elif isinstance(child, tk.Frame):
-                    child.config(bg=self.colors['bg_card'])
-                    for grandchild in child.winfo_children():
-                        if isinstance(grandchild, tk.Label):
-                            # لا تغير لون شارة الحالة
-                            if grandchild.cget('bg') not in [self.colors['status_new'], self.colors['status_inprogress'], 
-                                                           self.colors['status_solved'], self.colors['status_closed']]:
-                                grandchild.config(bg=self.colors['bg_card'])
-        except Exception:
-            pass
-    
-    def _on_card_hover_leave(self, event, card_frame):
-        """تأثير عند خروج الماوس من البطاقة"""
-        try:
-            card_frame.config(relief='solid', bd=1)
-            card_frame.config(bg=self.colors['bg_light'])
-            
-            # إعادة لون خلفية جميع العناصر الداخلية مع حماية شارة الحالة
-            for child in card_frame.winfo_children():
-                if isinstance(child, tk.Label):
-                    # لا تغير لون شارة الحالة (التي لها خلفية ملونة)
-                    if child.cget('bg') not in [self.colors['status_new'], self.colors['status_inprogress'], 
-                                               self.colors['status_solved'], self.colors['status_closed']]:
-                        child.config(bg=self.colors['bg_light'])
-                elif isinstance(child, tk.Frame):
-                    child.config(bg=self.colors['bg_light'])
-                    for grandchild in child.winfo_children():
-                        if isinstance(grandchild, tk.Label):
-                            # لا تغير لون شارة الحالة
-                            if grandchild.cget('bg') not in [self.colors['status_new'], self.colors['status_inprogress'], 
-                                                           self.colors['status_solved'], self.colors['status_closed']]:
-                                grandchild.config(bg=self.colors['bg_light'])
-        except Exception:
-            pass
+    def _on_case_list_select(self, index):
+        """اختيار حالة من القائمة بالنقر أو بالأسهم"""
+        self.selected_case_index = index
+        self._select_case_by_index()
+
+    def _on_case_list_near_end(self):
+        """جلب الصفحة التالية عند الاقتراب من نهاية القائمة"""
+        if self.cases_next_cursor is not None and not self._loading_more_cases:
+            self._loading_more_cases = True
+            self.cases_canvas.after_idle(self.load_more_cases)
     
     def create_main_display(self, parent):
         """إنشاء منطقة العرض الرئيسية محسنة مع استغلال أفضل للمساحة"""
@@ -1341,20 +1649,82 @@ Escape     - مسح التحديد
         self.notebook = ttk.Notebook(tabs_frame)
         self.notebook.pack(fill='both', expand=True)
         
-        # التبويبات - ترتيب عكسي للتوافق مع RTL
-        self.create_reports_tab()
-        self.create_audit_log_tab()
-        self.create_correspondences_tab()
-        self.create_attachments_tab()
-        self.create_basic_data_tab()
+        # التبويبات - ترتيب عكسي للتوافق مع RTL؛ تُضاف فارغة وتُبنى عند أول اختيار
+        for key, title, builder, part in CASE_TABS:
+            self.register_tab(key, title, getattr(self, builder), part)
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
         
-        # تحديد تبويب البيانات الأساسية كافتراضي
-        self.notebook.select(4)  # التبويب الأخير (البيانات الأساسية)
+        # تحديد تبويب البيانات الأساسية كافتراضي (يُبنى الآن لأنه الظاهر)
+        self.select_tab('basic_data')
+
+    def register_tab(self, key, title, factory, part=None):
+        """إضافة تبويب فارغ يُبنى بـ factory(frame) عند أول اختيار له
 
-    def create_reports_tab(self):
+        part: جزء حزمة الحالة (CASE_BUNDLE_PARTS) الذي يعرضه التبويب، ويُقرأ فقط وهو ظاهر.
+        """
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text=title)
+        self.tab_factories[key] = (frame, factory, part)
+        return frame
+
+    def ensure_tab(self, key):
+        """بناء عناصر التبويب إن لم يُبنَ بعد، ويرجع إطاره"""
+        frame, factory, part = self.tab_factories[key]
+        if key not in self.built_tabs:
+            self.built_tabs.add(key)
+            factory(frame)
+        return frame
+
+    def select_tab(self, key):
+        """بناء التبويب عند الحاجة ثم إظهاره"""
+        if key in self.tab_factories:
+            self.notebook.select(self.ensure_tab(key))
+
+    def current_tab_key(self):
+        """مفتاح التبويب الظاهر (None قبل إنشاء التبويبات)"""
+        if not self.tab_factories:
+            return None
+        selected = self.notebook.select()
+        for key, (frame, factory, part) in self.tab_factories.items():
+            if str(frame) == selected:
+                return key
+        return None
+
+    def visible_case_parts(self):
+        """أجزاء حزمة الحالة التي يعرضها التبويب الظاهر (قيمة parts في get_case_bundle)"""
+        key = self.current_tab_key()
+        part = self.tab_factories[key][2] if key else None
+        return (part,) if part else ()
+
+    def on_tab_changed(self, event=None):
+        """بناء التبويب المختار عند أول ظهور له وعرض بيانات الحالة الحالية فيه"""
+        key = self.current_tab_key()
+        if key:
+            self.ensure_tab(key)
+            self.load_tab_data(key)
+
+    def load_tab_data(self, key, bundle=None):
+        """عرض جزء الحالة الحالية الخاص بالتبويب key من bundle، أو قراءته وحده
+
+        بدون bundle لا يُعاد عرض ما سبق عرضه في التبويب للحالة نفسها.
+        """
+        part = self.tab_factories[key][2]
+        if part is None or key not in self.built_tabs:
+            return
+        if bundle is None and key in self.tab_case_ids and self.tab_case_ids[key] == self.current_case_id:
+            return
+        if bundle is None or getattr(bundle, part) is None:
+            bundle = enhanced_db.get_case_bundle(self.current_case_id, parts=(part,)) if self.current_case_id else None
+        if part == 'attachments':
+            self.load_attachments(bundle.attachments if bundle else [])
+        elif part == 'correspondences':
+            self.load_correspondences(bundle.correspondences if bundle else [])
+        else:
+            self.load_audit_log(bundle.audit_log if bundle else [], bundle.audit_has_more if bundle else False)
+        self.tab_case_ids[key] = self.current_case_id
+
+    def create_reports_tab(self, reports_frame):
         """إنشاء تبويب التقارير"""
-        reports_frame = ttk.Frame(self.notebook)
-        self.notebook.add(reports_frame, text="التقارير")
 
         # عنوان رئيسي
         title = tk.Label(reports_frame, text="تقارير النظام", font=("Arial", 16, "bold"), fg="#2c3e50")
@@ -1374,10 +1744,11 @@ Escape     - مسح التحديد
 
     def show_quick_stats_report(self):
         """عرض تقرير إحصائي سريع في تبويب التقارير"""
-        total_cases = len(self.cases_data)
-        active_cases = len([case for case in self.cases_data if (case.get('status') if isinstance(case, dict) else (case[3] if len(case) > 3 else '')) not in ['تم حلها', 'مغلقة']])
-        solved_cases = len([case for case in self.cases_data if (case.get('status') if isinstance(case, dict) else (case[3] if len(case) > 3 else '')) == 'تم حلها'])
-        closed_cases = len([case for case in self.cases_data if (case.get('status') if isinstance(case, dict) else (case[3] if len(case) > 3 else '')) == 'مغلقة'])
+        status_counts = enhanced_db.get_status_counts()
+        total_cases = sum(status_counts.values())
+        solved_cases = status_counts.get('تم حلها', 0)
+        closed_cases = status_counts.get('مغلقة', 0)
+        active_cases = total_cases - solved_cases - closed_cases
         stats_text = f"""
         إجمالي الحالات: {total_cases}\n
         الحالات النشطة: {active_cases}\n
@@ -1386,10 +1757,8 @@ Escape     - مسح التحديد
         """
         self.stats_report_label.config(text=stats_text)
     
-    def create_basic_data_tab(self):
+    def create_basic_data_tab(self, basic_frame):
         """إنشاء تبويب البيانات الأساسية بمحاذاة يمين"""
-        basic_frame = ttk.Frame(self.notebook)
-        self.notebook.add(basic_frame, text="البيانات الأساسية")
 
         # إطار للمحتوى مع سكرول
         canvas = tk.Canvas(basic_frame, bg=self.colors['bg_light'])
@@ -1486,9 +1855,6 @@ Escape     - مسح التحديد
         self.create_field(meter_section, "المديونية:", "debt_amount", row=2)
 
         # اختيار الموظف المسؤول عن الإضافة/التعديل
-        # عند فتح نافذة إدارة الموظفين، عيّن أرقام أداء وهمية تلقائيًا لمن ليس لديه رقم
-        if hasattr(enhanced_db, 'assign_fake_performance_numbers'):
-            enhanced_db.assign_fake_performance_numbers()
         employees = enhanced_db.get_employees() if hasattr(enhanced_db, 'get_employees') else []
         self.employee_var = tk.StringVar()
         employee_names = [emp[1] for emp in employees]
@@ -1566,11 +1932,8 @@ Escape     - مسح التحديد
         self.basic_data_widgets['month_received'] = month_combo
         self.basic_data_widgets['month_received_var'] = self.month_received_var
     
-    def create_attachments_tab(self):
+    def create_attachments_tab(self, attachments_frame):
         """إنشاء تبويب المرفقات"""
-        attachments_frame = ttk.Frame(self.notebook)
-        self.notebook.add(attachments_frame, text="المرفقات")
-        
         # أزرار المرفقات - أكثر إحكاما
         buttons_frame = tk.Frame(attachments_frame, bg=self.colors['bg_light'])
         buttons_frame.pack(fill='x', padx=8, pady=6)
@@ -1606,11 +1969,8 @@ Escape     - مسح التحديد
         self.attachments_tree.bind('<Double-1>', self.open_attachment)
         self.attachments_tree.bind('<Button-3>', self.show_attachment_context_menu)
     
-    def create_correspondences_tab(self):
+    def create_correspondences_tab(self, correspondences_frame):
         """إنشاء تبويب المراسلات"""
-        correspondences_frame = ttk.Frame(self.notebook)
-        self.notebook.add(correspondences_frame, text="المراسلات")
-        
         # أزرار المراسلات - أكثر إحكاما
         buttons_frame = tk.Frame(correspondences_frame, bg=self.colors['bg_light'])
         buttons_frame.pack(fill='x', padx=8, pady=6)
@@ -1653,11 +2013,8 @@ Escape     - مسح التحديد
         # ربط النقر المزدوج
         self.correspondences_tree.bind('<Double-1>', self.edit_correspondence)
     
-    def create_audit_log_tab(self):
+    def create_audit_log_tab(self, audit_frame):
         """إنشاء تبويب سجل التعديلات"""
-        audit_frame = ttk.Frame(self.notebook)
-        self.notebook.add(audit_frame, text="سجل التعديلات")
-        
         # جدول سجل التعديلات
         columns = ('التاريخ والوقت', 'الموظف', 'نوع الإجراء', 'وصف الإجراء')
         self.audit_tree = ttk.Treeview(audit_frame, columns=columns, show='headings', height=20)
@@ -1677,6 +2034,7 @@ Escape     - مسح التحديد
         
         self.audit_tree.pack(side='left', fill='both', expand=True, padx=10, pady=10)
         audit_scrollbar.pack(side='right', fill='y', pady=10)
+        self.audit_tree.bind('<Double-1>', self.load_full_audit_log)
     
     # سأكمل باقي الوظائف في الجزء التالي...
     
@@ -1715,7 +2073,7 @@ Escape     - مسح التحديد
             
             # تحديد تبويب البيانات الأساسية
             if hasattr(self, 'notebook'):
-                self.notebook.select(4)  # التبويب الأخير (البيانات الأساسية)
+                self.select_tab('basic_data')
             
             self.show_notification("تم تهيئة النموذج لإضافة حالة جديدة", notification_type="info")
             
@@ -1724,50 +2082,37 @@ Escape     - مسح التحديد
             messagebox.showerror("خطأ", f"حدث خطأ أثناء تهيئة النموذج:\n{e}")
     
     def clear_tabs(self):
-        """مسح محتوى التبويبات"""
-        # مسح المرفقات
-        for item in self.attachments_tree.get_children():
-            self.attachments_tree.delete(item)
-        
-        # مسح المراسلات
-        for item in self.correspondences_tree.get_children():
-            self.correspondences_tree.delete(item)
-        
-        # مسح سجل التعديلات
-        for item in self.audit_tree.get_children():
-            self.audit_tree.delete(item)
+        """مسح محتوى التبويبات المبنية (تُقرأ من جديد عند إظهارها)"""
+        self.tab_case_ids.clear()
+        for tree_name in ('attachments_tree', 'correspondences_tree', 'audit_tree'):
+            tree = getattr(self, tree_name, None)
+            if tree is not None:
+                tree.delete(*tree.get_children())
 
     def update_year_filter_options(self, event=None):
         """تحديث قائمة السنوات بناءً على نوع التاريخ المختار."""
+        self.refresh_year_filter_values()
+        self.year_combo.set("الكل")
+        self.perform_search()
+
+    def refresh_year_filter_values(self):
+        """تحديث السنوات المتاحة في فلتر السنة دون تغيير السنة المختارة أو نتائج البحث"""
         date_field_display = self.date_field_var.get()
         current_year = datetime.now().year
-        # دعم dict وtuple معًا عند حساب سنوات الإدخال
-        self.created_years = sorted({
-            str(
-                case.get('created_date', '') if isinstance(case, dict)
-                else (case[7] if len(case) > 7 else '')
-            ).split('-')[0]
-            for case in self.cases_data
-            if (case.get('created_date') if isinstance(case, dict) else (case[7] if len(case) > 7 else ''))
-        }, reverse=True)
+        # سنوات الإدخال من قاعدة البيانات (القائمة المحملة قد تكون صفحة واحدة فقط)
+        self.created_years = enhanced_db.get_case_years('created_date')
         if date_field_display == "تاريخ الورود":
             years = [str(y) for y in range(current_year, 2001, -1)]
             self.year_combo['values'] = ["الكل"] + years
         else:
             self.year_combo['values'] = ["الكل"] + self.created_years
-        self.year_combo.set("الكل")
-        self.perform_search()
 
     def manage_employees(self):
         employees = enhanced_db.get_employees() if hasattr(enhanced_db, 'get_employees') else []
         # جلب أرقام الأداء أيضًا
         try:
-            conn = sqlite3.connect(enhanced_db.db_name)
-            cursor = conn.cursor()
             # استثنِ admin من القائمة
-            cursor.execute("SELECT id, name, position, performance_number FROM employees WHERE is_active = 1 AND performance_number != 1 ORDER BY name")
-            employees = cursor.fetchall()
-            conn.close()
+            employees = enhanced_db.execute_query("SELECT id, name, position, performance_number FROM employees WHERE is_active = 1 AND performance_number != 1 ORDER BY name")
         except Exception:
             pass
         win = tk.Toplevel(self.root)
@@ -1807,11 +2152,8 @@ Escape     - مسح التحديد
                 return
             # تحقق من تفرد رقم الأداء
             try:
-                conn = sqlite3.connect(enhanced_db.db_name)
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM employees WHERE performance_number = ?", (perf_int,))
-                exists = cursor.fetchone()[0]
-                conn.close()
+                rows = enhanced_db.execute_query("SELECT COUNT(*) FROM employees WHERE performance_number = ?", (perf_int,))
+                exists = rows[0][0] if rows else 0
                 if exists:
                     messagebox.showerror("خطأ", "رقم الأداء مستخدم بالفعل لموظف آخر.")
                     perf_entry.focus_set()
@@ -1836,12 +2178,7 @@ Escape     - مسح التحديد
                 entry = emp_listbox.get(idx)
                 name = entry.split(' - ')[0].strip()
                 # جلب id الموظف من قاعدة البيانات
-                employees = enhanced_db.get_employees() if hasattr(enhanced_db, 'get_employees') else []
-                emp_id = None
-                for emp in employees:
-                    if emp[1] == name:
-                        emp_id = emp[0]
-                        break
+                emp_id = enhanced_db.lookups.employee_id(name)
                 if emp_id and hasattr(enhanced_db, 'delete_employee'):
                     enhanced_db.delete_employee(emp_id)
                 emp_listbox.delete(idx)
@@ -1993,12 +2330,7 @@ Escape     - مسح التحديد
     def save_attachment_to_db(self, file_info, emp_name):
         """حفظ معلومات المرفق في قاعدة البيانات (نسخة مصححة)."""
         # البحث عن هوية الموظف
-        emp_id = None
-        employees = enhanced_db.get_employees() if hasattr(enhanced_db, 'get_employees') else []
-        for emp in employees:
-            if emp[1] == emp_name:
-                emp_id = emp[0]
-                break
+        emp_id = enhanced_db.lookups.employee_id(emp_name)
         
         # إنشاء قاموس بيانات نقي ومباشر لقاعدة البيانات
         db_data = {
@@ -2033,7 +2365,7 @@ Escape     - مسح التحديد
             desc = f"تم {action_type.split(' ')[0]} المرفق: {db_data.get('file_name')} بواسطة {emp_name}"
             enhanced_db.log_action(self.current_case_id, action_type, desc, db_data['uploaded_by'])
         
-        self.load_attachments()
+        self.reload_case_tabs()
         self.show_notification("تمت معالجة المرفق بنجاح", notification_type="success")
 
     def open_attachment(self, event=None):
@@ -2077,16 +2409,11 @@ Escape     - مسح التحديد
             enhanced_db.delete_attachment(attachment_id)
         # سجل التعديلات
         emp_name = self.employee_var.get() if hasattr(self, 'employee_var') else ""
-        emp_id = None
-        employees = enhanced_db.get_employees() if hasattr(enhanced_db, 'get_employees') else []
-        for emp in employees:
-            if emp[1] == emp_name:
-                emp_id = emp[0]
-                break
+        emp_id = enhanced_db.lookups.employee_id(emp_name)
         if hasattr(enhanced_db, 'log_action'):
             desc = f"تم حذف المرفق: {file_name} بواسطة {emp_name}"
             enhanced_db.log_action(self.current_case_id, "حذف مرفق", desc, emp_id if emp_id else 1)
-        self.load_attachments()
+        self.reload_case_tabs()
         self.show_notification("تم حذف المرفق", notification_type="warning")
 
     def add_correspondence(self):
@@ -2105,7 +2432,7 @@ Escape     - مسح التحديد
         emp_var = tk.StringVar(value=emp_names[0] if emp_names else "")
         emp_combo = ttk.Combobox(win, values=emp_names, textvariable=emp_var, state='readonly')
         emp_combo.pack(fill='x', padx=20)
-        # توليد الرقمين تلقائياً
+        # الرقمان المتوقعان للعرض فقط؛ الرقمان الفعليان يُحجزان عند الحفظ
         seq_num, yearly_num = 1, 1
         if hasattr(enhanced_db, 'get_next_correspondence_numbers'):
             seq_num, yearly_num = enhanced_db.get_next_correspondence_numbers(self.current_case_id)
@@ -2118,29 +2445,26 @@ Escape     - مسح التحديد
             sender = sender_var.get().strip()
             content = content_var.get('1.0', tk.END).strip()
             emp_name = emp_var.get()
-            emp_id = None
-            employees = enhanced_db.get_employees() if hasattr(enhanced_db, 'get_employees') else []
-            for emp in employees:
-                if emp[1] == emp_name:
-                    emp_id = emp[0]
-                    break
+            emp_id = enhanced_db.lookups.employee_id(emp_name)
             if content and hasattr(enhanced_db, 'add_correspondence'):
                 corr_data = {
                     'case_id': self.current_case_id,
-                    'case_sequence_number': seq_num,
-                    'yearly_sequence_number': yearly_num,
                     'sender': sender,
                     'message_content': content,
                     'created_by': emp_id if emp_id else 1,
                     'created_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     'sent_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 }
-                enhanced_db.add_correspondence(corr_data)
+                numbers = enhanced_db.add_correspondence(corr_data)
+                if not numbers:
+                    messagebox.showerror("خطأ", "فشل في حفظ المراسلة", parent=win)
+                    return
+                saved_seq_num, _ = numbers
                 # سجل التعديلات
                 if hasattr(enhanced_db, 'log_action'):
-                    desc = f"تم إضافة مراسلة رقم {seq_num} بواسطة {emp_name}"
+                    desc = f"تم إضافة مراسلة رقم {saved_seq_num} بواسطة {emp_name}"
                     enhanced_db.log_action(self.current_case_id, "إضافة مراسلة", desc, emp_id if emp_id else 1)
-                self.load_correspondences()
+                self.reload_case_tabs()
                 win.destroy()
                 self.show_notification("تمت إضافة المراسلة بنجاح", notification_type="success")
         tk.Button(win, text="حفظ", command=save_corr).pack(pady=10)
@@ -2164,7 +2488,7 @@ Escape     - مسح التحديد
             content = content_var.get('1.0', tk.END).strip()
             if content and hasattr(enhanced_db, 'update_correspondence'):
                 enhanced_db.update_correspondence(corr_id, content)
-            self.load_correspondences()
+            self.reload_case_tabs()
             win.destroy()
             self.show_notification("تم تحديث المراسلة", notification_type="success")
         tk.Button(win, text="حفظ", command=save_corr).pack(pady=10)
@@ -2192,46 +2516,43 @@ Escape     - مسح التحديد
                 return
             # سجل التعديلات
             emp_name = self.employee_var.get() if hasattr(self, 'employee_var') else ""
-            emp_id = None
-            employees = enhanced_db.get_employees() if hasattr(enhanced_db, 'get_employees') else []
-            for emp in employees:
-                if emp[1] == emp_name:
-                    emp_id = emp[0]
-                    break
+            emp_id = enhanced_db.lookups.employee_id(emp_name)
             if hasattr(enhanced_db, 'log_action'):
                 desc = f"تم حذف مراسلة رقم {seq_num} بواسطة {emp_name}"
                 enhanced_db.log_action(self.current_case_id, "حذف مراسلة", desc, emp_id if emp_id else 1)
-            self.load_correspondences()
+            self.reload_case_tabs()
             self.show_notification("تم حذف المراسلة", notification_type="warning")
         except Exception as e:
             print(f"[ERROR] Exception أثناء حذف المراسلة: {e}")
             messagebox.showerror("خطأ في الحذف", f"حدث خطأ أثناء حذف المراسلة:\n{e}")
 
     def load_initial_data(self):
-        self.cases_data = enhanced_db.get_all_cases() if hasattr(enhanced_db, 'get_all_cases') else []
-        self.filtered_cases = self.cases_data.copy()
-
-        # استخلاص قوائم السنوات
-        self.received_years = sorted({str(case.get('received_date', '')).split('-')[0] for case in self.cases_data if case.get('received_date')}, reverse=True)
-        self.created_years = sorted({str(case.get('created_date', '')).split('-')[0] for case in self.cases_data if case.get('created_date')}, reverse=True)
+        # الصفحة الأولى وقوائم السنوات
+        self.load_cases_first_page()
 
         self.update_cases_list()
-        self.load_attachments()
-        self.load_correspondences()
-        self.load_audit_log()
+        self.reload_case_tabs()
         self.update_year_filter_options() # تحديث قائمة السنوات
         self.year_combo.set("الكل")
         
         # تحديث شريط الحالة - مع فحص وجود العناصر
-        try:
-            if hasattr(self, 'cases_count_label') and self.cases_count_label and self.cases_count_label.winfo_exists():
-                total_cases = len(self.cases_data)
-                self.cases_count_label.config(text=f"📋 جميع الحالات: {total_cases}")
-        except Exception as e:
-            # تجاهل الأخطاء في تحديث شريط الحالة
-            pass
+        self.update_cases_count_label()
+
+    def reload_case_tabs(self):
+        """إعادة قراءة تبويب الحالة الظاهر (بعد أي تعديل على مرفقاتها أو مراسلاتها)؛ البقية عند إظهارها"""
+        self.render_case_bundle(None)
+
+    def render_case_bundle(self, bundle):
+        """عرض حزمة get_case_bundle في التبويب الظاهر (يُقرأ جزؤه إذا لم يكن فيها)
+
+        التبويبات الأخرى تُعرض عند اختيارها، فلا يُقرأ مثلاً سجل التعديلات والمستخدم على البيانات الأساسية.
+        """
+        self.tab_case_ids.clear()
+        key = self.current_tab_key()
+        if key:
+            self.load_tab_data(key, bundle)
 
-    def load_attachments(self):
+    def load_attachments(self, attachments=None):
         """تحميل مرفقات الحالة وعرضها في الجدول (النسخة المصححة)."""
         for i in self.attachments_tree.get_children():
             self.attachments_tree.delete(i)
@@ -2240,7 +2561,8 @@ Escape     - مسح التحديد
             return
 
         # get_attachments تعيد الآن قائمة من القواميس (dict) بالأسماء الصحيحة
-        attachments = enhanced_db.get_attachments(self.current_case_id)
+        if attachments is None:
+            attachments = enhanced_db.get_attachments(self.current_case_id)
         
         for att in attachments:
             # إدخال البيانات بالترتيب الصحيح والمتوقع للجدول
@@ -2254,12 +2576,13 @@ Escape     - مسح التحديد
                 att.get('file_path')  # المسار الكامل للملف
             ))
 
-    def load_correspondences(self):
+    def load_correspondences(self, correspondences=None):
         for i in self.correspondences_tree.get_children():
             self.correspondences_tree.delete(i)
         if not self.current_case_id or not hasattr(enhanced_db, 'get_correspondences'):
             return
-        correspondences = enhanced_db.get_correspondences(self.current_case_id)
+        if correspondences is None:
+            correspondences = enhanced_db.get_correspondences(self.current_case_id)
         for corr in correspondences:
             self.correspondences_tree.insert('', 'end', values=(
                 corr.get('id'),
@@ -2271,21 +2594,35 @@ Escape     - مسح التحديد
                 corr.get('created_by_name')
             ))
 
-    def load_audit_log(self):
+    def load_audit_log(self, logs=None, has_more=None):
+        """عرض سجل التعديلات: أول صفحة فقط مع صف لعرض السجلات الأقدم عند الحاجة"""
         for i in self.audit_tree.get_children():
             self.audit_tree.delete(i)
-        if not self.current_case_id or not hasattr(enhanced_db, 'get_case_audit_log'):
+        if not self.current_case_id or not hasattr(enhanced_db, 'get_case_bundle'):
             return
-        logs = enhanced_db.get_case_audit_log(self.current_case_id)
+        if logs is None:
+            bundle = enhanced_db.get_case_bundle(self.current_case_id, parts=('audit_log',))
+            if not bundle:
+                return
+            logs, has_more = bundle.audit_log, bundle.audit_has_more
         for log in logs:
-            # log: [id, case_id, action_type, action_description, performed_by, timestamp, old_values, new_values, performed_by_name]
-            emp_name = log[8] if log[8] not in [None, ''] else 'غير محدد'
+            emp_name = log.get('performed_by_name') or 'غير محدد'
             self.audit_tree.insert('', 'end', values=(
-                log[5],  # timestamp
+                log.get('timestamp'),
                 emp_name,  # performed_by_name (اسم الموظف)
-                log[2],  # action_type
-                log[3]   # action_description
+                log.get('action_type'),
+                log.get('action_description')
             ))
+        if has_more:
+            self.audit_tree.insert('', 'end', iid='audit_more', values=('', '', '', "⬇️ انقر نقراً مزدوجاً لعرض السجلات الأقدم"))
+
+    def load_full_audit_log(self, event=None):
+        """تحميل سجل التعديلات كاملاً عند طلب السجلات الأقدم"""
+        if 'audit_more' not in self.audit_tree.selection():
+            return
+        bundle = enhanced_db.get_case_bundle(self.current_case_id, audit_limit=None, parts=('audit_log',)) if self.current_case_id else None
+        if bundle:
+            self.load_audit_log(bundle.audit_log, False)
 
     def print_case(self):
         if not self.current_case_id:
@@ -2293,7 +2630,8 @@ Escape     - مسح التحديد
             return
         # دعم dict وtuple
         case = None
-        for c in self.cases_data:
+        # البحث في النتائج المعروضة أولاً ثم في الصفحات المحملة
+        for c in self.filtered_cases + self.cases_data:
             try:
                 if isinstance(c, dict):
                     cid = c.get('id')
@@ -2315,6 +2653,8 @@ Escape     - مسح التحديد
         if not case:
             messagebox.showerror("خطأ", "تعذر العثور على بيانات الحالة.")
             return
+        # المرفقات والمراسلات وسجل التعديلات كاملاً في قراءة واحدة
+        bundle = enhanced_db.get_case_bundle(self.current_case_id, audit_limit=None)
         temp_path = os.path.join(os.getcwd(), f"case_{self.current_case_id}_print.txt")
         # تعريب الحقول
         field_map = {
@@ -2343,28 +2683,24 @@ Escape     - مسح التحديد
                 label = field_map.get(k, k)
                 f.write(f"{label}: {v if v is not None else ''}\n")
             f.write("\n--- المرفقات ---\n")
-            attachments = enhanced_db.get_attachments(self.current_case_id) if hasattr(enhanced_db, 'get_attachments') else []
+            attachments = bundle.attachments if bundle else []
             if attachments:
                 for att in attachments:
                     f.write(f"ملف: {att.get('file_name', '')} | الوصف: {att.get('description', '')} | التاريخ: {att.get('upload_date', '')}\n")
             else:
                 f.write("لا يوجد مرفقات\n")
             f.write("\n--- المراسلات ---\n")
-            correspondences = enhanced_db.get_correspondences(self.current_case_id) if hasattr(enhanced_db, 'get_correspondences') else []
+            correspondences = bundle.correspondences if bundle else []
             if correspondences:
                 for corr in correspondences:
                     f.write(f"مرسل: {corr.get('sender', '')} | التاريخ: {corr.get('created_date', '')}\nالمحتوى: {corr.get('message_content', '')}\n---\n")
             else:
                 f.write("لا يوجد مراسلات\n")
             f.write("\n--- سجل التعديلات ---\n")
-            audit_log = enhanced_db.get_case_audit_log(self.current_case_id) if hasattr(enhanced_db, 'get_case_audit_log') else []
+            audit_log = bundle.audit_log if bundle else []
             if audit_log:
                 for log in audit_log:
-                    if isinstance(log, dict):
-                        f.write(f"{log.get('action_type', '')} | {log.get('action_description', '')} | {log.get('performed_by_name', '')} | {log.get('timestamp', '')}\n")
-                    elif isinstance(log, tuple):
-                        # ترتيب الأعمدة: [id, case_id, action_type, action_description, performed_by, timestamp, old_values, new_values, performed_by_name]
-                        f.write(f"{log[2]} | {log[3]} | {log[8]} | {log[5]}\n")
+                    f.write(f"{log.get('action_type', '')} | {log.get('action_description', '')} | {log.get('performed_by_name', '')} | {log.get('timestamp', '')}\n")
             else:
                 f.write("لا يوجد سجل تعديلات\n")
         try:
@@ -2379,39 +2715,9 @@ Escape     - مسح التحديد
         تحديث عرض قائمة الحالات
         """
         try:
-            if self.scrollable_frame is None or not self.scrollable_frame.winfo_exists():
+            if self.case_list is None or not self.cases_canvas.winfo_exists():
                 return
-                
-            # تنظيف القائمة الحالية
-            for widget in self.scrollable_frame.winfo_children():
-                try:
-                    widget.destroy()
-                except:
-                    pass
-            self.case_card_widgets = []
-            
-            # عرض الحالات المفلترة كبطاقات
-            for i, case in enumerate(self.filtered_cases):
-                try:
-                    self.add_case_card(case)
-                except Exception as e:
-                    # تجاهل الأخطاء في إضافة البطاقات الفردية
-                    continue
-            
-            # تحديث منطقة التمرير
-            try:
-                if hasattr(self, 'cases_canvas') and self.cases_canvas and self.cases_canvas.winfo_exists():
-                    self.scrollable_frame.update_idletasks()
-                    self.cases_canvas.configure(scrollregion=self.cases_canvas.bbox("all"))
-            except Exception:
-                pass
-            
-            # تمييز البطاقة المحددة
-            try:
-                self._highlight_selected_case_card()
-            except Exception:
-                pass
-                
+            self.case_list.set_items(self.filtered_cases, self.selected_case_index)
         except Exception as e:
             # تجاهل الأخطاء في تحديث قائمة الحالات
             pass
@@ -2448,39 +2754,22 @@ Escape     - مسح التحديد
         # معالجة تصنيف المشكلة (category) وتحويله إلى category_id
         if 'category' in data:
             category_name = data['category']
-            category_id = None
-            for cat in enhanced_db.get_categories():
-                if cat[1] == category_name:
-                    category_id = cat[0]
-                    break
-            if category_id is None:
-                category_id = 1  # قيمة افتراضية إذا لم يوجد التصنيف
-            data['category_id'] = category_id
+            # قيمة افتراضية 1 إذا لم يوجد التصنيف
+            data['category_id'] = enhanced_db.lookups.category_id(category_name, 1)
         # معالجة حالة المشكلة (status)
         if 'status' in data:
             data['status'] = data['status'] or 'جديدة'
             # التحقق إذا تم حل المشكلة
             if data['status'] == "تم حلها" and self.current_case_status != "تم حلها":
                 # يجب تعريف emp_id و now هنا
-                emp_id = 1
-                emp_name = data.get('employee_name')
-                employees = enhanced_db.get_employees() if hasattr(enhanced_db, 'get_employees') else []
-                for emp in employees:
-                    if emp[1] == emp_name:
-                        emp_id = emp[0]
-                        break
+                emp_id = enhanced_db.lookups.employee_id(data.get('employee_name'), 1)
                 now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 data['solved_by'] = emp_id
                 data['solved_date'] = now
         # إضافة تواريخ الإنشاء والتعديل
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        emp_id = 1
         emp_name = data.get('employee_name')
-        employees = enhanced_db.get_employees() if hasattr(enhanced_db, 'get_employees') else []
-        for emp in employees:
-            if emp[1] == emp_name:
-                emp_id = emp[0]
-                break
+        emp_id = enhanced_db.lookups.employee_id(emp_name, 1)
 
         # تجميع تاريخ الورود
         year = self.year_received_var.get()
@@ -2526,74 +2815,113 @@ Escape     - مسح التحديد
         self.print_btn.config(state='normal')
         
         # إعادة تحميل المرفقات والمراسلات وسجل التعديلات للحالة الحالية
-        if hasattr(self, 'functions') and self.functions is not None:
-            if hasattr(self.functions, 'load_case_attachments'):
-                self.functions.load_case_attachments(self.current_case_id)
-            if hasattr(self.functions, 'load_case_correspondences'):
-                self.functions.load_case_correspondences(self.current_case_id)
-            if hasattr(self.functions, 'load_case_audit_log'):
-                self.functions.load_case_audit_log(self.current_case_id)
-        
-        # تحديث البيانات بطريقة آمنة بدون إعادة إنشاء الواجهة
+        self.reload_case_tabs()
+        
+        # تحديث بطاقة الحالة المحفوظة فقط (إضافة أو تعديل ونقلها لموضعها في الترتيب)
         try:
             if hasattr(self, 'root') and self.root and self.root.winfo_exists():
-                # تحديث البيانات الأساسية فقط
-                self.cases_data = enhanced_db.get_all_cases() if hasattr(enhanced_db, 'get_all_cases') else []
-                self.filtered_cases = self.cases_data.copy()
-                
-                # تحديث قائمة الحالات
-                self.update_cases_list()
+                self.apply_case_changes([self.current_case_id], see=True)
                 
                 # تحديث شريط الحالة
-                try:
-                    if hasattr(self, 'cases_count_label') and self.cases_count_label and self.cases_count_label.winfo_exists():
-                        total_cases = len(self.cases_data)
-                        self.cases_count_label.config(text=f"📋 جميع الحالات: {total_cases}")
-                except Exception:
-                    pass
-                
-                # تحديث قوائم السنوات
-                self.received_years = sorted({str(case.get('received_date', '')).split('-')[0] for case in self.cases_data if case.get('received_date')}, reverse=True)
-                self.created_years = sorted({str(case.get('created_date', '')).split('-')[0] for case in self.cases_data if case.get('created_date')}, reverse=True)
+                self.update_cases_count_label()
                 
-                # تحديث خيارات السنة
-                self.update_year_filter_options()
+                # تحديث خيارات السنة (قد تضيف الحالة الجديدة سنة)
+                self.refresh_year_filter_values()
                 
         except Exception as e:
             # في حالة حدوث خطأ، حاول إعادة تحميل البيانات بعد فترة قصيرة
             self.root.after(100, self.load_initial_data)
 
-    def perform_search(self, event=None):
-        """تنفيذ البحث وتحديث قائمة الحالات"""
+    def _on_search_value_changed(self, *args):
+        """تأجيل البحث حتى يتوقف المستخدم عن الكتابة (كل حرف جديد يعيد المهلة)"""
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(self.search_debounce_ms, self.perform_search, None, True)
+
+    def perform_search(self, event=None, live=False):
+        """تنفيذ البحث وتحديث قائمة الحالات
+
+        الاستعلام مهمة خلفية (customer_issues_jobs) ولا ينتظره خيط الواجهة؛ live=True للبحث أثناء الكتابة
+        (النتيجة في شريط الحالة بدل الإشعار).
+        """
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+            self._search_after_id = None
         search_type = self.search_type_var.get()
         search_value = self.search_value_var.get().strip()
         year = self.year_var.get()
         date_field_display = self.date_field_var.get()
         date_field = self.date_field_map.get(date_field_display, 'received_date')
 
-        try:
-            # إذا لم يكن هناك قيمة للبحث ولم يتم تحديد سنة، اعرض كل الحالات
-            if not search_value and year == "الكل":
-                self.filtered_cases = self.cases_data.copy()
-            else:
-                # استدعاء دالة البحث المحدثة
-                self.filtered_cases = enhanced_db.search_cases(search_type, search_value, year, date_field)
-            
-            # إعادة تعيين الفهرس المحدد
+        self._search_generation += 1
+        # نتيجة أي بحث سابق لم تعد مطلوبة
+        self.jobs.cancel_group('search')
+        # البحث العادي يلغي الفلتر المركب، فتعود الأوجه لكل الحالات
+        if self.active_case_filter is not None:
+            self.active_case_filter = None
+            self.refresh_case_facets()
+        # إذا لم يكن هناك قيمة للبحث ولم يتم تحديد سنة، اعرض كل الحالات (بدون استعلام)
+        if not search_value and year == "الكل":
+            self.filtered_cases = self.cases_data.copy()
+            self.cases_list_paged = True
             self.selected_case_index = 0
             self.update_cases_list()
-            
-            # عرض عدد النتائج
-            result_count = len(self.filtered_cases)
-            if search_value or year != "الكل":
-                self.show_notification(f"تم العثور على {result_count} حالة", notification_type="info")
-            
-        except Exception as e:
-            self.show_notification(f"خطأ في البحث: {str(e)}", notification_type="error")
-            messagebox.showerror("خطأ في البحث", f"حدث خطأ أثناء البحث:\n{e}")
+            self._set_search_status("✅ جاهز")
+            return
+
+        # الاسم ورقم المشترك والعنوان يُبحث عنها أولاً في فهرس الحالات المحملة: النتيجة فورية،
+        # وتكفي وحدها إذا كانت كل الحالات محملة، وإلا تستكملها قاعدة البيانات
+        field = LOCAL_SEARCH_FIELDS.get(search_type)
+        if field and search_value and year == "الكل" and self.cases_page_year is None:
+            complete = self.cases_next_cursor is None
+            self._show_search_results(self._search_generation, self.case_model.search(field, search_value),
+                                      None, complete and not live)
+            if complete:
+                return
+
+        self._submit_search(enhanced_db.search_cases, (search_type, search_value, year, date_field),
+                            not live and bool(search_value or year != "الكل"))
+
+    def _submit_search(self, query, args, notify):
+        """تسليم استعلام بحث (search_cases أو filter_cases) كمهمة تلغي أي بحث سابق لم ينته"""
+        self._set_search_status("🔍 جاري البحث...")
+        generation = self._search_generation
+        self.jobs.submit('search', lambda job: query(*args), priority=PRIORITY_HIGH, group='search',
+                         busy="جاري البحث..." if notify else None,
+                         on_done=lambda results: self._show_search_results(generation, results, None, notify),
+                         on_error=lambda e: self._show_search_results(generation, None, e, notify))
+
+    def _show_search_results(self, generation, results, error, notify):
+        """عرض نتائج البحث على خيط الواجهة (تُهمل إذا بدأ بحث أحدث)"""
+        if generation != self._search_generation or getattr(self, 'is_closing', False):
+            return
+        if error is not None:
+            self._set_search_status("✅ جاهز")
+            self.show_notification(f"خطأ في البحث: {str(error)}", notification_type="error")
+            if notify:
+                messagebox.showerror("خطأ في البحث", f"حدث خطأ أثناء البحث:\n{error}")
             # في حالة الخطأ، اعرض جميع الحالات
             self.filtered_cases = self.cases_data.copy()
+            self.cases_list_paged = True
             self.update_cases_list()
+            return
+
+        # نتائج البحث لا تُرقم
+        self.filtered_cases = results
+        self.cases_list_paged = False
+        # إعادة تعيين الفهرس المحدد
+        self.selected_case_index = 0
+        self.update_cases_list()
+
+        # عرض عدد النتائج
+        message = f"تم العثور على {len(results)} حالة"
+        self._set_search_status(f"🔍 {message}")
+        if notify:
+            self.show_notification(message, notification_type="info")
+
+    def _set_search_status(self, text):
+        if hasattr(self, 'status_label') and self.status_label and self.status_label.winfo_exists():
+            self.status_label.config(text=text)
 
     def on_closing(self):
         """معالجة حدث إغلاق النافذة"""
@@ -2604,11 +2932,21 @@ Escape     - مسح التحديد
                 if hasattr(self, 'file_manager'):
                     self.file_manager.cleanup_old_backups()
                 self.show_notification("جاري إغلاق النظام...", notification_type="info")
-                self.root.after(1000, self.root.destroy)
+                self.root.after(1000, self._shutdown)
             except Exception as e:
                 print(f"خطأ أثناء الإغلاق: {e}")
-                self.root.destroy()
+                self._shutdown()
     
+    def _shutdown(self):
+        """إيقاف مهام الخلفية وإغلاق اتصالات قاعدة البيانات ثم تدمير النافذة"""
+        self.jobs.shutdown()
+        self.dispatcher.stop()
+        try:
+            enhanced_db.close()
+        except Exception as e:
+            print(f"خطأ في إغلاق اتصالات قاعدة البيانات: {e}")
+        self.root.destroy()
+
     def show_dashboard(self):
         """عرض لوحة التحكم الرئيسية (نسخة محسنة تدعم الاستجابة)"""
         self.clear_root()
@@ -2631,10 +2969,10 @@ Escape     - مسح التحديد
         stats_frame.columnconfigure(0, weight=1)
 
         # حساب الإحصائيات
-        cases = enhanced_db.get_all_cases() if hasattr(enhanced_db, 'get_all_cases') else []
-        total_cases = len(cases)
-        active_cases = len([case for case in cases if (case.get('status') if isinstance(case, dict) else (case[3] if len(case) > 3 else '')) not in ['تم حلها', 'مغلقة']])
-        solved_cases = len([case for case in cases if (case.get('status') if isinstance(case, dict) else (case[3] if len(case) > 3 else '')) == 'تم حلها'])
+        status_counts = enhanced_db.get_status_counts()
+        total_cases = sum(status_counts.values())
+        solved_cases = status_counts.get('تم حلها', 0)
+        active_cases = total_cases - solved_cases - status_counts.get('مغلقة', 0)
 
         # إطار للإحصائيات مع تصميم محسن
         stats_inner_frame = tk.Frame(stats_frame, bg=self.colors['bg_card'])
@@ -2680,23 +3018,25 @@ Escape     - مسح التحديد
 
         # Scrollbar رأسي
         scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
         tree.grid(row=1, column=0, sticky='nsew')
         scrollbar.grid(row=1, column=1, sticky='ns')
 
-        # تحميل البيانات - عرض فقط الحالات النشطة
-        filtered_cases = [case for case in cases if (case.get('status') if isinstance(case, dict) else (case[3] if len(case) > 3 else '')) not in ['تم حلها', 'مغلقة']]
-        for case in filtered_cases:
+        # تحميل البيانات - عرض فقط الحالات النشطة، صفحة بصفحة عند التمرير
+        def insert_case(case):
             item = tree.insert('', 'end', values=(
-                case.get('customer_name', '') if isinstance(case, dict) else case[1],
-                case.get('subscriber_number', '') if isinstance(case, dict) else case[2],
-                case.get('category_name', '') if isinstance(case, dict) else case[4],
-                case.get('status', '') if isinstance(case, dict) else case[3],
-                case.get('created_date', '') if isinstance(case, dict) else case[7]
+                case.get('customer_name', ''),
+                case.get('subscriber_number', ''),
+                case.get('category_name', ''),
+                case.get('status', ''),
+                case.get('created_date', '')
             ))
             # ربط النقر على الحالة للانتقال إليها
             tree.tag_bind(item, '<Double-Button-1>', lambda e, c=case: self.load_case_from_dashboard(c))
 
+        self.attach_tree_pager(tree, scrollbar,
+                               lambda cursor: enhanced_db.get_cases_page(cursor, active_only=True),
+                               insert_case)
+
         # أزرار التحكم
         buttons_frame = tk.Frame(dash_frame, bg=self.colors['bg_main'])
         buttons_frame.grid(row=3, column=0, sticky='ew', pady=10, padx=10)
@@ -2791,10 +3131,9 @@ Escape     - مسح التحديد
                 self.show_notification("خطأ: معرف الحالة غير صحيح", notification_type="error")
                 return
             
-            # جلب البيانات الكاملة من قاعدة البيانات
-            full_case = None
-            if hasattr(enhanced_db, 'get_case_details'):
-                full_case = enhanced_db.get_case_details(case_id)
+            # جلب الحالة وما يعرضه التبويب الظاهر فقط في معاملة قراءة واحدة
+            bundle = enhanced_db.get_case_bundle(case_id, parts=self.visible_case_parts())
+            full_case = bundle.case if bundle else None
             
             # إذا لم نتمكن من جلب البيانات الكاملة، استخدم البيانات المتوفرة
             if not full_case:
@@ -2875,10 +3214,11 @@ Escape     - مسح التحديد
             self.save_btn.config(state='normal')
             self.print_btn.config(state='normal')
             
-            # تحميل البيانات المرتبطة
-            self.load_attachments()
-            self.load_correspondences()
-            self.load_audit_log()
+            # تحميل البيانات المرتبطة من نفس الحزمة (التبويبات الأخرى عند اختيارها)
+            if bundle:
+                self.render_case_bundle(bundle)
+            else:
+                self.clear_tabs()
             
             # تعبئة التصنيف بالاسم فقط
             if 'category' in self.basic_data_widgets:
@@ -2919,10 +3259,11 @@ Escape     - مسح التحديد
             
             # تحديث البطاقة المحددة
             self._update_selected_case_index(case_id)
+            self.prefetch_neighbour_cases()
             
             # تحديد تبويب البيانات الأساسية
             if hasattr(self, 'notebook'):
-                self.notebook.select(4)  # التبويب الأخير (البيانات الأساسية)
+                self.select_tab('basic_data')
             
             self.show_notification(f"تم تحميل حالة: {customer_name}", notification_type="info")
             
@@ -2943,8 +3284,10 @@ Escape     - مسح التحديد
                     current_id = case[0]
                 
                 if current_id == case_id:
-                    self.selected_case_index = i
-                    self._highlight_selected_case_card()
+                    # التنقل بالأسهم يكون قد ميز البطاقة مسبقاً
+                    if self.selected_case_index != i:
+                        self.selected_case_index = i
+                        self._highlight_selected_case_card()
                     break
         except Exception:
             pass
@@ -2965,8 +3308,11 @@ Escape     - مسح التحديد
                 import shutil
                 shutil.rmtree(case_folder)
             self.show_notification("تم حذف الحالة وكل بياناتها بنجاح", notification_type="warning")
+            deleted_case_id = self.current_case_id
             self.current_case_id = None
-            self.load_initial_data()
+            self.apply_case_changes(removed_ids=[deleted_case_id])
+            self.reload_case_tabs()
+            self.update_cases_count_label()
             self.save_btn.config(state='disabled')
             self.print_btn.config(state='disabled')
             self.customer_name_label.config(text="اختر حالة من القائمة")
@@ -2996,10 +3342,11 @@ Escape     - مسح التحديد
         stats_frame.pack(fill='x', padx=20, pady=10)
         
         # حساب الإحصائيات
-        total_cases = len(self.cases_data)
-        active_cases = len([case for case in self.cases_data if (case.get('status') if isinstance(case, dict) else (case[3] if len(case) > 3 else '')) not in ['تم حلها', 'مغلقة']])
-        solved_cases = len([case for case in self.cases_data if (case.get('status') if isinstance(case, dict) else (case[3] if len(case) > 3 else '')) == 'تم حلها'])
-        closed_cases = len([case for case in self.cases_data if (case.get('status') if isinstance(case, dict) else (case[3] if len(case) > 3 else '')) == 'مغلقة'])
+        status_counts = enhanced_db.get_status_counts()
+        total_cases = sum(status_counts.values())
+        solved_cases = status_counts.get('تم حلها', 0)
+        closed_cases = status_counts.get('مغلقة', 0)
+        active_cases = total_cases - solved_cases - closed_cases
         
         stats_text = f"إجمالي الحالات: {total_cases} | الحالات النشطة: {active_cases} | المحلولة: {solved_cases} | المغلقة: {closed_cases}"
         stats_label = tk.Label(stats_frame, text=stats_text, 
@@ -3026,28 +3373,22 @@ Escape     - مسح التحديد
         
         # Scrollbar رأسي
         scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
         
         tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
         
-        # تعبئة البيانات
-        for case in self.cases_data:
-            if isinstance(case, dict):
-                tree.insert('', 'end', values=(
-                    case.get('customer_name', ''),
-                    case.get('subscriber_number', ''),
-                    case.get('category_name', ''),
-                    case.get('status', ''),
-                    case.get('created_date', ''),
-                    case.get('modified_date', '')
-                ))
-            elif isinstance(case, tuple):
-                # ترتيب الأعمدة حسب get_all_cases
-                # ['id', 'customer_name', 'subscriber_number', 'status', 'category_name', 'color_code', 'modified_by_name', 'created_date', 'modified_date']
-                tree.insert('', 'end', values=(
-                    case[1], case[2], case[4], case[3], case[7], case[8]
-                ))
+        # تعبئة البيانات صفحة بصفحة عند التمرير
+        def insert_case(case):
+            tree.insert('', 'end', values=(
+                case.get('customer_name', ''),
+                case.get('subscriber_number', ''),
+                case.get('category_name', ''),
+                case.get('status', ''),
+                case.get('created_date', ''),
+                case.get('modified_date', '')
+            ))
+
+        self.attach_tree_pager(tree, scrollbar, enhanced_db.get_cases_page, insert_case)
         
         # أزرار التحكم
         buttons_frame = tk.Frame(win, bg=self.colors['bg_main'])
@@ -3087,72 +3428,100 @@ Escape     - مسح التحديد
         if not file_path:
             return
 
-        try:
-            # تجهيز الأعمدة الرئيسية (تعديل حسب قاعدة البيانات لديك)
-            columns = [
-                ("اسم العميل", "customer_name"),
-                ("عنوان العميل", "customer_address"),
-                ("رقم المشترك", "subscriber_number"),
-                ("تصنيف المشكلة", "category_name"),
-                ("حالة المشكلة", "status"),
-                ("تاريخ ورود المشكلة", "received_date"),
-                ("تاريخ الإضافة", "created_date"),
-                ("آخر تعديل", "modified_date")
-            ]
-            # تجهيز البيانات كقائمة dicts موحدة
-            cases = []
-            for case in self.cases_data:
-              # معالجة ترتيب الأعمدة بدقة حسب ما ترجعه get_all_cases
-                if isinstance(case, dict):
-                    cases.append({
-                        "customer_name": case.get("customer_name", ""),
-                        "customer_address": case.get("customer_address", case.get("address", "")),
-                        "subscriber_number": case.get("subscriber_number", ""),
-                        "category_name": case.get("category_name", ""),
-                        "status": case.get("status", ""),
-                        "received_date": case.get("received_date", ""),
-                        "created_date": case.get("created_date", ""),
-                        "modified_date": case.get("modified_date", "")
-                    })
-                elif isinstance(case, tuple):
-                    # الترتيب الجديد: id, customer_name, customer_address, subscriber_number, status, category_name, color_code, modified_by_name, received_date, created_date, modified_date
-                    try:
-                        cases.append({
-                            "customer_name": case[1] if len(case) > 1 else '',
-                            "customer_address": case[2] if len(case) > 2 else '',
-                            "subscriber_number": case[3] if len(case) > 3 else '',
-                            "category_name": case[5] if len(case) > 5 else '',
-                            "status": case[4] if len(case) > 4 else '',
-                            "received_date": case[8] if len(case) > 8 else '',
-                            "created_date": case[9] if len(case) > 9 else '',
-                            "modified_date": case[10] if len(case) > 10 else ''
-                        })
-                    except Exception:
-                        pass
+        # تجهيز الأعمدة الرئيسية (تعديل حسب قاعدة البيانات لديك)
+        columns = [
+            ("اسم العميل", "customer_name"),
+            ("عنوان العميل", "customer_address"),
+            ("رقم المشترك", "subscriber_number"),
+            ("تصنيف المشكلة", "category_name"),
+            ("حالة المشكلة", "status"),
+            ("تاريخ ورود المشكلة", "received_date"),
+            ("تاريخ الإضافة", "created_date"),
+            ("آخر تعديل", "modified_date")
+        ]
+
+        def write_file(job):
+            # كل الحالات من قاعدة البيانات صفحة بصفحة (القائمة المعروضة قد تكون جزئية)
+            total = enhanced_db.count_cases()
+
+            def rows():
+                for count, case in enumerate(enhanced_db.iter_cases(), 1):
+                    job.check_cancelled()
+                    if total and count % 500 == 0:
+                        job.report_progress(count / total, f"{count:,} / {total:,}")
+                    yield {key: case.get(key, '') for _, key in columns}
+
             if file_path.endswith('.xlsx'):
+                cases = list(rows())
+                job.report_progress(None, "جاري كتابة الملف...")
                 export_cases_to_excel(cases, file_path, custom_columns=columns)
-            else:
-                # CSV الافتراضي
+                return len(cases)
+            # CSV الافتراضي (يُكتب أثناء القراءة، والملف الناقص يُحذف عند الإلغاء)
+            count = 0
+            try:
                 with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
                     writer = csv.writer(csvfile)
                     headers = [col[0] for col in columns]
                     writer.writerow(headers)
-                    for case in cases:
-                        writer.writerow([
-                            case.get('customer_name', ''),
-                            case.get('customer_address', ''),
-                            case.get('subscriber_number', ''),
-                            case.get('category_name', ''),
-                            case.get('status', ''),
-                            case.get('received_date', ''),
-                            case.get('created_date', ''),
-                            case.get('modified_date', '')
-                        ])
-            self.show_notification(f"تم تصدير البيانات إلى: {file_path}", notification_type="success")
-        except Exception as e:
+                    for case in rows():
+                        writer.writerow([case[key] for _, key in columns])
+                        count += 1
+            except JobCancelled:
+                os.remove(file_path)
+                raise
+            return count
+
+        def show_error(e):
             self.show_notification(f"خطأ في تصدير البيانات: {str(e)}", notification_type="error")
             messagebox.showerror("خطأ", f"فشل في تصدير البيانات:\n{e}")
 
+        self.jobs.submit('export', write_file, busy="جاري تصدير البيانات...", cancellable=True,
+                         on_done=lambda count: self.show_notification(
+                             f"تم تصدير {count:,} حالة إلى: {file_path}", notification_type="success"),
+                         on_error=show_error,
+                         on_cancel=lambda: self.show_notification("تم إلغاء التصدير", notification_type="warning"))
+
+    def import_cases_data(self):
+        """استيراد حالات من ملف CSV أو Excel في خيط منفصل مع نافذة تقدم"""
+        from customer_issues_import import CaseImporter
+
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Excel/CSV files", "*.xlsx *.xlsm *.csv"), ("All files", "*.*")],
+            title="اختيار ملف الحالات للاستيراد"
+        )
+        if not file_path:
+            return
+
+        # الموظف المسجل كمنفذ للاستيراد (إن وجد)
+        emp_name = self.employee_var.get() if hasattr(self, 'employee_var') else ""
+        emp_id = enhanced_db.lookups.employee_id(emp_name)
+
+        def run_import(job):
+            importer = CaseImporter(performed_by=emp_id)
+            return importer.run(
+                file_path,
+                progress=lambda rows, fraction: job.report_progress(fraction, f"تمت معالجة {rows:,} صف"),
+                cancel_event=job.cancel_event
+            )
+
+        def finish(summary):
+            message = f"تم استيراد {summary['imported']:,} حالة من {summary['rows']:,} صف"
+            if summary['cancelled']:
+                message += "\n(تم إيقاف الاستيراد قبل نهاية الملف)"
+            if summary['rejected']:
+                message += f"\nالصفوف المرفوضة: {summary['rejected']:,}\nتقرير الرفض: {summary['rejects_path']}"
+            messagebox.showinfo("نتيجة الاستيراد", message)
+            if summary['imported']:
+                self.refresh_data()
+
+        def show_error(error):
+            self.show_notification(f"خطأ في استيراد البيانات: {error}", notification_type="error")
+            messagebox.showerror("خطأ", f"فشل في استيراد البيانات:\n{error}")
+
+        # الإلغاء يوقف المستورد بين الدفعات، وملخص ما استُورد يصل إلى finish (cancelled فيه True)
+        self.jobs.submit('import', run_import, busy=f"استيراد {os.path.basename(file_path)}",
+                         cancellable=True, on_done=finish, on_error=show_error)
+
     def apply_sorting(self, event=None):
         """تطبيق الترتيب على قائمة الحالات"""
         def get_val(c, key, idx):
@@ -3172,6 +3541,8 @@ Escape     - مسح التحديد
                 self.filtered_cases.sort(key=lambda c: get_val(c, 'customer_name', 1))
             elif sort_type == "اسم العميل (ي-أ)":
                 self.filtered_cases.sort(key=lambda c: get_val(c, 'customer_name', 1), reverse=True)
+            # الترتيب يطبق على الحالات المحملة فقط، فلا تُلحق صفحات جديدة بعده
+            self.cases_list_paged = False
             
             # إعادة تعيين الفهرس المحدد
             self.selected_case_index = 0
@@ -3204,61 +3575,26 @@ Escape     - مسح التحديد
             elif btn == self.print_btn:
                 btn.config(bg='#3498db', fg='white')
 
-    def _on_case_list_up(self, event=None):
-        if not self.case_card_widgets:
-            return
-        self.selected_case_index = max(0, self.selected_case_index - 1)
-        self._highlight_selected_case_card()
-        self._select_case_by_index()
-    def _on_case_list_down(self, event=None):
-        if not self.case_card_widgets:
-            return
-        self.selected_case_index = min(len(self.case_card_widgets) - 1, self.selected_case_index + 1)
-        self._highlight_selected_case_card()
-        self._select_case_by_index()
     def _highlight_selected_case_card(self):
-        """تمييز البطاقة المحددة"""
+        """تمييز البطاقة المحددة وتمرير القائمة إليها"""
         try:
-            if not self.case_card_widgets:
-                return
-                
-            for idx, card in enumerate(self.case_card_widgets):
-                try:
-                    if not card.winfo_exists():
-                        continue
-                        
-                    if idx == self.selected_case_index:
-                        # تمييز البطاقة المحددة بلون مختلف
-                        card.config(bg=self.colors['bg_card'], highlightbackground=self.colors['button_action'], highlightthickness=2)
-                        # تمييز جميع العناصر داخل البطاقة مع حماية شارة الحالة
-                        for child in card.winfo_children():
-                            try:
-                                if isinstance(child, tk.Label) and child.winfo_exists():
-                                    # لا تغير لون شارة الحالة (التي لها خلفية ملونة)
-                                    if child.cget('bg') not in [self.colors['status_new'], self.colors['status_inprogress'], 
-                                                               self.colors['status_solved'], self.colors['status_closed']]:
-                                        child.config(bg=self.colors['bg_card'])
-                            except:
-                                pass
-                    else:
-                        # إعادة البطاقات الأخرى للوضع العادي
-                        card.config(bg=self.colors['bg_light'], highlightbackground=self.colors['border_light'], highlightthickness=1)
-                        # إعادة جميع العناصر داخل البطاقة للوضع العادي مع حماية شارة الحالة
-                        for child in card.winfo_children():
-                            try:
-                                if isinstance(child, tk.Label) and child.winfo_exists():
-                                    # لا تغير لون شارة الحالة
-                                    if child.cget('bg') not in [self.colors['status_new'], self.colors['status_inprogress'], 
-                                                               self.colors['status_solved'], self.colors['status_closed']]:
-                                        child.config(bg=self.colors['bg_light'])
-                            except:
-                                pass
-                except Exception:
-                    # تجاهل الأخطاء في البطاقات الفردية
-                    continue
+            if self.case_list:
+                self.case_list.select(self.selected_case_index)
         except Exception:
-            # تجاهل الأخطاء العامة في تمييز البطاقات
             pass
+
+    def prefetch_neighbour_cases(self):
+        """جلب حزم الحالات المجاورة للحالة المحددة في الخلفية (الأقرب أولاً) لتسريع التنقل بالأسهم"""
+        index = self.selected_case_index
+        case_ids = []
+        for distance in range(1, self.case_prefetch_radius + 1):
+            for neighbour in (index + distance, index - distance):
+                if 0 <= neighbour < len(self.filtered_cases):
+                    case = self.filtered_cases[neighbour]
+                    case_ids.append(case.get('id') if isinstance(case, dict) else case[0])
+        if case_ids:
+            enhanced_db.prefetch_case_bundles(case_ids, parts=self.visible_case_parts())
+
     def _select_case_by_index(self):
         """اختيار الحالة حسب الفهرس"""
         try:
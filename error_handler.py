@@ -1,5 +1,4 @@
 import logging
-from tkinter import messagebox
 
 def handle_error(message, exception=None, show_messagebox=True, level='error'):
     """
@@ -19,4 +18,6 @@ def handle_error(message, exception=None, show_messagebox=True, level='error'):
     else:
         logging.info(full_message)
     if show_messagebox:
+        # tkinter يُحمل عند أول رسالة فقط، فتبقى الوحدة صالحة للاستخدام بدون واجهة
+        from tkinter import messagebox
         messagebox.showerror("خطأ في النظام", full_message)
@@ -4,16 +4,28 @@ import sqlite3
 import os
 
 class LoginWindow:
-    def __init__(self, db_path, on_success):
+    def __init__(self, db_path, on_success, master=None, ready=None):
+        """master: نافذة البرنامج الرئيسية فتُعرض الشاشة فوقها كنافذة فرعية (بدون mainloop خاص بها)
+
+        ready: threading.Event تُضبط عندما تصبح قاعدة البيانات (db_path) جاهزة؛ الدخول قبلها ينتظرها.
+        """
         self.db_path = db_path
         self.on_success = on_success
-        self.root = tk.Tk()
+        self.ready = ready
+        self._retry_id = None
+        self.root = tk.Tk() if master is None else tk.Toplevel(master)
         self.root.title("تسجيل الدخول - نظام إدارة مشاكل العملاء")
         self.root.resizable(False, False)
         self.root.configure(bg="#f5f6fa")
         self.build_ui()
         self.center_window(400, 250)
-        self.root.mainloop()
+        if master is None:
+            self.root.mainloop()
+        else:
+            # إغلاق شاشة الدخول ينهي البرنامج
+            self.root.protocol("WM_DELETE_WINDOW", master.destroy)
+            self.root.lift()
+            self.root.focus_force()
 
     def center_window(self, w, h):
         self.root.update_idletasks()
@@ -32,6 +44,10 @@ class LoginWindow:
         tk.Button(frame, text="دخول", font=("Arial", 12, "bold"), bg="#27ae60", fg="white", width=12, command=self.try_login).pack(pady=10)
         self.root.bind('<Return>', lambda e: self.try_login())
 
+    def _retry_login(self):
+        self._retry_id = None
+        self.try_login()
+
     def try_login(self):
         perf = self.perf_var.get().strip()
         try:
@@ -39,6 +55,12 @@ class LoginWindow:
         except Exception:
             messagebox.showerror("خطأ", "رقم الأداء يجب أن يكون عددًا صحيحًا.")
             return
+        if self.ready is not None and not self.ready.is_set():
+            # قاعدة البيانات ما زالت تُجهز في الخلفية: محاولة واحدة معلقة مهما تكرر الضغط
+            if self._retry_id is not None:
+                self.root.after_cancel(self._retry_id)
+            self._retry_id = self.root.after(100, self._retry_login)
+            return
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
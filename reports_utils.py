@@ -1,11 +1,7 @@
-import pandas as pd
 import os
 from datetime import datetime
 # تم حذف جميع دوال وتقنيات تصدير PDF نهائياً بناءً على طلب المستخدم.
-
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
+# openpyxl يُستورد داخل دالة التصدير فقط، فلا يتحمل بدء تشغيل البرنامج كلفة تحميله
 
 def export_cases_to_excel(cases, filename, title="تقرير الحالات", custom_columns=None):
     """
@@ -16,11 +12,12 @@ def export_cases_to_excel(cases, filename, title="تقرير الحالات", cu
     custom_columns: قائمة أعمدة مخصصة [("اسم العرض", "مفتاح الدكت")]
     """
     try:
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+        from openpyxl.utils import get_column_letter
         if not cases or not isinstance(cases, list) or not cases or not isinstance(cases[0], dict):
-            # بيانات فارغة أو غير متوافقة
-            import pandas as pd
-            df = pd.DataFrame()
-            df.to_excel(filename, index=False)
+            # بيانات فارغة أو غير متوافقة: ملف بورقة فارغة
+            Workbook().save(filename)
             return
         wb = Workbook()
         ws = wb.active